@@ -10,6 +10,7 @@ class ApiConfig(AppConfig):
         # O Django lerá esses arquivos DEPOIS que todo o App Registry estiver carregado.
         try:
             from api.models import crm  # Importa o módulo api/models/crm.py
+            from api.models import jobs  # Jobs assíncronos da predição metabólica
             # from .models import financeiro # Se você tiver mais módulos
             # from .models import vendas
         except ImportError:
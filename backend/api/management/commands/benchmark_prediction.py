@@ -0,0 +1,66 @@
+import json
+import os
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services import prediction_benchmark
+
+
+class Command(BaseCommand):
+    help = ("Benchmark offline do pipeline de predição (modelos de METABOLIC_MODELS disponíveis). "
+            "Grava o resultado em JSON e, com --baseline, falha se alguma etapa regredir além do limite.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", choices=[*settings.METABOLIC_MODELS, "all"], default="all",
+                            help="'all' roda todos os modelos cujo arquivo existe.")
+        parser.add_argument("--genes", type=int, default=20, help="Tamanho da amostra de genes.")
+        parser.add_argument("--repeat", type=int, default=5, help="Medições por gene em cada etapa.")
+        parser.add_argument("--flux-genes", type=int, default=3)
+        parser.add_argument("--skip-flux", action="store_true")
+        parser.add_argument("--processes", type=int, help="Processos do FluxEngine (padrão: FLUX_PROCESSES).")
+        parser.add_argument("--output", help="Arquivo JSON do resultado (padrão: media/benchmarks/<data>.json).")
+        parser.add_argument("--baseline", help="JSON de uma execução anterior para comparação.")
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="Regressão = mediana acima de (1 + threshold) x baseline.")
+
+    def handle(self, *args, **options):
+        if options["model"] == "all":
+            models = prediction_benchmark.available_models()
+        elif options["model"] in prediction_benchmark.available_models():
+            models = [options["model"]]
+        else:
+            raise CommandError(f"Modelo '{options['model']}' não disponível neste ambiente.")
+
+        report = prediction_benchmark.run(
+            models,
+            n_genes=options["genes"],
+            repeat=options["repeat"],
+            flux_genes=options["flux_genes"],
+            skip_flux=options["skip_flux"],
+            processes=options["processes"],
+            log=lambda msg: self.stderr.write(msg),
+        )
+
+        output = options["output"] or os.path.join(
+            settings.BASE_DIR, "media/benchmarks", f"prediction-{datetime.now():%Y%m%d-%H%M%S}.json")
+        prediction_benchmark.save_report(report, output)
+
+        for name, model in report["models"].items():
+            self.stdout.write(f"{name} ({model['genes_in_model']} genes, {model['reactions_in_model']} reações)")
+            for stage, stats in model["stages"].items():
+                self.stdout.write(f"  {stage:<18} mediana {stats['median_ms']:>10.3f} ms   "
+                                  f"p95 {stats['p95_ms']:>10.3f} ms   n={stats['n']}")
+        self.stdout.write(f"Resultado gravado em {output}")
+
+        if options["baseline"]:
+            rows = prediction_benchmark.compare(
+                report, prediction_benchmark.load_report(options["baseline"]), options["threshold"])
+            regressions = [r for r in rows if r["regression"]]
+            for r in rows:
+                mark = "REGRESSÃO" if r["regression"] else "ok"
+                self.stdout.write(f"  {r['model']}/{r['stage']:<18} {r['baseline_ms']:>10.3f} -> "
+                                  f"{r['current_ms']:>10.3f} ms (x{r['ratio']}) {mark}")
+            if regressions:
+                raise CommandError(json.dumps(regressions, indent=2))
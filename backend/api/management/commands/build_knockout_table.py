@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.knockout_table import build_table, open_table
+from api.services.model_registry import UnknownModel
+from api.services.prediction import load_model, load_registry, model_version
+
+
+class Command(BaseCommand):
+    help = ("Calcula o knockout de todos os genes do modelo e grava a tabela indexada usada "
+            "pela análise de fluxo. Pode ser interrompido e executado de novo para retomar.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", default=settings.DEFAULT_METABOLIC_MODEL,
+                            help="Nome do modelo em METABOLIC_MODELS.")
+        parser.add_argument("--chunk-size", type=int, default=200)
+        parser.add_argument("--processes", type=int, default=settings.FLUX_PROCESSES)
+        parser.add_argument("--output", default=settings.KNOCKOUT_TABLE_DIR)
+
+    def handle(self, *args, **options):
+        try:
+            sha = model_version(options["model"])
+        except UnknownModel:
+            raise CommandError(f"Modelo desconhecido: {options['model']}")
+        if open_table(options["output"], sha) is not None:
+            self.stdout.write(f"Tabela para o modelo {sha[:12]} já existe")
+            return
+
+        model = load_model(options["model"])
+        table = build_table(
+            model, options["output"], sha, options["processes"], options["chunk_size"],
+            log=self.stdout.write, model_path=load_registry().path_of(model),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Tabela gravada: {len(table.gene_ids)} genes, biomass base {table.base_biomass:.4f}"
+        ))
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.phenotype_dictionary import load_dictionary, parse_source, write_dictionary
+from api.services.phenotype_matcher import term_key
+
+
+class Command(BaseCommand):
+    help = ("Compila o dicionário curado PT <-> EN de nomes de fenótipos (TSV) no SQLite "
+            "versionado usado em runtime; os workers recarregam quando o arquivo muda.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=settings.PHENOTYPE_DICTIONARY_SOURCE)
+        parser.add_argument("--output", default=settings.PHENOTYPE_DICTIONARY_PATH)
+
+    def handle(self, *args, **options):
+        try:
+            entries = parse_source(options["source"])
+        except FileNotFoundError:
+            raise CommandError(f"Arquivo não encontrado: {options['source']}")
+        if not entries:
+            raise CommandError(f"Nenhum termo em {options['source']}")
+
+        # o mesmo termo em português apontando para nomes diferentes: vale o primeiro
+        targets = {}
+        for _, en, pt in entries:
+            previous = targets.setdefault(term_key(pt), en)
+            if previous != en:
+                self.stdout.write(self.style.WARNING(
+                    f"'{pt}' traduz para '{previous}' e '{en}'; mantido '{previous}'"
+                ))
+
+        version = write_dictionary(options["output"], entries, source=options["source"])
+        dictionary = load_dictionary(options["output"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Dicionário {version[:12]} gravado em {options['output']}: "
+            f"{len(dictionary.en_names)} fenótipos, {len(dictionary.pt_names)} termos em português"
+        ))
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.metabolic_index import MetabolicIndex
+from api.services.metabolic_store import export_index, open_index, source_info
+from api.services.model_registry import UnknownModel
+from api.services.metabolite_filter import default_filter
+from api.services.prediction import load_model, load_registry
+
+
+class Command(BaseCommand):
+    help = "Exporta a topologia do modelo metabólico para o formato compacto memory-mapped."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", default=settings.DEFAULT_METABOLIC_MODEL,
+                            help="Nome do modelo em METABOLIC_MODELS.")
+        parser.add_argument("--output", default=None,
+                            help="Diretório de saída do grafo compacto (padrão: graph_dir do modelo).")
+
+    def handle(self, *args, **options):
+        try:
+            entry = load_registry().entry(options["model"])
+        except UnknownModel:
+            raise CommandError(f"Modelo desconhecido: {options['model']}")
+        output = options["output"] or entry.graph_dir
+        if not output:
+            raise CommandError(f"O modelo {entry.name} não tem graph_dir; informe --output")
+
+        start = time.perf_counter()
+        model = load_model(entry.name)
+        self.stdout.write(f"Modelo carregado em {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        met_filter = default_filter()
+        index = MetabolicIndex.from_model(model, met_filter)
+        export_index(index, output, source=source_info(entry.path), met_filter=met_filter)
+        self.stdout.write(f"Grafo exportado para {output} em {time.perf_counter() - start:.1f}s")
+
+        index = open_index(output, entry.path, met_filter)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(index.gene_ids)} genes, {len(index.met_ids)} metabólitos "
+            f"({int(index.met_excluded.sum())} promíscuos), {len(index.rxn_ids)} reações"
+        ))
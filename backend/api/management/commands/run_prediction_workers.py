@@ -0,0 +1,106 @@
+import multiprocessing
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.services import prediction_jobs
+from api.services.warmup import prepare_fork, warmup
+
+_stopping = False
+
+# tempo para os workers terminarem o job atual depois do SIGTERM
+SHUTDOWN_SECONDS = 30
+
+
+def _stop(signum, frame):
+    global _stopping
+    _stopping = True
+
+
+def _worker_loop(poll_seconds):
+    # conexões abertas pelo processo pai não podem ser compartilhadas com o filho
+    connections.close_all()
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    print(f"Worker de predição {prediction_jobs.worker_name()} iniciado")
+    while not _stopping:
+        job = prediction_jobs.claim_next()
+        if job is None:
+            time.sleep(poll_seconds)
+            continue
+        start = time.perf_counter()
+        prediction_jobs.run_job(job)
+        print(f"Job {job.id}: {job.status} em {time.perf_counter() - start:.1f}s")
+
+
+def stop_workers(workers, timeout=SHUTDOWN_SECONDS, log=print):
+    """
+    SIGTERM em todos os workers; quem não sair em `timeout` segundos recebe SIGKILL.
+    O job de um worker finalizado assim fica "executando" e volta à fila por requeue_stale.
+    Retorna os PIDs finalizados com SIGKILL.
+    """
+    for process in workers:
+        process.terminate()
+    deadline = time.monotonic() + timeout
+    for process in workers:
+        process.join(timeout=max(0.0, deadline - time.monotonic()))
+    killed = []
+    for process in workers:
+        if process.is_alive():
+            log(f"Worker {process.pid} não encerrou em {timeout}s; finalizando com SIGKILL")
+            process.kill()
+            process.join()
+            killed.append(process.pid)
+    return killed
+
+
+class Command(BaseCommand):
+    help = ("Executa os jobs de predição enfileirados em api/metab/jobs/: um pool de processos "
+            "consome a fila do Postgres; o processo principal reinicia workers que morrem, "
+            "devolve à fila jobs abandonados e apaga resultados expirados.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=settings.PREDICTION_JOB_WORKERS)
+        parser.add_argument("--poll", type=float, default=settings.PREDICTION_JOB_POLL_SECONDS,
+                            help="Intervalo (s) entre consultas quando a fila está vazia.")
+        parser.add_argument("--full-model", action="store_true",
+                            help="Pré-carrega o modelo COBRApy completo (jobs com flux).")
+
+    def _spawn(self, ctx, poll):
+        # não-daemon: o worker precisa criar o pool de processos do FluxEngine
+        process = ctx.Process(target=_worker_loop, args=(poll,), daemon=False)
+        process.start()
+        return process
+
+    def handle(self, *args, **options):
+        # dados carregados antes do fork são compartilhados pelos workers (copy-on-write)
+        state = warmup(load_full_model=options["full_model"] or None)
+        self.stdout.write(f"Dados da predição carregados: {state['timings_ms']}")
+        connections.close_all()
+        prepare_fork()
+
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+        ctx = multiprocessing.get_context("fork")
+        workers = [self._spawn(ctx, options["poll"]) for _ in range(max(1, options["processes"]))]
+
+        last_maintenance = 0.0
+        try:
+            while not _stopping:
+                for i, process in enumerate(workers):
+                    if not process.is_alive():
+                        self.stderr.write(f"Worker {process.pid} saiu com código {process.exitcode}; reiniciando")
+                        workers[i] = self._spawn(ctx, options["poll"])
+                if time.monotonic() - last_maintenance > 60:
+                    requeued, failed = prediction_jobs.requeue_stale()
+                    purged = prediction_jobs.purge_expired()
+                    if requeued or failed or purged:
+                        self.stdout.write(f"Jobs devolvidos à fila: {requeued}, falhos: {failed}, expirados: {purged}")
+                    connections.close_all()
+                    last_maintenance = time.monotonic()
+                time.sleep(1)
+        finally:
+            stop_workers(workers, log=self.stderr.write)
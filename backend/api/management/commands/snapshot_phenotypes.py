@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.services.disease_db import get_engine
+from api.services.phenotype_index import build_snapshot, load_snapshot
+
+
+class Command(BaseCommand):
+    help = ("Grava um snapshot local (SQLite) de pgs.genes_metab e pgs.genes2phen; "
+            "os workers recarregam o índice em memória quando o arquivo muda.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=settings.PHENOTYPE_SNAPSHOT_PATH)
+
+    def handle(self, *args, **options):
+        version = build_snapshot(get_engine(), options["output"])
+        index = load_snapshot(options["output"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {version[:12]} gravado em {options['output']}: "
+            f"{len(index.gene_symbols)} genes, {len(index.phenotypes)} símbolos com fenótipos"
+        ))
@@ -0,0 +1,36 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.services.prediction import neighbors
+from api.services.warmup import memory_usage, warmup
+
+
+class Command(BaseCommand):
+    help = ("Pré-carrega os dados da predição e mede memória e latência: "
+            "útil para comparar o custo de um worker frio com um worker pré-aquecido.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full-model", action="store_true",
+                            help="Carrega também o modelo COBRApy completo (análise de fluxo).")
+        parser.add_argument("--gene", help="Gene Ensembl para medir neighbors() (usa o banco de doenças).")
+
+    def handle(self, *args, **options):
+        report = {"memory_before": memory_usage()}
+
+        start = time.perf_counter()
+        state = warmup(load_full_model=options["full_model"] or None)
+        report["warmup_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        report["timings_ms"] = state["timings_ms"]
+        report["ready"] = state["ready"]
+        report["memory_after"] = memory_usage()
+
+        if options["gene"]:
+            # a primeira chamada após o warmup é a latência que o primeiro usuário veria
+            for label in ("first_request_ms", "second_request_ms"):
+                start = time.perf_counter()
+                neighbors(options["gene"])
+                report[label] = round((time.perf_counter() - start) * 1000, 1)
+
+        self.stdout.write(json.dumps(report, indent=2))
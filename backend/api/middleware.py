@@ -0,0 +1,30 @@
+import time
+
+from api.services import metrics
+
+
+class ServerTimingMiddleware:
+    """
+    Tempos por etapa da predição (api.services.metrics) no cabeçalho Server-Timing e em
+    uma linha de log JSON. Requisições sem nenhuma etapa medida não são alteradas.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings = metrics.finish_request(token)
+        if not timings:
+            return response
+
+        # respostas em streaming são geradas depois daqui: o total é só até o primeiro byte
+        timings["total"] = (time.perf_counter() - start) * 1000
+        metrics.observe("request_total", timings["total"])
+        response["Server-Timing"] = metrics.server_timing_header(timings)
+        metrics.log_request(request.method, request.path, response.status_code, timings)
+        return response
@@ -0,0 +1,57 @@
+import uuid
+
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class PredictionJob(models.Model):
+    """Predição executada fora do request pelos workers de run_prediction_workers."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    IN_FLIGHT = (QUEUED, RUNNING)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    params = models.JSONField()
+    # sha256 dos parâmetros normalizados: jobs idênticos em andamento são o mesmo job
+    params_hash = models.CharField(max_length=64)
+    status = models.CharField(
+        max_length=10,
+        choices=[
+            (QUEUED, "Na fila"),
+            (RUNNING, "Executando"),
+            (DONE, "Concluído"),
+            (FAILED, "Falhou"),
+        ],
+        default=QUEUED
+    )
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=100, null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name="prediction_jobs")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # resultado é apagado depois desta data (PREDICTION_JOB_TTL_SECONDS)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="predjob_status_created_idx"),
+            models.Index(fields=["expires_at"], name="predjob_expires_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["params_hash"],
+                condition=models.Q(status__in=["queued", "running"]),
+                name="predjob_unique_in_flight",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
@@ -0,0 +1,111 @@
+"""
+Acesso às tabelas de referência de doenças (pgs.genes_metab e pgs.genes2phen).
+
+Um único engine SQLAlchemy por processo, com pool de conexões reaproveitadas entre as
+requisições. A resolução Ensembl -> símbolo -> nomes HPO é feita em uma única consulta
+parametrizada (array binding), com deduplicação e ordenação no próprio Postgres.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from sqlalchemy import create_engine, event, text
+
+_engine_lock = threading.Lock()
+_engine = None
+_stats_lock = threading.Lock()
+_stats = {"connections_opened": 0, "checkouts": 0, "queries": 0}
+
+# COLLATE "C" mantém a mesma ordem do sorted() do Python
+DISEASES_QUERY = text("""
+    SELECT gp.gene_symbol,
+           array_agg(DISTINCT gp.hpo_name COLLATE "C" ORDER BY gp.hpo_name COLLATE "C") AS hpo_names
+    FROM pgs.genes_metab gm
+    JOIN pgs.genes2phen gp ON gp.gene_symbol = gm."geneSymbols"
+    WHERE gm.genes = ANY(:gene_ids) AND gp.hpo_name IS NOT NULL
+    GROUP BY gp.gene_symbol
+""")
+
+VERSION_QUERY = text("""
+    SELECT c.relname, c.oid, c.relfilenode,
+           COALESCE(s.n_tup_ins + s.n_tup_upd + s.n_tup_del, 0)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+    WHERE n.nspname = 'pgs' AND c.relname IN ('genes_metab', 'genes2phen')
+    ORDER BY c.relname
+""")
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if not settings.DISEASE_DB_URL:
+                    raise ImproperlyConfigured(
+                        "DISEASE_DB_URL não definida: informe a URL do Postgres das tabelas de "
+                        "doenças no ambiente ou gere o snapshot local (snapshot_phenotypes)."
+                    )
+                engine = create_engine(
+                    settings.DISEASE_DB_URL,
+                    pool_size=settings.DISEASE_DB_POOL_SIZE,
+                    max_overflow=settings.DISEASE_DB_MAX_OVERFLOW,
+                    pool_pre_ping=True,
+                    pool_recycle=1800,
+                )
+                event.listen(engine, "connect", lambda *args: _count("connections_opened"))
+                event.listen(engine, "checkout", lambda *args: _count("checkouts"))
+                _engine = engine
+    return _engine
+
+
+def _after_fork():
+    # conexões abertas pelo processo pai não podem ser usadas pelo filho
+    if _engine is not None:
+        _engine.dispose(close=False)
+    for key in _stats:
+        _stats[key] = 0
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def diseases_for_genes(gene_ids):
+    """IDs Ensembl -> {símbolo do gene: [nomes HPO ordenados, sem repetição]}."""
+    if not gene_ids:
+        return {}
+    _count("queries")
+    with get_engine().connect() as conn:
+        rows = conn.execute(DISEASES_QUERY, {"gene_ids": list(gene_ids)}).fetchall()
+    return {symbol: list(names) for symbol, names in rows}
+
+
+def table_version():
+    """Identifica o estado atual das tabelas (ver prediction.disease_table_version)."""
+    _count("queries")
+    with get_engine().connect() as conn:
+        rows = conn.execute(VERSION_QUERY).fetchall()
+    return ";".join(":".join(str(v) for v in row) for row in rows)
+
+
+def pool_metrics():
+    """Estatísticas do pool: checkouts bem acima de connections_opened indicam reuso."""
+    with _stats_lock:
+        metrics = dict(_stats)
+    metrics["pid"] = os.getpid()
+    if _engine is not None:
+        pool = _engine.pool
+        metrics.update(
+            pool_size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    return metrics
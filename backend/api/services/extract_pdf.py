@@ -1,7 +1,10 @@
-import PyPDF2
 import re
 import os
 
+from api.services.extraction_cache import get_extraction_cache, iter_pages, page_count
+from api.services.pdf_engine import PdfExtractionError, resolve_backend
+from api.services.utils.hashing import file_sha256
+
 def extract_emails_from_pdf(pdf_path):
     """
     Extrai endereços de e-mail de um arquivo PDF.
@@ -23,31 +26,35 @@ def extract_emails_from_pdf(pdf_path):
     email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
 
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            num_pages = len(reader.pages)
-
-            print(f"Analisando o PDF: {pdf_path}")
-            print(f"Total de páginas: {num_pages}")
-
-            for page_num in range(num_pages):
-                page = reader.pages[page_num]
-                text = page.extract_text()
-                if text:
-                    found_emails = re.findall(email_pattern, text)
-                    for email in found_emails:
-                        emails.add(email)
-                        print(f"  Encontrado na página {page_num + 1}: {email}")
-                else:
-                    print(f"  Página {page_num + 1} não contém texto extraível.")
-
-    except PyPDF2.errors.PdfReadError:
+        # reenvio de um arquivo já analisado: e-mails vêm do cache de extração
+        cache = get_extraction_cache()
+        sha256 = file_sha256(pdf_path)
+        cache_parts = (resolve_backend(), email_pattern)
+        cached = cache.get("emails", sha256, cache_parts)
+        if cached is not None:
+            print(f"E-mails de {pdf_path} obtidos do cache de extração")
+            return set(cached)
+
+        print(f"Analisando o PDF: {pdf_path}")
+        print(f"Total de páginas: {page_count(pdf_path, sha256)}")
+
+        for page_num, text in iter_pages(pdf_path, sha256):
+            if text:
+                found_emails = re.findall(email_pattern, text)
+                for email in found_emails:
+                    emails.add(email)
+                    print(f"  Encontrado na página {page_num}: {email}")
+            else:
+                print(f"  Página {page_num} não contém texto extraível.")
+
+    except PdfExtractionError:
         print(f"Erro: Não foi possível ler o arquivo PDF. Pode estar corrompido ou protegido por senha.")
         return set()
     except Exception as e:
         print(f"Ocorreu um erro inesperado: {e}")
         return set()
 
+    cache.set("emails", sha256, cache_parts, sorted(emails))
     return emails
 
 def extract_data_from_pdf(f):
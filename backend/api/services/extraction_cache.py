@@ -0,0 +1,164 @@
+"""
+Cache em disco de resultados de extração de PDFs (texto das páginas e derivados, como
+fenótipos e e-mails), para que o reenvio do mesmo exame não repita a extração.
+
+A chave é o sha256 do conteúdo do arquivo (não o nome nem o caminho), o tipo do resultado,
+EXTRACTOR_VERSION e as versões das dependências do resultado (backend de PDF, versão do
+matcher de fenótipos...). Os valores são JSON comprimido com zlib em um DiskCache
+(compartilhado entre os workers, com limite EXTRACTION_CACHE_MAX_MB e remoção LRU).
+
+O texto das páginas é gravado em blocos de EXTRACTION_CACHE_CHUNK_PAGES páginas, à medida
+que são extraídas, e um manifesto ({"pages", "chunks"}) é gravado quando o documento foi
+lido até o fim: a memória continua limitada a um bloco, como em pdf_engine.iter_pages.
+"""
+import json
+import os
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from api.services import pdf_engine
+from api.services.utils.disk_cache import DiskCache
+from api.services.utils.hashing import file_sha256
+
+# incrementar quando a extração mudar de forma que invalide os resultados gravados
+EXTRACTOR_VERSION = 2
+
+_cache_lock = threading.Lock()
+_cache_instance = None
+
+
+@contextmanager
+def local_path(source):
+    """
+    Caminho local de um PDF: o próprio caminho, o arquivo temporário de um upload grande ou
+    uma cópia temporária (removida ao sair) de um upload mantido em memória.
+    """
+    if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__"):
+        yield source
+        return
+    if hasattr(source, "temporary_file_path"):
+        yield source.temporary_file_path()
+        return
+    if hasattr(source, "chunks"):
+        blocks = source.chunks()
+    else:
+        blocks = iter(lambda: source.read(1024 * 1024), b"")
+    fd, tmp = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for block in blocks:
+                f.write(block)
+        yield tmp
+    finally:
+        os.remove(tmp)
+
+
+class ExtractionCache:
+
+    def __init__(self, directory, max_bytes):
+        self.disk = DiskCache(directory, max_bytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(kind, sha256, parts=()):
+        return json.dumps([EXTRACTOR_VERSION, kind, sha256, *parts])
+
+    def get(self, kind, sha256, parts=()):
+        data = self.disk.get(self.make_key(kind, sha256, parts))
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(zlib.decompress(data))
+
+    def set(self, kind, sha256, parts, value):
+        data = zlib.compress(json.dumps(value).encode("utf-8"))
+        self.disk.set(self.make_key(kind, sha256, parts), data)
+
+    def cached(self, kind, sha256, parts, compute):
+        """Resultado em cache ou `compute()`, gravado em seguida (valor serializável em JSON)."""
+        value = self.get(kind, sha256, parts)
+        if value is None:
+            value = compute()
+            self.set(kind, sha256, parts, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+def get_extraction_cache():
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = ExtractionCache(
+                    settings.EXTRACTION_CACHE_DIR,
+                    settings.EXTRACTION_CACHE_MAX_MB * 1024 * 1024,
+                )
+    return _cache_instance
+
+
+def page_count(path, sha256=None, backend=None):
+    """Nº de páginas: do manifesto em cache, sem abrir o PDF, ou de pdf_engine.page_count."""
+    backend = pdf_engine.resolve_backend(backend)
+    manifest = get_extraction_cache().get("pages", sha256 or file_sha256(path), (backend,))
+    if manifest is not None:
+        return manifest["pages"]
+    return pdf_engine.page_count(path, backend)
+
+
+def iter_pages(path, sha256=None, **options):
+    """
+    Como pdf_engine.iter_pages, consultando antes o cache; os blocos em cache são lidos um
+    a um. Em caso de falta, as páginas são repassadas à medida que são extraídas e gravadas
+    em blocos; o manifesto só é gravado se o documento for lido até o fim. Se um bloco foi
+    removido pelo LRU, o restante do documento é extraído de novo.
+    """
+    backend = pdf_engine.resolve_backend(options.pop("backend", None))
+    cache = get_extraction_cache()
+    sha256 = sha256 or file_sha256(path)
+    parts = (backend,)
+
+    delivered = 0
+    manifest = cache.get("pages", sha256, parts)
+    if manifest is not None:
+        for chunk in range(manifest["chunks"]):
+            texts = cache.get("pages-chunk", sha256, (*parts, chunk))
+            if texts is None:
+                break
+            for text in texts:
+                delivered += 1
+                yield delivered, text
+        else:
+            return
+
+    chunk_pages = max(1, settings.EXTRACTION_CACHE_CHUNK_PAGES)
+    buffer, chunks, n_pages = [], 0, 0
+    for page_number, text in pdf_engine.iter_pages(path, backend=backend, **options):
+        n_pages = page_number
+        buffer.append(text)
+        if len(buffer) == chunk_pages:
+            cache.set("pages-chunk", sha256, (*parts, chunks), buffer)
+            buffer, chunks = [], chunks + 1
+        if page_number > delivered:
+            yield page_number, text
+    if buffer:
+        cache.set("pages-chunk", sha256, (*parts, chunks), buffer)
+        chunks += 1
+    cache.set("pages", sha256, parts, {"pages": n_pages, "chunks": chunks})
+
+
+def extract_text(path, separator="\n", skip_empty=True, sha256=None, **options):
+    """Como pdf_engine.extract_text, consultando antes o cache."""
+    return separator.join(
+        text for _, text in iter_pages(path, sha256, **options) if text or not skip_empty
+    )
@@ -1,4 +1,4 @@
-import fitz  # Importa PyMuPDF
+from api.services.extraction_cache import iter_pages
 
 
 def extract_text_from_pdf(pdf_path: str) -> str:
@@ -12,29 +12,12 @@ def extract_text_from_pdf(pdf_path: str) -> str:
         Uma string contendo todo o texto extraído do PDF,
         com quebras de linha entre as páginas.
     """
-    full_text = []
-
     try:
-        # Abre o documento PDF
-        documento = fitz.open(pdf_path)
-
-        # Itera sobre cada página do documento
-        for page_num in range(documento.page_count):
-            page = documento.load_page(page_num)
-
-            # Extrai o texto da página usando o método de texto padrão (mais limpo)
-            text_on_page = page.get_text("text")
-
-            # Adiciona o texto da página à lista
-            full_text.append(text_on_page)
-
-        # Fecha o documento
-        documento.close()
-
-        # Junta todas as páginas em uma string única
-        return "\n--- Página Quebrada ---\n".join(full_text)
+        # páginas extraídas uma a uma (ou em paralelo, em documentos grandes) por pdf_engine;
+        # o texto fica no cache de extração, indexado pelo sha256 do arquivo
+        return "\n--- Página Quebrada ---\n".join(text for _, text in iter_pages(pdf_path))
 
-    except fitz.FileNotFoundError:
+    except FileNotFoundError:
         return f"Erro: Arquivo não encontrado no caminho: {pdf_path}"
     except Exception as e:
         return f"Ocorreu um erro durante a extração do texto: {e}"
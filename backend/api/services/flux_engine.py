@@ -0,0 +1,195 @@
+"""
+Knockouts de genes em paralelo sobre o modelo COBRApy.
+
+O pool usa o contexto "forkserver" (ou "spawn"), como o de pdf_engine: ele é criado sob
+demanda dentro de uma requisição, e os workers do gunicorn usam threads; um fork nesse
+momento poderia herdar locks travados por outras threads (logging, registro de modelos,
+BLAS). Cada processo do pool lê o modelo do arquivo (`model_path`, ex.: o pickle do
+Human-GEM) ou, sem caminho, recebe o modelo serializado, e mantém o mesmo problema LP
+entre os knockouts: o solver reaproveita a base da solução anterior (warm start) em vez
+de resolver do zero a cada gene. A solução base é calculada uma única vez por modelo.
+
+Orçamento de tempo: o prazo (relógio de parede, comparável entre processos) vai junto com
+cada bloco de genes e o worker o confere antes de cada knockout. Quando o prazo vence,
+os blocos ainda na fila são cancelados e os que estão em execução param no próximo
+knockout; o trabalho abandonado fica limitado a um LP em andamento por processo.
+"""
+import atexit
+import math
+import multiprocessing
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+_engine_lock = threading.Lock()
+_engines = weakref.WeakKeyDictionary()
+
+_worker_model = None
+
+
+def _init_worker(source):
+    # `source` é o caminho do modelo ou o próprio modelo (serializado pelo pool)
+    global _worker_model
+    if isinstance(source, str):
+        # import local: model_registry importa este módulo
+        from api.services.model_registry import read_model
+        source = read_model(source)
+    _worker_model = source
+    # primeira otimização do worker: as próximas partem desta base
+    _worker_model.slim_optimize()
+
+
+def _knockout(model, gene_id):
+    with model:
+        model.genes.get_by_id(gene_id).knock_out()
+        # knockout letal (problema inviável) conta como crescimento zero
+        return float(model.slim_optimize(error_value=0.0))
+
+
+def _knockout_chunk(gene_ids, deadline=None):
+    """Knockouts do bloco até `deadline` (time.time()); genes não calculados ficam de fora."""
+    growth = {}
+    for gene_id in gene_ids:
+        if deadline is not None and time.time() >= deadline:
+            break
+        growth[gene_id] = _knockout(_worker_model, gene_id)
+    return growth
+
+
+class FluxEngine:
+
+    def __init__(self, model, processes, model_path=None):
+        self.model = model
+        self.processes = max(1, processes)
+        self.model_path = model_path
+        self._pool = None
+        self._lock = threading.Lock()
+        self._base_objective = None
+        # requisições usando o motor agora; o pool de um motor aposentado (modelo
+        # descarregado) só é encerrado quando a última delas termina
+        self._state_lock = threading.Lock()
+        self._borrowers = 0
+        self._retired = False
+
+    def base_objective(self):
+        if self._base_objective is None:
+            with self._lock:
+                if self._base_objective is None:
+                    self._base_objective = float(self.model.slim_optimize(error_value=0.0))
+        return self._base_objective
+
+    def _get_pool(self):
+        if self._pool is None:
+            with _engine_lock:
+                if self._pool is None:
+                    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.processes,
+                        mp_context=multiprocessing.get_context(method),
+                        initializer=_init_worker,
+                        initargs=(self.model_path or self.model,),
+                    )
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def retire(self):
+        """Encerra o pool agora, ou quando a última requisição em andamento terminar."""
+        with self._state_lock:
+            self._retired = True
+            if self._borrowers == 0:
+                self.shutdown()
+
+    def _acquire(self):
+        with self._state_lock:
+            self._borrowers += 1
+
+    def _release(self):
+        with self._state_lock:
+            self._borrowers -= 1
+            if self._retired and self._borrowers == 0:
+                self.shutdown()
+
+    def knockouts(self, gene_ids, budget_seconds=None):
+        """
+        Crescimento após o knockout de cada gene.
+        Com orçamento de tempo, retorna o que ficou pronto dentro do prazo:
+            {"growth": {gene_id: valor}, "complete": bool, "pending": [gene_id, ...]}
+        """
+        self._acquire()
+        try:
+            return self._knockouts(gene_ids, budget_seconds)
+        finally:
+            self._release()
+
+    def _knockouts(self, gene_ids, budget_seconds):
+        gene_ids = [g for g in dict.fromkeys(gene_ids)]
+        deadline = None if budget_seconds is None else time.monotonic() + budget_seconds
+        # prazo em relógio de parede para os processos do pool
+        worker_deadline = None if budget_seconds is None else time.time() + budget_seconds
+        growth = {}
+
+        if self.processes == 1 or len(gene_ids) <= 1:
+            # sem pool: knockouts em sequência no próprio modelo (mesmo warm start)
+            with self._lock:
+                for gene_id in gene_ids:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        break
+                    growth[gene_id] = _knockout(self.model, gene_id)
+        else:
+            pool = self._get_pool()
+            chunk = max(1, math.ceil(len(gene_ids) / (self.processes * 4)))
+            pending = {
+                pool.submit(_knockout_chunk, gene_ids[i:i + chunk], worker_deadline)
+                for i in range(0, len(gene_ids), chunk)
+            }
+            while pending:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    growth.update(future.result())
+                if not done:
+                    break
+            # só cancela blocos ainda na fila; os em execução param sozinhos no prazo
+            for future in pending:
+                future.cancel()
+
+        missing = [g for g in gene_ids if g not in growth]
+        return {"growth": growth, "complete": not missing, "pending": missing}
+
+
+def get_flux_engine(model, processes, model_path=None):
+    """
+    Motor do modelo, criado na primeira chamada e reaproveitado enquanto o modelo existir.
+    `model_path` é o arquivo de onde o modelo foi lido; sem ele o modelo é serializado
+    para cada processo do pool.
+    """
+    engine = _engines.get(model)
+    if engine is None:
+        with _engine_lock:
+            engine = _engines.get(model)
+            if engine is None:
+                engine = FluxEngine(model, processes, model_path)
+                _engines[model] = engine
+    return engine
+
+
+def release_flux_engine(model):
+    """
+    Aposenta o motor do modelo (ex.: modelo descarregado pelo registro): o pool é encerrado
+    assim que nenhuma requisição estiver usando o motor.
+    """
+    with _engine_lock:
+        engine = _engines.pop(model, None)
+    if engine is not None:
+        engine.retire()
+
+
+@atexit.register
+def _shutdown_engines():
+    for engine in list(_engines.values()):
+        engine.shutdown()
@@ -0,0 +1,93 @@
+"""
+Ranking de genes a partir de fenótipos (nomes HPO) encontrados no texto do paciente.
+
+Índice invertido fenótipo -> genes (pgs.genes2phen, via snapshot de fenótipos) em arrays
+CSR. Cada fenótipo tem peso IDF, log(1 + N / nº de genes do fenótipo): fenótipos raros,
+associados a poucos genes, pesam mais que fenótipos genéricos. O score de um gene é a
+soma dos pesos dos fenótipos de entrada associados a ele, e os k melhores são escolhidos
+com heap; a evidência (fenótipos e pesos) só é montada para esses k genes.
+"""
+import heapq
+
+import numpy as np
+
+from api.services.phenotype_matcher import term_key
+
+
+class GeneRanking:
+
+    def __init__(self, genes, terms, indptr, gene_idx, idf):
+        self.genes = genes          # símbolos, em ordem alfabética
+        self.terms = terms          # nomes dos fenótipos
+        self.indptr = indptr        # fenótipo t -> gene_idx[indptr[t]:indptr[t + 1]]
+        self.gene_idx = gene_idx
+        self.idf = idf
+        self.term_pos = {}
+        for i, term in enumerate(terms):
+            self.term_pos.setdefault(term_key(term), i)
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """`pairs`: (símbolo do gene, nome do fenótipo)."""
+        by_term = {}
+        for symbol, term in pairs:
+            by_term.setdefault(term, set()).add(symbol)
+        genes = sorted({s for symbols in by_term.values() for s in symbols})
+        gene_pos = {g: i for i, g in enumerate(genes)}
+        terms = sorted(by_term)
+
+        postings = [sorted(gene_pos[s] for s in by_term[t]) for t in terms]
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(p) for p in postings], out=indptr[1:])
+        gene_idx = np.fromiter((g for p in postings for g in p), dtype=np.int32, count=int(indptr[-1]))
+        df = np.diff(indptr)
+        idf = np.log1p(len(genes) / np.maximum(df, 1))
+        return cls(genes, terms, indptr, gene_idx, idf)
+
+    @classmethod
+    def from_phenotype_index(cls, phenotype_index, extra_pairs=()):
+        pairs = [(s, n) for s, names in phenotype_index.phenotypes.items() for n in names]
+        return cls.from_pairs([*pairs, *extra_pairs])
+
+    def term_index(self, phenotype):
+        return self.term_pos.get(term_key(phenotype))
+
+    def rank(self, phenotypes, top_k=20):
+        """
+        Retorna {"genes": [{gene, score, evidence: [{phenotype, weight}]}], "unknown": [...]},
+        com os genes em ordem decrescente de score (empates pela ordem alfabética).
+        """
+        idxs, unknown = [], []
+        for p in dict.fromkeys(phenotypes):
+            t = self.term_index(p)
+            if t is None:
+                unknown.append(p)
+            elif t not in idxs:
+                idxs.append(t)
+        if not idxs or top_k <= 0:
+            return {"genes": [], "unknown": unknown}
+
+        postings = [self.gene_idx[self.indptr[t]:self.indptr[t + 1]] for t in idxs]
+        hits = np.concatenate(postings)
+        weights = np.repeat(self.idf[idxs], [len(p) for p in postings])
+        scores = np.bincount(hits, weights=weights, minlength=len(self.genes))
+        candidates = np.unique(hits).tolist()
+        top = heapq.nlargest(top_k, candidates, key=lambda g: (scores[g], -g))
+
+        evidence = {g: [] for g in top}
+        top_arr = np.asarray(top, dtype=np.int32)
+        for t, posting in zip(idxs, postings):
+            for g in posting[np.isin(posting, top_arr)].tolist():
+                evidence[g].append({"phenotype": self.terms[t], "weight": round(float(self.idf[t]), 4)})
+
+        return {
+            "genes": [
+                {
+                    "gene": self.genes[g],
+                    "score": round(float(scores[g]), 4),
+                    "evidence": sorted(evidence[g], key=lambda e: (-e["weight"], e["phenotype"])),
+                }
+                for g in top
+            ],
+            "unknown": unknown,
+        }
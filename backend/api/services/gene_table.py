@@ -0,0 +1,135 @@
+"""
+Tabela de genes (genes.tsv) em formato compacto, indexada por vários identificadores.
+
+Cada coluna é um array de códigos int32 apontando para um pool de strings internadas
+(-1 = vazio), em vez de um dict por gene. Índices reversos resolvem símbolo, Entrez,
+UniProt e aliases (campos separados por ";") para as linhas correspondentes.
+A tabela já montada é gravada em pickle, identificada pelo sha256 do TSV, para que as
+próximas inicializações não precisem reler o arquivo.
+"""
+import csv
+import os
+import pickle
+import sys
+
+import numpy as np
+
+from api.services.utils.hashing import file_sha256
+
+FORMAT_VERSION = 1
+
+# colunas devolvidas por get(), no mesmo formato do antigo dicionário de genes
+INFO_COLUMNS = ("geneSymbols", "geneNames", "compartments")
+INDEXED_COLUMNS = ("geneSymbols", "geneEntrezID", "geneUniProtID", "geneAliases")
+
+
+class GeneTable:
+
+    def __init__(self, columns, pool, codes, indexes=None):
+        self.columns = tuple(columns)          # a primeira coluna é o ID Ensembl
+        self.pool = pool                       # strings internadas
+        self.codes = codes                     # {coluna: np.int32[n_genes]}
+        self.row_of = {pool[c]: i for i, c in enumerate(codes[self.columns[0]].tolist())}
+        self.indexes = indexes or {column: self._build_index(column) for column in INDEXED_COLUMNS}
+
+    def _build_index(self, column):
+        index = {}
+        for row, code in enumerate(self.codes[column].tolist()):
+            if code < 0:
+                continue
+            for key in self.pool[code].split(";"):
+                key = key.strip()
+                if key:
+                    index.setdefault(key, []).append(row)
+        return {key: tuple(rows) for key, rows in index.items()}
+
+    def __len__(self):
+        return len(self.row_of)
+
+    def __contains__(self, gene_id):
+        return gene_id in self.row_of
+
+    def value(self, row, column):
+        code = self.codes[column][row]
+        return None if code < 0 else self.pool[code]
+
+    def record(self, gene_id, columns=None):
+        """Campos do gene (todas as colunas por padrão), ou None se o gene não existir."""
+        row = self.row_of.get(gene_id)
+        if row is None:
+            return None
+        return {column: self.value(row, column) for column in (columns or self.columns[1:])}
+
+    def get(self, gene_id, default=None):
+        """{geneSymbols, geneNames, compartments} do gene Ensembl; campos vazios são None."""
+        info = self.record(gene_id, INFO_COLUMNS)
+        return default if info is None else info
+
+    def lookup(self, key, column="geneSymbols"):
+        """IDs Ensembl cujo campo `column` contém `key`."""
+        rows = self.indexes[column].get(key, ())
+        ids = self.codes[self.columns[0]]
+        return [self.pool[ids[row]] for row in rows]
+
+    def resolve(self, identifier):
+        """
+        IDs Ensembl para um identificador qualquer: Ensembl, símbolo, Entrez, UniProt ou
+        alias, nessa ordem de preferência.
+        """
+        if identifier in self.row_of:
+            return [identifier]
+        for column in INDEXED_COLUMNS:
+            found = self.lookup(identifier, column)
+            if found:
+                return found
+        return []
+
+
+def parse_tsv(path):
+    pool, interned = [], {}
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter="\t")
+        columns = next(reader)
+        codes = {column: [] for column in columns}
+        for line in reader:
+            for column, value in zip(columns, line):
+                value = value.strip()
+                if not value:
+                    codes[column].append(-1)
+                    continue
+                code = interned.get(value)
+                if code is None:
+                    code = interned[value] = len(pool)
+                    pool.append(sys.intern(value))
+                codes[column].append(code)
+    return GeneTable(columns, pool, {c: np.asarray(v, dtype=np.int32) for c, v in codes.items()})
+
+
+def cache_path(cache_dir, sha256):
+    return os.path.join(cache_dir, f"genes.{sha256[:16]}.v{FORMAT_VERSION}.pkl")
+
+
+def load_gene_table(tsv_path, cache_dir):
+    """
+    Carrega a tabela do cache binário se ele corresponder ao TSV atual; senão lê o TSV
+    e grava o cache (falhas de escrita só são avisadas).
+    """
+    path = cache_path(cache_dir, file_sha256(tsv_path))
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                columns, pool, codes, indexes = pickle.load(f)
+            return GeneTable(columns, [sys.intern(s) for s in pool], codes, indexes)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError) as e:
+            print(f"Cache da tabela de genes inválido ({e}); relendo {tsv_path}")
+
+    table = parse_tsv(tsv_path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((table.columns, table.pool, table.codes, table.indexes), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Não foi possível gravar o cache da tabela de genes: {e}")
+    return table
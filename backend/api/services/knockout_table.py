@@ -0,0 +1,112 @@
+"""
+Tabela de knockouts de genes calculada offline (ver build_knockout_table).
+
+O crescimento após o knockout de cada gene depende só do modelo, então é calculado uma
+vez para todos os genes e gravado em `<diretório>/<sha256 do modelo>/`:
+    manifest.json  -> versão do modelo, biomass base, nº de genes
+    gene_ids.json  -> ordem dos genes
+    growth.npy     -> crescimento por gene (NaN = não calculado), lido com mmap
+Durante o cálculo cada bloco é salvo em chunks/ para permitir retomar de onde parou.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+
+from api.services.flux_engine import FluxEngine
+
+
+class KnockoutTable:
+
+    def __init__(self, gene_ids, growth, base_biomass, model_sha256):
+        self.gene_ids = gene_ids
+        self.growth = growth
+        self.base_biomass = base_biomass
+        self.model_sha256 = model_sha256
+        self.gene_pos = {g: i for i, g in enumerate(gene_ids)}
+
+    def get(self, gene_id):
+        """Crescimento após o knockout do gene, ou None se o gene não estiver na tabela."""
+        i = self.gene_pos.get(gene_id)
+        if i is None:
+            return None
+        value = self.growth[i]
+        return None if np.isnan(value) else float(value)
+
+
+def table_path(directory, model_sha256):
+    return os.path.join(directory, model_sha256)
+
+
+def open_table(directory, model_sha256):
+    """Abre a tabela da versão do modelo; None se ainda não foi gerada."""
+    path = table_path(directory, model_sha256)
+    manifest_path = os.path.join(path, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    with open(os.path.join(path, "gene_ids.json")) as f:
+        gene_ids = json.load(f)
+    growth = np.load(os.path.join(path, "growth.npy"), mmap_mode="r")
+    return KnockoutTable(gene_ids, growth, manifest["base_biomass"], manifest["model_sha256"])
+
+
+def build_table(model, directory, model_sha256, processes, chunk_size=200, log=print, model_path=None):
+    """
+    Calcula o knockout de todos os genes do modelo em blocos, salvando um checkpoint por
+    bloco. Blocos já salvos (execução anterior interrompida) não são recalculados.
+    `model_path` (arquivo do modelo) evita serializar o modelo para cada processo do pool.
+    """
+    path = table_path(directory, model_sha256)
+    chunks_dir = os.path.join(path, "chunks")
+    os.makedirs(chunks_dir, exist_ok=True)
+
+    gene_ids = [g.id for g in model.genes]
+
+    # checkpoints só valem para o mesmo tamanho de bloco e a mesma lista de genes
+    params = {"chunk_size": chunk_size, "genes": len(gene_ids)}
+    params_path = os.path.join(chunks_dir, "params.json")
+    if os.path.exists(params_path):
+        with open(params_path) as f:
+            if json.load(f) != params:
+                log("Checkpoints de outra configuração; recomeçando")
+                shutil.rmtree(chunks_dir)
+                os.makedirs(chunks_dir)
+    with open(params_path, "w") as f:
+        json.dump(params, f)
+
+    engine = FluxEngine(model, processes, model_path)
+    try:
+        base_biomass = engine.base_objective()
+        for start in range(0, len(gene_ids), chunk_size):
+            chunk_file = os.path.join(chunks_dir, f"{start:08d}.npy")
+            if os.path.exists(chunk_file):
+                continue
+            chunk = gene_ids[start:start + chunk_size]
+            growth = engine.knockouts(chunk)["growth"]
+            tmp = f"{chunk_file}.tmp.npy"
+            np.save(tmp, np.array([growth[g] for g in chunk], dtype=np.float64))
+            os.replace(tmp, chunk_file)
+            log(f"{min(start + chunk_size, len(gene_ids))}/{len(gene_ids)} genes")
+    finally:
+        engine.shutdown()
+
+    growth = np.concatenate([
+        np.load(os.path.join(chunks_dir, f"{start:08d}.npy"))
+        for start in range(0, len(gene_ids), chunk_size)
+    ]) if gene_ids else np.zeros(0, dtype=np.float64)
+    np.save(os.path.join(path, "growth.npy"), growth)
+    with open(os.path.join(path, "gene_ids.json"), "w") as f:
+        json.dump(gene_ids, f)
+    # o manifest é gravado por último: sem ele a tabela não é considerada pronta
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump({
+            "model_sha256": model_sha256,
+            "base_biomass": base_biomass,
+            "genes": len(gene_ids),
+            "chunk_size": chunk_size,
+        }, f, indent=2)
+    shutil.rmtree(chunks_dir, ignore_errors=True)
+    return open_table(directory, model_sha256)
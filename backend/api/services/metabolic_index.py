@@ -0,0 +1,237 @@
+"""
+Índice esparso gene–reação–metabólito, construído uma única vez por modelo.
+
+Substitui a travessia de objetos do COBRApy (gene -> reações -> metabólitos ->
+reações -> genes) por produtos de matrizes CSR sobre IDs inteiros.
+"""
+import threading
+import weakref
+
+import numpy as np
+from scipy import sparse
+
+from api.services.metabolite_filter import default_filter
+
+_index_lock = threading.Lock()
+_index_cache = weakref.WeakKeyDictionary()
+
+
+def _binary_csr(rows, cols, shape):
+    m = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=shape
+    )
+    m.sum_duplicates()
+    m.data[:] = 1
+    return m
+
+
+class MetabolicIndex:
+    """
+    Topologia do modelo em matrizes esparsas:
+        gene_rxn: genes x reações (binária)
+        rxn_met:  reações x metabólitos (binária)
+        met_gene: metabólitos x genes (binária) = (gene_rxn @ rxn_met).T
+    """
+
+    def __init__(self, gene_ids, met_ids, rxn_ids, rxn_subsystems, rxn_names, met_names,
+                 gene_rxn, rxn_met, met_gene, met_excluded, rxn_label, source_sha256=None):
+        # IDs e nomes podem ser listas ou StringTable (memory-mapped), ambos indexáveis por inteiro
+        self.gene_ids = gene_ids
+        self.met_ids = met_ids
+        self.rxn_ids = rxn_ids
+        self.rxn_subsystems = rxn_subsystems
+        self.rxn_names = rxn_names
+        self.met_names = met_names
+        self.gene_pos = {g: i for i, g in enumerate(self.gene_ids)}
+        self._met_pos = None
+        self.source_sha256 = source_sha256
+
+        self.gene_rxn = gene_rxn
+        self.rxn_met = rxn_met
+        self.met_gene = met_gene
+        self.met_excluded = met_excluded
+        self.rxn_label = rxn_label
+        self.n_labels = max(1, int(rxn_label.max()) + 1) if len(rxn_label) else 1
+
+        # Número de genes distintos que tocam cada metabólito; promíscuos ficam com peso zero
+        self.met_gene_count = np.diff(self.met_gene.indptr)
+        self.met_weight = np.zeros(len(self.met_ids), dtype=np.float64)
+        scored = ~self.met_excluded & (self.met_gene_count > 0)
+        self.met_weight[scored] = 1.0 / self.met_gene_count[scored]
+
+    @property
+    def met_pos(self):
+        if self._met_pos is None:
+            self._met_pos = {m: i for i, m in enumerate(self.met_ids)}
+        return self._met_pos
+
+    @classmethod
+    def from_model(cls, model, met_filter=None, source_sha256=None):
+        """
+        Percorre o modelo COBRApy uma única vez para montar as matrizes.
+        `met_filter` (MetaboliteFilter; padrão: settings) define os metabólitos promíscuos.
+        """
+        gene_ids = [g.id for g in model.genes]
+        met_ids = [m.id for m in model.metabolites]
+        met_names = [m.name for m in model.metabolites]
+        gene_pos = {g: i for i, g in enumerate(gene_ids)}
+        met_pos = {m: i for i, m in enumerate(met_ids)}
+
+        gr_rows, gr_cols, rm_rows, rm_cols = [], [], [], []
+        subsystems, names, rxn_ids = [], [], []
+        for r_idx, rxn in enumerate(model.reactions):
+            rxn_ids.append(rxn.id)
+            subsystems.append(rxn.subsystem)
+            names.append(rxn.name)
+            for gene in rxn.genes:
+                gr_rows.append(gene_pos[gene.id])
+                gr_cols.append(r_idx)
+            for met in rxn.metabolites:
+                rm_rows.append(r_idx)
+                rm_cols.append(met_pos[met.id])
+
+        n_genes, n_mets, n_rxns = len(gene_ids), len(met_ids), len(rxn_ids)
+        gene_rxn = _binary_csr(gr_rows, gr_cols, (n_genes, n_rxns))
+        rxn_met = _binary_csr(rm_rows, rm_cols, (n_rxns, n_mets))
+        gene_met = gene_rxn.astype(np.int32) @ rxn_met.astype(np.int32)
+        gene_met.data[:] = 1
+        met_gene = gene_met.T.tocsr().astype(np.int8)
+        met_gene.sort_indices()
+
+        met_filter = met_filter or default_filter()
+        met_degree = np.bincount(rxn_met.indices, minlength=n_mets)
+        met_excluded = met_filter.mask(met_ids, met_names, met_degree)
+
+        # Reações com o mesmo (subsystem, name) geram a mesma evidência textual
+        labels = {}
+        rxn_label = np.fromiter(
+            (labels.setdefault((s, n), len(labels)) for s, n in zip(subsystems, names)),
+            dtype=np.int64, count=n_rxns,
+        )
+        return cls(
+            gene_ids, met_ids, rxn_ids, subsystems, names, met_names,
+            gene_rxn, rxn_met, met_gene, met_excluded, rxn_label, source_sha256,
+        )
+
+    def _target_pairs(self, gene_idx):
+        """Pares (metabólito, reação) das reações do gene, sem promíscuos e sem evidências repetidas."""
+        start, end = self.gene_rxn.indptr[gene_idx], self.gene_rxn.indptr[gene_idx + 1]
+        rxns = self.gene_rxn.indices[start:end]
+        pairs = self.rxn_met[rxns].tocoo()
+        keep = ~self.met_excluded[pairs.col]
+        pair_met = pairs.col[keep]
+        pair_rxn = rxns[pairs.row[keep]]
+
+        # Uma evidência por (metabólito, subsystem, name), como no conjunto de strings original
+        _, first = np.unique(pair_met * self.n_labels + self.rxn_label[pair_rxn], return_index=True)
+        first.sort()
+        return pair_met[first], pair_rxn[first]
+
+    def evidence_many(self, gene_idxs):
+        """
+        Evidências de vizinhança de vários genes em um único produto esparso.
+        Retorna arrays (alvo, vizinho, metabólito, reação), onde `alvo` é a posição em
+        `gene_idxs` e a reação é a do gene de entrada que contém o metabólito compartilhado.
+        """
+        gene_idxs = np.asarray(gene_idxs, dtype=np.int64)
+        targets, mets, rxns = [], [], []
+        for t, gene_idx in enumerate(gene_idxs):
+            pair_met, pair_rxn = self._target_pairs(gene_idx)
+            targets.append(np.full(len(pair_met), t, dtype=np.int64))
+            mets.append(pair_met)
+            rxns.append(pair_rxn)
+        pair_target = np.concatenate(targets) if targets else np.zeros(0, dtype=np.int64)
+        pair_met = np.concatenate(mets) if mets else np.zeros(0, dtype=np.int64)
+        pair_rxn = np.concatenate(rxns) if rxns else np.zeros(0, dtype=np.int64)
+
+        # Cada par (reação, metabólito) vira uma linha; o produto com met_gene expande os vizinhos
+        n_pairs = len(pair_met)
+        selector = sparse.csr_matrix(
+            (np.ones(n_pairs, dtype=np.int32), (np.arange(n_pairs), pair_met)),
+            shape=(n_pairs, len(self.met_ids)),
+        )
+        hits = (selector @ self.met_gene).tocoo()
+        hit_target = pair_target[hits.row]
+        not_self = hits.col != gene_idxs[hit_target]
+        rows = hits.row[not_self]
+        return hit_target[not_self], hits.col[not_self], pair_met[rows], pair_rxn[rows]
+
+    def evidence_between(self, pairs):
+        """
+        Evidências de pares (gene, vizinho) em arrays inteiros: {(gene, vizinho): (metabólitos, reações)}.
+        As evidências de cada gene de origem vêm de um único evidence_many.
+        """
+        pairs = set(pairs)
+        if not pairs:
+            return {}
+        sources = np.array(sorted({a for a, _ in pairs}), dtype=np.int64)
+        targets, neighbors, mets, rxns = self.evidence_many(sources)
+        n_genes = len(self.gene_ids)
+        keys = sources[targets] * n_genes + neighbors
+        wanted = np.array(sorted(a * n_genes + b for a, b in pairs), dtype=np.int64)
+        keep = np.isin(keys, wanted)
+        keys, mets, rxns = keys[keep], mets[keep], rxns[keep]
+        order = np.argsort(keys, kind="stable")
+        keys, mets, rxns = keys[order], mets[order], rxns[order]
+        unique, starts = np.unique(keys, return_index=True)
+        bounds = np.append(starts, len(keys))
+        out = {pair: (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)) for pair in pairs}
+        for key, start, end in zip(unique, bounds[:-1], bounds[1:]):
+            out[divmod(int(key), n_genes)] = (mets[start:end], rxns[start:end])
+        return out
+
+    def describe_evidence(self, mets, rxns):
+        """Materializa as strings de evidências (metabólito, reação) já selecionadas."""
+        return [
+            {
+                "metabolite": self.met_ids[m],
+                "metabolite_name": self.met_names[m],
+                "reaction": self.rxn_names[r],
+                "subsystem": self.rxn_subsystems[r],
+            }
+            for m, r in zip(mets, rxns)
+        ]
+
+    def evidence(self, gene_idx):
+        """Evidências de um gene em triplas inteiras (vizinho, metabólito, reação)."""
+        _, neighbors, mets, rxns = self.evidence_many([gene_idx])
+        return neighbors, mets, rxns
+
+    def score_many(self, gene_idxs):
+        """
+        Score de exclusividade para vários genes: soma de 1/nº de genes do metabólito
+        sobre as evidências de cada vizinho. Retorna CSR (alvos x genes).
+        """
+        targets, neighbors, mets, _ = self.evidence_many(gene_idxs)
+        scores = sparse.csr_matrix(
+            (self.met_weight[mets], (targets, neighbors)),
+            shape=(len(gene_idxs), len(self.gene_ids)),
+        )
+        scores.sort_indices()
+        return scores
+
+    def score_neighbors(self, gene_idx):
+        """Retorna (índices dos vizinhos, scores) de um gene, ordenados por índice."""
+        row = self.score_many([gene_idx])
+        return row.indices, row.data
+
+    def shared_map(self, gene_idx):
+        """Mesmo formato de neighbors_by_metabolites: {gene_id: set((met_id, subsystem, name))}."""
+        shared_map = {}
+        for n, m, r in zip(*self.evidence(gene_idx)):
+            shared_map.setdefault(self.gene_ids[n], set()).add(
+                (self.met_ids[m], self.rxn_subsystems[r], self.rxn_names[r])
+            )
+        return shared_map
+
+
+def get_index(model, met_filter=None):
+    """Índice do modelo, construído na primeira chamada e reaproveitado enquanto o modelo existir."""
+    index = _index_cache.get(model)
+    if index is None:
+        with _index_lock:
+            index = _index_cache.get(model)
+            if index is None:
+                index = MetabolicIndex.from_model(model, met_filter)
+                _index_cache[model] = index
+    return index
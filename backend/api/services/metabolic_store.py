@@ -0,0 +1,153 @@
+"""
+Formato compacto, somente leitura, do grafo metabólico.
+
+Cada coluna é um arquivo .npy aberto com mmap: os workers do gunicorn compartilham a
+mesma cópia no page cache do sistema em vez de cada um desserializar o modelo COBRApy.
+Strings (IDs, subsystems, nomes) ficam em um blob UTF-8 + array de offsets.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+from scipy import sparse
+
+from api.services.metabolic_index import MetabolicIndex
+from api.services.metabolite_filter import default_filter, pack, unpack
+from api.services.utils.hashing import file_sha256
+
+FORMAT_VERSION = 2
+
+_MATRICES = ("gene_rxn", "rxn_met", "met_gene")
+_STRINGS = ("gene_ids", "met_ids", "rxn_ids", "rxn_subsystems", "rxn_names", "met_names")
+
+
+class StringTable:
+    """Sequência de strings sobre um blob memory-mapped; decodifica sob demanda."""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return bytes(self.blob[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _write_strings(path, name, values):
+    encoded = [(v or "").encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    np.save(os.path.join(path, f"{name}.offsets.npy"), offsets)
+    with open(os.path.join(path, f"{name}.blob"), "wb") as f:
+        f.write(b"".join(encoded))
+
+
+def _read_strings(path, name):
+    offsets = np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode="r")
+    blob_path = os.path.join(path, f"{name}.blob")
+    if os.path.getsize(blob_path) == 0:
+        blob = np.zeros(0, dtype=np.uint8)
+    else:
+        blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+    return StringTable(offsets, blob)
+
+
+def source_info(model_path):
+    st = os.stat(model_path)
+    return {"sha256": file_sha256(model_path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def export_index(index, path, source=None, met_filter=None):
+    """
+    Grava o índice em `path` (diretório). A escrita é feita em um diretório temporário
+    e trocada no final, para que workers nunca vejam um grafo pela metade.
+    """
+    tmp = f"{path}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    for name in _MATRICES:
+        m = getattr(index, name)
+        np.save(os.path.join(tmp, f"{name}.indptr.npy"), m.indptr.astype(np.int32))
+        np.save(os.path.join(tmp, f"{name}.indices.npy"), m.indices.astype(np.int32))
+        np.save(os.path.join(tmp, f"{name}.data.npy"), m.data.astype(np.int8))
+    np.save(os.path.join(tmp, "met_excluded.bits.npy"), pack(index.met_excluded))
+    np.save(os.path.join(tmp, "rxn_label.npy"), np.asarray(index.rxn_label, dtype=np.int64))
+    for name in _STRINGS:
+        _write_strings(tmp, name, getattr(index, name))
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "source": source,
+        "met_filter": (met_filter or default_filter()).key(),
+        "shapes": {name: list(getattr(index, name).shape) for name in _MATRICES},
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    old = f"{path}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def _is_current(manifest, model_path, met_filter):
+    if manifest.get("format") != FORMAT_VERSION:
+        return False
+    if manifest.get("met_filter") != met_filter.key():
+        return False
+    if not os.path.exists(model_path):
+        # implantação só com o grafo compacto: não há com o que comparar
+        return True
+    source = manifest.get("source") or {}
+    st = os.stat(model_path)
+    if source.get("size") == st.st_size and source.get("mtime_ns") == st.st_mtime_ns:
+        return True
+    return source.get("sha256") == source_info(model_path)["sha256"]
+
+
+def open_index(path, model_path, met_filter=None):
+    """
+    Abre o grafo compacto em modo somente leitura (mmap).
+    Retorna None se não existir ou se estiver desatualizado em relação ao modelo.
+    """
+    manifest_path = os.path.join(path, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if not _is_current(manifest, model_path, met_filter or default_filter()):
+        print(f"Grafo metabólico em {path} está desatualizado; ignorando")
+        return None
+
+    matrices = {}
+    for name in _MATRICES:
+        arrays = [
+            np.load(os.path.join(path, f"{name}.{part}.npy"), mmap_mode="r")
+            for part in ("data", "indices", "indptr")
+        ]
+        matrices[name] = sparse.csr_matrix(tuple(arrays), shape=tuple(manifest["shapes"][name]), copy=False)
+    strings = {name: _read_strings(path, name) for name in _STRINGS}
+
+    return MetabolicIndex(
+        strings["gene_ids"], strings["met_ids"], strings["rxn_ids"],
+        strings["rxn_subsystems"], strings["rxn_names"], strings["met_names"],
+        matrices["gene_rxn"], matrices["rxn_met"], matrices["met_gene"],
+        unpack(np.load(os.path.join(path, "met_excluded.bits.npy")), manifest["shapes"]["rxn_met"][1]),
+        np.load(os.path.join(path, "rxn_label.npy"), mmap_mode="r"),
+        source_sha256=(manifest.get("source") or {}).get("sha256"),
+    )
@@ -0,0 +1,86 @@
+"""
+Metabólitos promíscuos (água, prótons, cofatores...) excluídos da vizinhança.
+
+A exclusão é calculada a partir do próprio modelo: metabólitos com grau (nº de reações)
+acima do percentil PROMISCUOUS_DEGREE_PERCENTILE, mais a lista curada PROMISCUOUS_METS,
+menos os forçados em PROMISCUOUS_METS_KEEP. A lista curada é comparada com o ID, o ID
+sem compartimento (atp[c], atp_c -> atp) e o nome, então vale em todos os compartimentos
+e nas convenções de ID dos diferentes modelos.
+
+O resultado é uma máscara sobre os IDs inteiros dos metabólitos (MetabolicIndex.met_excluded),
+gravada no grafo compacto como bitset (np.packbits).
+"""
+import re
+
+import numpy as np
+from django.conf import settings
+
+# IDs sem compartimento e nomes, em minúsculas
+PROMISCUOUS_METS = frozenset({
+    "h2o", "h", "h+", "o2", "atp", "adp", "amp", "pi", "phosphate", "ppi", "diphosphate",
+    "nad", "nad+", "nadh", "nadp", "nadp+", "nadph", "fad", "fadh2",
+    "gdp", "gtp", "udp", "utp", "ctp", "itp", "co2", "h2o2",
+})
+
+_COMPARTMENT = re.compile(r"(\[[a-z0-9]+\]|_[a-z0-9]{1,2})$")
+
+
+def base_id(met_id):
+    """ID em minúsculas sem o sufixo de compartimento: 'atp[c]' e 'atp_c' -> 'atp'."""
+    return _COMPARTMENT.sub("", met_id.lower())
+
+
+def _split(value):
+    return frozenset(v.strip().lower() for v in (value or "").split(",") if v.strip())
+
+
+class MetaboliteFilter:
+
+    def __init__(self, percentile=99.0, curated=PROMISCUOUS_METS, keep=()):
+        self.percentile = float(percentile)
+        self.curated = frozenset(m.lower() for m in curated)
+        self.keep = frozenset(m.lower() for m in keep)
+
+    def key(self):
+        """Configuração em forma serializável (manifesto do grafo compacto)."""
+        return {
+            "percentile": self.percentile,
+            "curated": sorted(self.curated),
+            "keep": sorted(self.keep),
+        }
+
+    @staticmethod
+    def _matches(names, met_id, met_name):
+        lowered = met_id.lower()
+        return (lowered in names or base_id(met_id) in names
+                or (met_name or "").strip().lower() in names)
+
+    def mask(self, met_ids, met_names, degrees):
+        """Máscara booleana (um item por metabólito) dos metabólitos excluídos."""
+        degrees = np.asarray(degrees)
+        excluded = np.zeros(len(met_ids), dtype=bool)
+        connected = degrees > 0
+        if self.percentile < 100 and connected.any():
+            excluded |= degrees > np.percentile(degrees[connected], self.percentile)
+        for i, (met_id, met_name) in enumerate(zip(met_ids, met_names)):
+            if self._matches(self.curated, met_id, met_name):
+                excluded[i] = True
+            if self.keep and self._matches(self.keep, met_id, met_name):
+                excluded[i] = False
+        return excluded
+
+
+def default_filter():
+    return MetaboliteFilter(
+        settings.PROMISCUOUS_DEGREE_PERCENTILE,
+        PROMISCUOUS_METS | _split(settings.PROMISCUOUS_METS_EXTRA),
+        _split(settings.PROMISCUOUS_METS_KEEP),
+    )
+
+
+def pack(mask):
+    return np.packbits(np.asarray(mask, dtype=bool), bitorder="little")
+
+
+def unpack(bits, count):
+    return np.unpackbits(np.asarray(bits), count=count, bitorder="little").astype(bool)
@@ -0,0 +1,137 @@
+"""
+Métricas da predição por processo: tempo de cada etapa e contadores.
+
+    with metrics.stage("diseases"):
+        ...
+
+Cada etapa alimenta um histograma (buckets fixos em ms) do processo e, se houver uma
+requisição em andamento (ver api.middleware.ServerTimingMiddleware), os tempos da
+própria requisição, que viram o cabeçalho Server-Timing e uma linha de log em JSON.
+O custo é um perf_counter e um incremento sob lock por etapa.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger("api.prediction")
+
+# limites superiores dos buckets, em ms (o último bucket é +Inf)
+BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_started_at = time.time()
+
+_request_timings = ContextVar("prediction_request_timings", default=None)
+
+
+class Histogram:
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        # chamado com _lock adquirido
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def to_dict(self):
+        cumulative, buckets = 0, []
+        for bound, n in zip((*BUCKETS_MS, "+Inf"), self.counts):
+            cumulative += n
+            buckets.append({"le": bound, "count": cumulative})
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "mean_ms": round(self.sum_ms / self.count, 3) if self.count else None,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+def observe(name, ms):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(ms)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + ms
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, (time.perf_counter() - start) * 1000)
+
+
+def incr(name, n=1):
+    if n:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def start_request():
+    """Abre a coleta de tempos da requisição atual; retorna o token para finish_request."""
+    return _request_timings.set({})
+
+
+def finish_request(token):
+    """Fecha a coleta e retorna {etapa: ms} da requisição."""
+    timings = _request_timings.get() or {}
+    _request_timings.reset(token)
+    return timings
+
+
+def server_timing_header(timings):
+    return ", ".join(f"{name};dur={ms:.2f}" for name, ms in timings.items())
+
+
+def log_request(method, path, status_code, timings):
+    logger.info(json.dumps({
+        "event": "prediction_timing",
+        "method": method,
+        "path": path,
+        "status": status_code,
+        "pid": os.getpid(),
+        "stages_ms": {name: round(ms, 3) for name, ms in timings.items()},
+    }))
+
+
+def snapshot():
+    with _lock:
+        histograms = {name: h.to_dict() for name, h in sorted(_histograms.items())}
+        counters = dict(sorted(_counters.items()))
+    return {
+        "pid": os.getpid(),
+        "uptime_seconds": round(time.time() - _started_at, 1),
+        "stages": histograms,
+        "counters": counters,
+    }
+
+
+def _after_fork():
+    # cada worker do gunicorn começa com métricas próprias
+    global _lock, _started_at
+    _lock = threading.Lock()
+    _histograms.clear()
+    _counters.clear()
+    _started_at = time.time()
+
+
+os.register_at_fork(after_in_child=_after_fork)
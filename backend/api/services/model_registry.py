@@ -0,0 +1,249 @@
+"""
+Registro dos modelos metabólicos disponíveis (settings.METABOLIC_MODELS).
+
+Cada modelo é identificado pelo nome e pela versão (sha256 do arquivo). Índice e modelo
+COBRApy são carregados sob demanda, um carregamento por vez por modelo, e o arquivo é
+conferido a cada acesso: se mudar, a próxima chamada carrega a nova versão. O registro
+estima a memória de cada modelo carregado e, quando o total passa de
+METABOLIC_MODELS_MEMORY_MB, descarrega os modelos usados há mais tempo.
+"""
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+from cobra import io
+
+from api.services.flux_engine import release_flux_engine
+from api.services.metabolic_index import MetabolicIndex
+from api.services.metabolic_store import open_index
+from api.services.utils.hashing import file_sha256
+
+# sem medida de RSS, o modelo COBRApy ocupa em memória ~4x o tamanho do arquivo
+MODEL_SIZE_FACTOR = 4
+
+
+class UnknownModel(KeyError):
+    pass
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _array_bytes(a):
+    """Bytes de um array em memória; arrays sobre mmap não contam (page cache compartilhado)."""
+    base = a
+    while base is not None:
+        if isinstance(base, np.memmap):
+            return 0
+        base = getattr(base, "base", None)
+    return a.nbytes
+
+
+def index_bytes(index):
+    total = 0
+    for name in ("gene_rxn", "rxn_met", "met_gene"):
+        m = getattr(index, name)
+        total += sum(_array_bytes(a) for a in (m.data, m.indices, m.indptr))
+    for name in ("met_excluded", "rxn_label", "met_gene_count", "met_weight"):
+        total += _array_bytes(np.asarray(getattr(index, name)))
+    for name in ("gene_ids", "met_ids", "rxn_ids", "rxn_subsystems", "rxn_names", "met_names"):
+        values = getattr(index, name)
+        if isinstance(values, list):
+            total += sum(len(v or "") + 49 for v in values)
+    return total
+
+
+def read_model(path):
+    if path.endswith(".pkl"):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    if path.endswith(".json"):
+        return io.load_json_model(path)
+    return io.read_sbml_model(path)
+
+
+class ModelEntry:
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.path = spec["path"]
+        self.graph_dir = spec.get("graph_dir")
+        self.label = spec.get("label") or name
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.index = None
+        self.model = None
+        self.version = None
+        self.stat_key = None
+        self.index_bytes = 0
+        self.model_bytes = 0
+        self.last_used = 0.0
+
+    @property
+    def loaded(self):
+        return self.index is not None or self.model is not None
+
+    @property
+    def estimated_bytes(self):
+        return self.index_bytes + self.model_bytes
+
+    def file_stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+
+class ModelRegistry:
+
+    def __init__(self, specs, default, budget_bytes, met_filter=None):
+        self.entries = {name: ModelEntry(name, spec) for name, spec in specs.items()}
+        self.default = default
+        self.budget_bytes = budget_bytes
+        self.met_filter = met_filter
+        self._lock = threading.Lock()
+
+    def names(self):
+        return list(self.entries)
+
+    def entry(self, name=None):
+        name = name or self.default
+        entry = self.entries.get(name)
+        if entry is None:
+            raise UnknownModel(name)
+        if entry.loaded and entry.stat_key is not None and entry.file_stat() != entry.stat_key:
+            print(f"Modelo {name} mudou no disco; será recarregado")
+            self.unload(name)
+        entry.last_used = time.monotonic()
+        return entry
+
+    def index(self, name=None):
+        entry = self.entry(name)
+        if entry.index is None:
+            with entry.lock:
+                if entry.index is None:
+                    index = None
+                    if entry.graph_dir:
+                        index = open_index(entry.graph_dir, entry.path, self.met_filter)
+                    if index is None:
+                        index = self._build_index(entry)
+                    entry.index_bytes = index_bytes(index)
+                    entry.version = index.source_sha256 or entry.version
+                    entry.stat_key = entry.stat_key or entry.file_stat()
+                    entry.index = index
+            self._enforce_budget(keep=entry.name)
+        return entry.index
+
+    def _build_index(self, entry):
+        # chamado com entry.lock adquirido
+        model = entry.model or self._read_model(entry)
+        return MetabolicIndex.from_model(model, self.met_filter, source_sha256=entry.version)
+
+    def _read_model(self, entry):
+        # chamado com entry.lock adquirido
+        print(f"Carregando modelo {entry.name} de {entry.path}")
+        rss_before = _rss_bytes()
+        model = read_model(entry.path)
+        rss_after = _rss_bytes()
+        measured = rss_after - rss_before if rss_before is not None and rss_after is not None else 0
+        entry.model_bytes = max(measured, 0) or os.path.getsize(entry.path) * MODEL_SIZE_FACTOR
+        entry.stat_key = entry.file_stat()
+        entry.version = file_sha256(entry.path)
+        entry.model = model
+        return model
+
+    def model(self, name=None):
+        entry = self.entry(name)
+        if entry.model is None:
+            with entry.lock:
+                if entry.model is None:
+                    self._read_model(entry)
+            self._enforce_budget(keep=entry.name)
+        return entry.model
+
+    def version(self, name=None):
+        entry = self.entry(name)
+        if entry.version is None:
+            entry.version = self.index(name).source_sha256 or file_sha256(entry.path)
+        return entry.version
+
+    def put(self, name, model, index):
+        """Registra um modelo já carregado (ex.: benchmark_prediction)."""
+        entry = self.entries.get(name)
+        if entry is None:
+            entry = self.entries[name] = ModelEntry(name, {"path": ""})
+        with entry.lock:
+            entry.reset()
+            entry.model, entry.index = model, index
+            entry.version = index.source_sha256
+            entry.index_bytes = index_bytes(index)
+            entry.last_used = time.monotonic()
+
+    def name_of(self, model):
+        for entry in self.entries.values():
+            if entry.model is model:
+                return entry.name
+        return None
+
+    def path_of(self, model):
+        """Arquivo de onde o modelo foi lido, ou None (ex.: registrado com put())."""
+        for entry in self.entries.values():
+            if entry.model is model:
+                return entry.path or None
+        return None
+
+    def unload(self, name):
+        entry = self.entries[name]
+        with entry.lock:
+            if entry.model is not None:
+                release_flux_engine(entry.model)
+            entry.reset()
+
+    def _enforce_budget(self, keep):
+        """Descarrega os modelos menos usados recentemente até caber no orçamento."""
+        with self._lock:
+            while True:
+                loaded = [e for e in self.entries.values() if e.loaded]
+                total = sum(e.estimated_bytes for e in loaded)
+                if total <= self.budget_bytes:
+                    return
+                candidates = sorted((e for e in loaded if e.name != keep), key=lambda e: e.last_used)
+                if not candidates:
+                    print(f"Modelo {keep} sozinho excede o orçamento de memória "
+                          f"({total / 2**20:.0f} MB > {self.budget_bytes / 2**20:.0f} MB)")
+                    return
+                victim = candidates[0]
+                print(f"Descarregando modelo {victim.name} ({victim.estimated_bytes / 2**20:.0f} MB)")
+                self.unload(victim.name)
+
+    def status(self):
+        now = time.monotonic()
+        return {
+            "default": self.default,
+            "budget_mb": round(self.budget_bytes / 2**20, 1),
+            "estimated_mb": round(sum(e.estimated_bytes for e in self.entries.values()) / 2**20, 1),
+            "models": [
+                {
+                    "name": e.name,
+                    "label": e.label,
+                    "version": e.version,
+                    "available": os.path.exists(e.path) or bool(e.graph_dir and os.path.exists(e.graph_dir)),
+                    "index_loaded": e.index is not None,
+                    "model_loaded": e.model is not None,
+                    "estimated_mb": round(e.estimated_bytes / 2**20, 1),
+                    "idle_seconds": round(now - e.last_used, 1) if e.loaded else None,
+                }
+                for e in self.entries.values()
+            ],
+        }
+
@@ -0,0 +1,110 @@
+"""
+Vizinhança metabólica a k passos (k-hop) a partir de um gene.
+
+Busca em largura sobre o grafo gene-gene do índice (vizinhos = genes que compartilham
+metabólitos não promíscuos). Para não explodir no Human-GEM:
+    - o score de um caminho é o produto dos scores de cada passo, normalizados pelo
+      maior score saindo do gene de origem (o melhor vizinho direto vale 1.0);
+    - genes com score abaixo de `min_score` são descartados e não expandidos;
+    - só os `frontier_cap` melhores genes de cada passo são expandidos no passo seguinte;
+    - os vizinhos diretos (one-hop) de cada gene são memorizados por índice;
+    - a partir do segundo passo, a expansão para quando o orçamento de tempo acaba
+      (resultado marcado `truncated`).
+"""
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+_memo_lock = threading.Lock()
+_memos = weakref.WeakKeyDictionary()
+
+# quantos genes da fronteira vão em cada produto esparso (e entre checagens do prazo)
+EXPAND_CHUNK = 64
+
+
+class OneHopMemo:
+    """LRU de vizinhos diretos por gene: gene -> (índices dos vizinhos, scores)."""
+
+    def __init__(self, index, max_entries):
+        self.index = index
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, gene_idxs):
+        out, missing = {}, []
+        with self._lock:
+            for g in gene_idxs:
+                entry = self._entries.get(g)
+                if entry is None:
+                    missing.append(g)
+                else:
+                    self._entries.move_to_end(g)
+                    out[g] = entry
+        if missing:
+            # os vizinhos de todos os genes ausentes saem de um único produto esparso
+            scores = self.index.score_many(missing)
+            with self._lock:
+                for row, g in enumerate(missing):
+                    start, end = scores.indptr[row], scores.indptr[row + 1]
+                    entry = (scores.indices[start:end].copy(), scores.data[start:end].copy())
+                    out[g] = self._entries[g] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return out
+
+
+def get_memo(index, max_entries):
+    memo = _memos.get(index)
+    if memo is None:
+        with _memo_lock:
+            memo = _memos.get(index)
+            if memo is None:
+                memo = _memos[index] = OneHopMemo(index, max_entries)
+    return memo
+
+
+def expand(index, gene_idx, hops, frontier_cap, min_score, budget_seconds, memo):
+    """
+    Retorna (vizinhos, truncated), onde vizinhos é uma lista ordenada por score de
+    {"gene": índice, "hop": distância, "via": gene anterior no melhor caminho,
+     "score": score do caminho, "edge_score": score de exclusividade do último passo}.
+    """
+    deadline = time.monotonic() + budget_seconds
+    best = {gene_idx: {"gene": gene_idx, "hop": 0, "via": None, "score": 1.0, "edge_score": None}}
+    frontier = [gene_idx]
+    truncated = False
+
+    for hop in range(1, hops + 1):
+        discovered = {}
+        for start in range(0, len(frontier), EXPAND_CHUNK):
+            # o primeiro passo (vizinhos diretos) é sempre calculado
+            if hop > 1 and time.monotonic() >= deadline:
+                truncated = True
+                break
+            chunk = frontier[start:start + EXPAND_CHUNK]
+            one_hop = memo.get_many(chunk)
+            for parent in chunk:
+                neighbors, edges = one_hop[parent]
+                if len(edges) == 0:
+                    continue
+                path = best[parent]["score"] * edges / edges.max()
+                for n, score, edge in zip(neighbors.tolist(), path.tolist(), edges.tolist()):
+                    if score < min_score or n in best:
+                        continue
+                    current = discovered.get(n)
+                    if current is None or score > current["score"]:
+                        discovered[n] = {"gene": n, "hop": hop, "via": parent,
+                                         "score": score, "edge_score": edge}
+        best.update(discovered)
+        if truncated or hop == hops:
+            break
+        ranked = sorted(discovered.values(), key=lambda d: (-round(d["score"], 12), d["gene"]))
+        frontier = [d["gene"] for d in ranked[:frontier_cap]]
+        if not frontier:
+            break
+
+    del best[gene_idx]
+    ranked = sorted(best.values(), key=lambda d: (-round(d["score"], 12), d["hop"], d["gene"]))
+    return ranked, truncated
@@ -97,43 +97,126 @@ def extract_text_from_pdf(path: str) -> str:
 
 
 # phenogen/utils/ner_and_inference.py
-"""
 # Componentes para extrair entidades clínicas e mapear para genes.
-# Aqui você pode usar spaCy + regras ou um modelo transformers fine-tuned.
-
-import re
-from typing import List, Dict
-
-# exemplo simples baseado em regras (placeholder)
+# A extração de fenótipos usa o autômato Aho–Corasick de phenotype_matcher sobre os nomes
+# HPO do snapshot de fenótipos (snapshot_phenotypes), os termos de PHENOTYPE_KEYWORDS e os
+# sinônimos em português do dicionário local (build_phenotype_dictionary), que levam ao
+# nome HPO em inglês; o ranking de genes usa o índice invertido fenótipo -> genes de gene_ranking.
+import threading
+from typing import Dict, List
+
+from django.conf import settings
+
+from api.services.extraction_cache import extract_text, get_extraction_cache, local_path
+from api.services.gene_ranking import GeneRanking
+from api.services.pdf_engine import resolve_backend
+from api.services.phenotype_dictionary import get_phenotype_dictionary
+from api.services.phenotype_index import get_phenotype_index
+from api.services.phenotype_matcher import load_matcher
+from api.services.utils.hashing import file_sha256
+
+# termos curados (português) -> genes candidatos
 PHENOTYPE_KEYWORDS = {
-    'glicemia elevada': ['GCK','HNF1A','HNF4A'],
-    'hemoglobina glicada elevada': ['GCK','HNF1A'],
+    'glicemia elevada': ['GCK', 'HNF1A', 'HNF4A'],
+    'hemoglobina glicada elevada': ['GCK', 'HNF1A'],
 }
 
+_engines_lock = threading.Lock()
+_engines = None
+_engines_version = None
+
+
+def phenotype_terms(phenotype_index=None, dictionary=None):
+    """Pares (termo, nome canônico) do dicionário de fenótipos."""
+    terms = [(k, k) for k in PHENOTYPE_KEYWORDS]
+    if phenotype_index is not None:
+        names = {n for names in phenotype_index.phenotypes.values() for n in names}
+        terms.extend((n, n) for n in sorted(names))
+    if dictionary is not None:
+        terms.extend((en, en) for en in dictionary.en_names.values())
+        terms.extend(dictionary.synonyms())
+    return terms
+
+
+def _keyword_pairs():
+    return [(gene, term) for term, genes in PHENOTYPE_KEYWORDS.items() for gene in genes]
+
+
+def _load_engines():
+    """
+    (matcher, ranking, dicionário) atuais; recriados quando o snapshot de fenótipos ou o
+    dicionário PT/EN mudam.
+    """
+    global _engines, _engines_version
+
+    phenotype_index = get_phenotype_index(settings.PHENOTYPE_SNAPSHOT_PATH,
+                                          settings.PHENOTYPE_SNAPSHOT_CHECK_SECONDS)
+    dictionary = get_phenotype_dictionary()
+    version = (phenotype_index.version if phenotype_index is not None else None,
+               dictionary.version if dictionary is not None else None)
+    if _engines is None or version != _engines_version:
+        with _engines_lock:
+            if _engines is None or version != _engines_version:
+                matcher = load_matcher(phenotype_terms(phenotype_index, dictionary),
+                                       settings.PHENOTYPE_MATCHER_CACHE_DIR)
+                if phenotype_index is not None:
+                    ranking = GeneRanking.from_phenotype_index(phenotype_index, _keyword_pairs())
+                else:
+                    ranking = GeneRanking.from_pairs(_keyword_pairs())
+                _engines, _engines_version = (matcher, ranking, dictionary), version
+    return _engines
+
+
+def get_matcher():
+    return _load_engines()[0]
+
+
+def get_ranking():
+    return _load_engines()[1]
+
+
+def extract_phenotype_matches(text: str) -> List[Dict]:
+    """Ocorrências de fenótipos com posição no texto: [{phenotype, text, start, end}]."""
+    return get_matcher().find(text)
+
 
 def extract_phenotypes(text: str) -> List[str]:
-    text_low = text.lower()
-    found = set()
-    for k in PHENOTYPE_KEYWORDS.keys():
-        if k in text_low:
-            found.add(k)
-    return list(found)
-
-
-def infer_genes_from_phenotypes(phenotypes: List[str]) -> List[Dict]:
-    results = []
-    for p in phenotypes:
-        candidates = PHENOTYPE_KEYWORDS.get(p, [])
-        for gene in candidates:
-            results.append({'gene': gene, 'phenotype': p, 'score': 0.7})
-    # Agregar por gene
-    agg = {}
-    for r in results:
-        g = r['gene']
-        if g not in agg:
-            agg[g] = {'gene': g, 'score': 0.0, 'evidence': []}
-        agg[g]['score'] += r['score']
-        agg[g]['evidence'].append(r['phenotype'])
-    return list(agg.values())
-"""
+    return get_matcher().phenotypes(text)
+
+
+def extract_pdf_phenotype_matches(source) -> List[Dict]:
+    """
+    Ocorrências de fenótipos em um PDF (caminho ou arquivo enviado), com posições no texto
+    das páginas unidas por quebra de linha. Reenvios do mesmo arquivo vêm do cache de
+    extração enquanto o backend de PDF e o matcher não mudarem.
+    """
+    matcher = get_matcher()
+    sha256 = file_sha256(source)
+
+    def compute():
+        with local_path(source) as path:
+            return matcher.find(extract_text(path, sha256=sha256))
+
+    return get_extraction_cache().cached(
+        "phenotypes", sha256, (resolve_backend(), matcher.version), compute,
+    )
+
+
+def translate_phenotype(term: str, target: str = "en") -> str:
+    """Nome do fenótipo no idioma `target` pelo dicionário local; o próprio termo se não houver."""
+    dictionary = _load_engines()[2]
+    return (dictionary.translate(term, target) if dictionary is not None else None) or term
+
+
+def rank_genes(phenotypes: List[str], top_k: int = 20) -> Dict:
+    """
+    Top-k genes pelos fenótipos (nomes HPO ou termos em português do dicionário):
+    {"genes": [{gene, score, evidence}], "unknown": [...]}.
+    """
+    ranking = get_ranking()
+    names = [p if ranking.term_index(p) is not None else translate_phenotype(p) for p in phenotypes]
+    return ranking.rank(names, top_k)
+
 
+def infer_genes_from_phenotypes(phenotypes: List[str], top_k: int = 20) -> List[Dict]:
+    return rank_genes(phenotypes, top_k)["genes"]
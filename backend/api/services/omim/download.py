@@ -56,10 +56,10 @@ def g():
 
     return df_final
 
-def h():
-    # Nunca usar para dados sensíveis
-    from deep_translator import GoogleTranslator
-    r = GoogleTranslator(source='pt', target='en').translate("Susceptibilidade à anorexia nervosa")
+def h(term="Susceptibilidade à anorexia nervosa"):
+    # Tradução offline pelo dicionário local (build_phenotype_dictionary): nenhum texto
+    # clínico é enviado a serviços externos; None se o termo não estiver no dicionário
+    from api.services.phenotype_dictionary import translate
+    r = translate(term, target="en")
     print(r)
-
-h()
\ No newline at end of file
+    return r
@@ -0,0 +1,217 @@
+"""
+Extração de texto de PDFs página a página.
+
+    for page_number, text in iter_pages(path):
+        ...
+
+As páginas são entregues por um gerador, sem acumular o documento inteiro: a memória fica
+limitada a algumas páginas mesmo em pacotes de exames com centenas de páginas. Documentos
+com PDF_PARALLEL_MIN_PAGES páginas ou mais são divididos em blocos de PDF_CHUNK_PAGES
+páginas, extraídos por um pool de processos (cada processo abre o arquivo por conta
+própria) com no máximo 2 blocos por processo em andamento; a ordem das páginas é mantida.
+
+O pool é único por processo, criado na primeira extração paralela com o contexto
+"forkserver" (ou "spawn"): os workers do gunicorn usam threads, e um fork de um processo
+com várias threads pode herdar locks travados. No máximo PDF_MAX_PARALLEL_DOCUMENTS
+documentos usam o pool ao mesmo tempo; os demais são extraídos em sequência na própria
+thread.
+
+Backend configurável em PDF_BACKEND: "pymupdf" (padrão) ou "pypdf2". Se a biblioteca do
+backend escolhido não estiver instalada, usa a outra.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+BACKENDS = ("pymupdf", "pypdf2")
+
+_pool_lock = threading.Lock()
+_pool = None
+_document_slots = None
+
+
+class PdfExtractionError(Exception):
+    """PDF ilegível (corrompido, protegido por senha...)."""
+
+
+def _import_backend(name):
+    if name == "pymupdf":
+        try:
+            import pymupdf
+        except ImportError:
+            import fitz as pymupdf
+        return pymupdf
+    if name == "pypdf2":
+        import PyPDF2
+        return PyPDF2
+    raise ValueError(f"Backend de PDF desconhecido: {name}")
+
+
+def resolve_backend(name=None):
+    """Nome do backend disponível: o pedido (ou PDF_BACKEND) e, se faltar a biblioteca, o outro."""
+    name = name or settings.PDF_BACKEND
+    for candidate in (name, *(b for b in BACKENDS if b != name)):
+        try:
+            _import_backend(candidate)
+        except ImportError:
+            continue
+        if candidate != name:
+            print(f"Backend de PDF {name} indisponível; usando {candidate}")
+        return candidate
+    raise ImportError("Nenhuma biblioteca de PDF instalada (pymupdf ou PyPDF2)")
+
+
+class _Document:
+    """Acesso mínimo e uniforme aos backends: nº de páginas e texto de uma página."""
+
+    def __init__(self, path, backend):
+        self.backend = backend
+        lib = _import_backend(backend)
+        try:
+            if backend == "pymupdf":
+                self._doc = lib.open(path)
+                self.page_count = self._doc.page_count
+            else:
+                self._doc = lib.PdfReader(path)
+                self.page_count = len(self._doc.pages)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            raise PdfExtractionError(f"Não foi possível abrir {path}: {e}") from e
+
+    def page_text(self, i):
+        try:
+            if self.backend == "pymupdf":
+                return self._doc.load_page(i).get_text("text") or ""
+            return self._doc.pages[i].extract_text() or ""
+        except Exception as e:
+            raise PdfExtractionError(f"Não foi possível ler a página {i + 1}: {e}") from e
+
+    def close(self):
+        if self.backend == "pymupdf":
+            self._doc.close()
+        self._doc = None
+
+
+def page_count(path, backend=None):
+    doc = _Document(path, resolve_backend(backend))
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+def _extract_range(path, backend, start, end):
+    # executado nos processos do pool
+    doc = _Document(path, backend)
+    try:
+        return [doc.page_text(i) for i in range(start, min(end, doc.page_count))]
+    finally:
+        doc.close()
+
+
+def _iter_serial(doc):
+    for i in range(doc.page_count):
+        yield i + 1, doc.page_text(i)
+
+
+def _get_pool():
+    """(pool, semáforo de documentos), criados na primeira chamada."""
+    global _pool, _document_slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                _document_slots = threading.BoundedSemaphore(max(1, settings.PDF_MAX_PARALLEL_DOCUMENTS))
+                _pool = ProcessPoolExecutor(
+                    max_workers=max(1, settings.PDF_PROCESSES),
+                    mp_context=multiprocessing.get_context(method),
+                )
+    return _pool, _document_slots
+
+
+def _reset_pool(pool):
+    # pool quebrado (worker morto): o próximo documento cria outro
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _iter_parallel(pool, path, backend, n_pages, chunk_pages):
+    ranges = deque((start, start + chunk_pages) for start in range(0, n_pages, chunk_pages))
+    in_flight = 2 * max(1, settings.PDF_PROCESSES)
+    pending = deque()
+    try:
+        while ranges or pending:
+            # no máximo 2 blocos por processo em andamento: memória limitada
+            while ranges and len(pending) < in_flight:
+                start, end = ranges.popleft()
+                pending.append((start, pool.submit(_extract_range, path, backend, start, end)))
+            start, future = pending.popleft()
+            for offset, text in enumerate(future.result()):
+                yield start + offset + 1, text
+    except BrokenProcessPool as e:
+        _reset_pool(pool)
+        raise PdfExtractionError(f"Falha no pool de extração de PDF: {e}") from e
+    finally:
+        # leitura interrompida: blocos ainda na fila são cancelados; os que já estão em
+        # execução terminam (um bloco é pequeno) e o resultado é descartado
+        for _, future in pending:
+            future.cancel()
+
+
+def iter_pages(path, backend=None, processes=None, chunk_pages=None, parallel_min_pages=None):
+    """
+    Gera (nº da página a partir de 1, texto) em ordem. `processes` > 1 ativa o pool
+    compartilhado (PDF_PROCESSES workers) para documentos com pelo menos
+    `parallel_min_pages` páginas, se houver vaga entre os documentos em paralelo; `processes`
+    = 1 força a extração sequencial. Levanta FileNotFoundError ou PdfExtractionError.
+    """
+    backend = resolve_backend(backend)
+    if processes is None:
+        processes = settings.PDF_PROCESSES
+    if chunk_pages is None:
+        chunk_pages = settings.PDF_CHUNK_PAGES
+    if parallel_min_pages is None:
+        parallel_min_pages = settings.PDF_PARALLEL_MIN_PAGES
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    doc = _Document(path, backend)
+    try:
+        n_pages = doc.page_count
+        if processes > 1 and n_pages >= parallel_min_pages:
+            pool, slots = _get_pool()
+            if slots.acquire(blocking=False):
+                try:
+                    doc.close()
+                    doc = None
+                    yield from _iter_parallel(pool, path, backend, n_pages, max(1, chunk_pages))
+                finally:
+                    slots.release()
+                return
+        yield from _iter_serial(doc)
+    finally:
+        if doc is not None:
+            doc.close()
+
+
+def extract_text(path, separator="\n", skip_empty=True, **options):
+    """Texto do documento inteiro (para quem precisa de uma única string)."""
+    return separator.join(
+        text for _, text in iter_pages(path, **options) if text or not skip_empty
+    )
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
@@ -1,15 +1,9 @@
-import pymupdf as fitz
-from typing import List
+from api.services.extraction_cache import extract_text
 
 
 def extract_text_from_pdf(path: str) -> str:
-    doc = fitz.open(path)
-    parts = []
-    for page in doc:
-        text = page.get_text()
-        if text:
-            parts.append(text)
-    return "\n".join(parts)
+    # páginas sem texto são omitidas; reenvios do mesmo arquivo vêm do cache de extração
+    return extract_text(path, separator="\n")
 
 
-# Alternativa com pdfminer.six pode ser adicionada dependendo do PDF
\ No newline at end of file
+# Alternativa com pdfminer.six pode ser adicionada dependendo do PDF
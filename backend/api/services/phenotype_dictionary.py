@@ -0,0 +1,173 @@
+"""
+Dicionário local português <-> inglês de nomes de fenótipos (HPO/OMIM).
+
+Substitui a tradução online (GoogleTranslator) de termos clínicos: o arquivo curado
+(PHENOTYPE_DICTIONARY_SOURCE, TSV) é compilado pelo comando build_phenotype_dictionary em
+um SQLite versionado (sha256 das entradas), e cada processo mantém em memória os mapas
+com chaves normalizadas (minúsculas, sem acentos, ver phenotype_matcher.term_key).
+Nenhum texto do paciente sai do servidor; termos fora do dicionário ficam sem tradução.
+"""
+import csv
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from api.services.phenotype_matcher import term_key
+
+_dictionary_lock = threading.Lock()
+_dictionary_instance = None
+_dictionary_path = None
+_dictionary_stat = None
+_dictionary_checked = None
+
+
+class PhenotypeDictionary:
+
+    def __init__(self, entries, version):
+        self.entries = entries      # [(id, nome em inglês, nome em português)]
+        self.version = version
+        self.pt_to_en = {}
+        self.en_to_pt = {}
+        self.en_names = {}
+        self.pt_names = {}
+        self.ids = {}
+        for term_id, en, pt in entries:
+            en_key, pt_key = term_key(en), term_key(pt)
+            self.pt_to_en.setdefault(pt_key, en)
+            # o primeiro sinônimo em português é o nome preferido na volta EN -> PT
+            self.en_to_pt.setdefault(en_key, pt)
+            self.en_names.setdefault(en_key, en)
+            self.pt_names.setdefault(pt_key, pt)
+            if term_id:
+                self.ids.setdefault(en_key, term_id)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def to_en(self, term):
+        """Nome em inglês de um termo em português (ou já em inglês); None se desconhecido."""
+        key = term_key(term)
+        return self.pt_to_en.get(key) or self.en_names.get(key)
+
+    def to_pt(self, term):
+        """Nome em português de um termo em inglês (ou já em português); None se desconhecido."""
+        key = term_key(term)
+        return self.en_to_pt.get(key) or self.pt_names.get(key)
+
+    def term_id(self, term):
+        en = self.to_en(term)
+        return self.ids.get(term_key(en)) if en else None
+
+    def translate(self, term, target="en"):
+        return self.to_en(term) if target == "en" else self.to_pt(term)
+
+    def synonyms(self):
+        """Pares (termo em português, nome em inglês), para o matcher de fenótipos."""
+        return [(pt, en) for _, en, pt in self.entries]
+
+
+def parse_source(path):
+    """
+    Lê o TSV curado (colunas id, en, pt; sinônimos em português separados por '|';
+    linhas iniciadas por '#' são comentários). Retorna [(id, en, pt)] sem repetições.
+    """
+    entries, seen = [], set()
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = csv.DictReader((line for line in f if not line.startswith("#")), delimiter="\t")
+        for row in rows:
+            en = (row.get("en") or "").strip()
+            if not en:
+                continue
+            term_id = (row.get("id") or "").strip()
+            for pt in (row.get("pt") or "").split("|"):
+                pt = pt.strip()
+                if pt and (en, pt) not in seen:
+                    seen.add((en, pt))
+                    entries.append((term_id, en, pt))
+    return entries
+
+
+def write_dictionary(path, entries, source=None):
+    """Grava o dicionário compilado em `path` (troca atômica do arquivo); retorna a versão."""
+    digest = hashlib.sha256()
+    for row in entries:
+        digest.update("\t".join(row).encode("utf-8") + b"\n")
+    version = digest.hexdigest()
+
+    tmp = f"{path}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript("""
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE terms (term_id TEXT, en TEXT, pt TEXT);
+        """)
+        conn.executemany("INSERT INTO terms VALUES (?, ?, ?)", entries)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("version", version),
+            ("source", source or ""),
+            ("created_at", datetime.now(timezone.utc).isoformat()),
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+    return version
+
+
+def load_dictionary(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+        entries = conn.execute("SELECT term_id, en, pt FROM terms ORDER BY rowid").fetchall()
+    finally:
+        conn.close()
+    return PhenotypeDictionary(entries, version)
+
+
+def get_phenotype_dictionary(path=None, check_seconds=None):
+    """
+    Dicionário compilado em `path` (padrão: PHENOTYPE_DICTIONARY_PATH), ou None se ainda
+    não foi gerado. A cada `check_seconds` confere o arquivo e recarrega se mudou.
+    """
+    global _dictionary_instance, _dictionary_path, _dictionary_stat, _dictionary_checked
+
+    if path is None:
+        path = settings.PHENOTYPE_DICTIONARY_PATH
+    if check_seconds is None:
+        check_seconds = settings.PHENOTYPE_SNAPSHOT_CHECK_SECONDS
+    now = time.monotonic()
+    if path == _dictionary_path and _dictionary_checked is not None and now - _dictionary_checked < check_seconds:
+        return _dictionary_instance
+
+    with _dictionary_lock:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            _dictionary_instance, _dictionary_path, _dictionary_stat = None, path, None
+            _dictionary_checked = now
+            return None
+        stat_key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if stat_key != _dictionary_stat:
+            dictionary = load_dictionary(path)
+            if _dictionary_instance is None or dictionary.version != _dictionary_instance.version:
+                print(f"Dicionário de fenótipos PT/EN carregado: versão {dictionary.version[:12]}")
+            _dictionary_instance, _dictionary_stat = dictionary, stat_key
+        _dictionary_path = path
+        _dictionary_checked = now
+    return _dictionary_instance
+
+
+def translate(term, target="en"):
+    """Tradução offline de um nome de fenótipo; None se o termo não estiver no dicionário."""
+    dictionary = get_phenotype_dictionary()
+    if dictionary is None:
+        return None
+    return dictionary.translate(term, target)
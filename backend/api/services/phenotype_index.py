@@ -0,0 +1,138 @@
+"""
+Snapshot local das tabelas de referência pgs.genes_metab e pgs.genes2phen.
+
+As tabelas mudam poucas vezes por ano: o comando snapshot_phenotypes grava uma cópia em
+SQLite e cada processo mantém em memória o índice gene Ensembl -> símbolo -> nomes HPO
+ordenados. Quando o arquivo do snapshot é substituído, o índice é recarregado sem
+reiniciar os workers, e load_disease_map() responde sem nenhum acesso ao Postgres.
+"""
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+_index_lock = threading.Lock()
+_index_instance = None
+_index_path = None
+_index_stat = None
+_index_checked = None
+
+
+class PhenotypeIndex:
+
+    def __init__(self, gene_symbols, phenotypes, version):
+        self.gene_symbols = gene_symbols      # gene Ensembl -> símbolo
+        self.phenotypes = phenotypes          # símbolo -> tupla de nomes HPO ordenados
+        self.version = version
+
+    def diseases_for_genes(self, gene_ids):
+        """Mesmo formato de disease_db.diseases_for_genes: {símbolo: [nomes HPO]}."""
+        out = {}
+        for gene_id in gene_ids:
+            symbol = self.gene_symbols.get(gene_id)
+            names = self.phenotypes.get(symbol)
+            if names:
+                out[symbol] = list(names)
+        return out
+
+
+def build_snapshot(engine, path):
+    """Copia as tabelas do Postgres para um SQLite em `path` (troca atômica do arquivo)."""
+    with engine.connect() as conn:
+        genes = conn.execute(text(
+            'SELECT genes, "geneSymbols" FROM pgs.genes_metab WHERE "geneSymbols" IS NOT NULL'
+        )).fetchall()
+        phenotypes = conn.execute(text(
+            "SELECT DISTINCT gene_symbol, hpo_name FROM pgs.genes2phen "
+            "WHERE gene_symbol IS NOT NULL AND hpo_name IS NOT NULL"
+        )).fetchall()
+    return write_snapshot(path, genes, phenotypes)
+
+
+def write_snapshot(path, genes, phenotypes):
+    """
+    Grava o snapshot a partir de pares (gene Ensembl, símbolo) e (símbolo, nome HPO).
+    Também usado para fixtures locais (ver prediction_benchmark).
+    """
+    genes = sorted((str(g), str(s)) for g, s in genes)
+    phenotypes = sorted(set((str(s), str(n)) for s, n in phenotypes))
+
+    digest = hashlib.sha256()
+    for row in genes + phenotypes:
+        digest.update("\t".join(row).encode("utf-8") + b"\n")
+    version = digest.hexdigest()
+
+    tmp = f"{path}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript("""
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE genes (gene_id TEXT, gene_symbol TEXT);
+            CREATE TABLE gene_phenotypes (gene_symbol TEXT, hpo_name TEXT);
+        """)
+        conn.executemany("INSERT INTO genes VALUES (?, ?)", genes)
+        conn.executemany("INSERT INTO gene_phenotypes VALUES (?, ?)", phenotypes)
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("version", version),
+            ("created_at", datetime.now(timezone.utc).isoformat()),
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+    return version
+
+
+def load_snapshot(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+        gene_symbols = {
+            sys.intern(g): sys.intern(s)
+            for g, s in conn.execute("SELECT gene_id, gene_symbol FROM genes")
+        }
+        grouped = {}
+        # as linhas já foram gravadas ordenadas por (símbolo, nome)
+        for symbol, name in conn.execute(
+                "SELECT gene_symbol, hpo_name FROM gene_phenotypes ORDER BY rowid"):
+            grouped.setdefault(sys.intern(symbol), []).append(sys.intern(name))
+    finally:
+        conn.close()
+    return PhenotypeIndex(gene_symbols, {s: tuple(n) for s, n in grouped.items()}, version)
+
+
+def get_phenotype_index(path, check_seconds):
+    """
+    Índice do snapshot em `path`, ou None se não houver snapshot.
+    A cada `check_seconds` compara o arquivo (inode, tamanho, mtime) e recarrega se mudou.
+    """
+    global _index_instance, _index_path, _index_stat, _index_checked
+
+    now = time.monotonic()
+    if path == _index_path and _index_checked is not None and now - _index_checked < check_seconds:
+        return _index_instance
+
+    with _index_lock:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            _index_instance, _index_path, _index_stat = None, path, None
+            _index_checked = now
+            return None
+        stat_key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if stat_key != _index_stat:
+            index = load_snapshot(path)
+            if _index_instance is None or index.version != _index_instance.version:
+                print(f"Snapshot de fenótipos carregado: versão {index.version[:12]}")
+            _index_instance, _index_stat = index, stat_key
+        _index_path = path
+        _index_checked = now
+    return _index_instance
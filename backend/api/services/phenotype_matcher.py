@@ -0,0 +1,227 @@
+"""
+Busca de nomes de fenótipos em texto livre (laudos, exames) com um autômato Aho–Corasick.
+
+Os termos (nomes HPO e sinônimos) são compilados uma vez em um autômato de prefixos com
+links de falha; a busca percorre o texto uma única vez, independente do nº de termos.
+Texto e termos passam pela mesma normalização (minúsculas, sem acentos, hífens como
+espaço) e são quebrados em palavras e sinais de pontuação pela mesma regex; o autômato
+transita por palavra, então só há ocorrências em fronteira de palavra e espaços ou
+quebras de linha entre as palavras não importam. Cada ocorrência traz a posição no texto
+original.
+
+O autômato compilado é gravado em pickle, identificado pelo sha256 dos termos, para que
+os workers não precisem recompilá-lo.
+"""
+import hashlib
+import os
+import pickle
+import re
+import unicodedata
+
+FORMAT_VERSION = 1
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+_SEPARATORS = {"-", "_", "/", "‐", "‑", "‒", "–", "—"}
+
+
+class _FoldTable(dict):
+    """
+    Tabela de str.translate preenchida sob demanda: um caractere -> forma normalizada.
+    `irregular` guarda os caracteres cuja forma normalizada não tem exatamente 1 caractere
+    (ligaduras como "ﬁ", marcas combinantes isoladas...), que deslocam as posições.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.irregular = set()
+
+    def __missing__(self, code):
+        ch = chr(code)
+        if ch.isspace() or ch in _SEPARATORS:
+            folded = " "
+        else:
+            folded = "".join(
+                c for c in unicodedata.normalize("NFKD", ch.casefold()) if not unicodedata.combining(c)
+            )
+        if len(folded) != 1:
+            self.irregular.add(ch)
+        self[code] = folded
+        return folded
+
+
+_fold_table = _FoldTable()
+
+
+def normalize_text(text):
+    """
+    Retorna (texto normalizado, posições), onde posições[i] é o índice no texto original
+    do i-ésimo caractere normalizado; None quando os índices coincidem (caso comum).
+    """
+    folded = text.translate(_fold_table)
+    # comparar só os comprimentos não basta: uma ligadura expandida e uma marca removida
+    # se compensam e deslocam as posições entre elas
+    if _fold_table.irregular.isdisjoint(text):
+        return folded, None
+    positions = []
+    for i, ch in enumerate(text):
+        positions.extend([i] * len(_fold_table[ord(ch)]))
+    return folded, positions
+
+
+def tokenize_term(term):
+    return tuple(_TOKEN.findall(term.translate(_fold_table)))
+
+
+def term_key(term):
+    """Chave de comparação de nomes de fenótipos (mesma normalização da busca no texto)."""
+    return " ".join(tokenize_term(term))
+
+
+class PhenotypeMatcher:
+
+    version = None  # sha256 dos termos, definido por load_matcher
+
+    def __init__(self, labels, pattern_label, lengths, goto, fail, out, dict_link):
+        self.labels = labels                # nomes canônicos (ex.: nome HPO)
+        self.pattern_label = pattern_label  # padrão -> índice em labels
+        self.lengths = lengths              # padrão -> nº de palavras
+        self.goto = goto                    # estado -> {palavra: estado}
+        self.fail = fail                    # estado -> estado do maior sufixo próprio
+        self.out = out                      # estado -> padrão que termina nele (ou -1)
+        self.dict_link = dict_link          # estado -> próximo estado com saída pelos links de falha
+
+    @classmethod
+    def build(cls, entries):
+        """`entries`: pares (termo, nome canônico); termos iguais após normalização são unificados."""
+        labels, label_pos = [], {}
+        patterns = {}
+        for term, label in entries:
+            key = tokenize_term(term)
+            if not key or key in patterns:
+                continue
+            if label not in label_pos:
+                label_pos[label] = len(labels)
+                labels.append(label)
+            patterns[key] = label_pos[label]
+
+        goto, out = [{}], [-1]
+        pattern_label, lengths = [], []
+        for key, label in patterns.items():
+            state = 0
+            for token in key:
+                nxt = goto[state].get(token)
+                if nxt is None:
+                    nxt = goto[state][token] = len(goto)
+                    goto.append({})
+                    out.append(-1)
+                state = nxt
+            out[state] = len(pattern_label)
+            pattern_label.append(label)
+            lengths.append(len(key))
+
+        # links de falha em largura: o estado de um filho depende só dos níveis anteriores
+        fail, dict_link = [0] * len(goto), [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for token, child in goto[state].items():
+                f = fail[state]
+                while f and token not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(token, 0)
+                dict_link[child] = fail[child] if out[fail[child]] >= 0 else dict_link[fail[child]]
+                queue.append(child)
+        return cls(labels, pattern_label, lengths, goto, fail, out, dict_link)
+
+    def __len__(self):
+        return len(self.pattern_label)
+
+    def _scan(self, folded):
+        """Gera (início, fim, padrão) no texto normalizado."""
+        goto, fail, out, dict_link, lengths = self.goto, self.fail, self.out, self.dict_link, self.lengths
+        starts = []  # início de cada palavra já lida
+        state = 0
+        for m in _TOKEN.finditer(folded):
+            token = m.group()
+            starts.append(m.start())
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            s = state if out[state] >= 0 else dict_link[state]
+            while s:
+                pattern = out[s]
+                yield starts[len(starts) - lengths[pattern]], m.end(), pattern
+                s = dict_link[s]
+
+    def find(self, text, longest=True):
+        """
+        Ocorrências: [{"phenotype", "text", "start", "end"}], com start/end no texto
+        original e ordenadas pela posição. Com `longest`, ocorrências contidas em uma
+        maior são descartadas ("diabetes" dentro de "diabetes mellitus").
+        """
+        folded, positions = normalize_text(text)
+        found = sorted(self._scan(folded), key=lambda m: (m[0], -m[1]))
+
+        matches, max_end = [], -1
+        for start, end, pattern in found:
+            if longest and end <= max_end:
+                continue
+            max_end = max(max_end, end)
+            if positions is not None:
+                start, end = positions[start], positions[end - 1] + 1
+            matches.append({
+                "phenotype": self.labels[self.pattern_label[pattern]],
+                "text": text[start:end],
+                "start": start,
+                "end": end,
+            })
+        return matches
+
+    def phenotypes(self, text):
+        """Nomes canônicos encontrados, na ordem da primeira ocorrência."""
+        return list(dict.fromkeys(m["phenotype"] for m in self.find(text)))
+
+
+def terms_sha256(entries):
+    digest = hashlib.sha256()
+    for term, label in sorted(set(entries)):
+        digest.update(f"{term}\t{label}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def cache_path(cache_dir, sha256):
+    return os.path.join(cache_dir, f"phenotypes.{sha256[:16]}.v{FORMAT_VERSION}.pkl")
+
+
+def load_matcher(entries, cache_dir):
+    """
+    Carrega o autômato do cache se ele corresponder aos termos atuais; senão compila e
+    grava o cache (falhas de escrita só são avisadas).
+    """
+    entries = list(entries)
+    sha256 = terms_sha256(entries)
+    path = cache_path(cache_dir, sha256)
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                matcher = PhenotypeMatcher(*pickle.load(f))
+            matcher.version = sha256
+            return matcher
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError) as e:
+            print(f"Cache do matcher de fenótipos inválido ({e}); recompilando")
+
+    matcher = PhenotypeMatcher.build(entries)
+    matcher.version = sha256
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(
+                (matcher.labels, matcher.pattern_label, matcher.lengths, matcher.goto,
+                 matcher.fail, matcher.out, matcher.dict_link),
+                f, protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Não foi possível gravar o cache do matcher de fenótipos: {e}")
+    return matcher
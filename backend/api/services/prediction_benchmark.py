@@ -0,0 +1,261 @@
+"""
+Benchmark reprodutível do pipeline de predição metabólica (ver benchmark_prediction).
+
+Roda offline sobre os modelos de METABOLIC_MODELS cujo arquivo existe (no repositório,
+o ecoli_core_model.json; o Human-GEM quando o pickle existe): o banco de doenças é
+substituído por um snapshot local gerado a partir de uma fixture determinística, e grafo
+compacto, tabela de knockouts e cache de predições apontam para diretórios temporários,
+para medir sempre o caminho de cálculo.
+
+Etapas medidas por modelo:
+    cold_*        carregamento do modelo, do índice e da tabela de genes (uma vez)
+    scoring_only  neighbors_by_metabolites + score_neighbors_exclusive por gene
+    score_many    score de todos os genes da amostra em um único produto esparso
+    single_gene   neighbors_batch de um gene, sem cache
+    two_hop       vizinhança a 2 passos de um gene, sem cache
+    batch         neighbors_batch da amostra inteira, sem cache
+    cached_single neighbors_batch de um gene com o cache já preenchido
+    flux_cold     primeiro compute_flux_effects (inclui a criação do pool de processos)
+    flux          compute_flux_effects do gene e dos 3 melhores vizinhos
+"""
+import hashlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import cobra
+import numpy as np
+import scipy
+from django.conf import settings
+from django.test import override_settings
+
+from api.services import phenotype_index, prediction, prediction_cache
+from api.services.gene_table import load_gene_table
+from api.services.metabolic_index import MetabolicIndex
+from api.services.model_registry import read_model
+from api.services.phenotype_index import write_snapshot
+from api.services.utils.hashing import file_sha256
+
+# nomes sintéticos da fixture de fenótipos (o benchmark não depende do Postgres)
+FIXTURE_PHENOTYPES = 500
+
+
+def _load_model(name):
+    path = settings.METABOLIC_MODELS[name]["path"]
+    return read_model(path), path
+
+
+def available_models():
+    return [name for name, spec in settings.METABOLIC_MODELS.items() if os.path.exists(spec["path"])]
+
+
+def _stats(samples_ms):
+    ordered = sorted(samples_ms)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "n": len(ordered),
+        "min_ms": round(ordered[0], 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(p95, 3),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+    }
+
+
+def _elapsed_ms(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def _time(func):
+    start = time.perf_counter()
+    func()
+    return _elapsed_ms(start)
+
+
+def _measure(func, items, repeat):
+    """Uma execução de aquecimento por item e depois `repeat` medições de cada item."""
+    for item in items:
+        func(item)
+    return _stats([_time(lambda: func(item)) for _ in range(repeat) for item in items])
+
+
+def write_fixture_snapshot(path, gene_ids, symbols):
+    """Snapshot de fenótipos determinístico: 0 a 4 nomes por gene, derivados do ID."""
+    genes, phenotypes = [], []
+    for gene_id in gene_ids:
+        symbol = symbols.get(gene_id) or gene_id
+        genes.append((gene_id, symbol))
+        digest = hashlib.sha256(gene_id.encode("utf-8")).digest()
+        for k in range(digest[0] % 5):
+            phenotypes.append((symbol, f"Fixture phenotype {(digest[k + 1] * 256 + digest[k + 2]) % FIXTURE_PHENOTYPES}"))
+    return write_snapshot(path, genes, phenotypes)
+
+
+def sample_genes(model, index, n):
+    """Amostra fixa (semente 0) de genes com ao menos um vizinho."""
+    candidates = sorted(g.id for g in model.genes if len(index.score_neighbors(index.gene_pos[g.id])[0]))
+    return random.Random(0).sample(candidates, min(n, len(candidates)))
+
+
+def _reset_singletons():
+    """
+    override_settings não alcança os singletons já criados: sem isto, um segundo modelo
+    reaproveitaria registro, caches e snapshot do primeiro, apontando para o diretório
+    temporário já removido, e as etapas cold_* não seriam frias.
+    """
+    prediction.reset_state()
+    prediction_cache._cache_instance = None
+    phenotype_index._index_instance = phenotype_index._index_path = None
+    phenotype_index._index_stat = phenotype_index._index_checked = None
+
+
+def run_model(name, n_genes=20, repeat=5, flux_genes=3, skip_flux=False, processes=None, log=print):
+    _reset_singletons()
+    try:
+        return _run_model(name, n_genes, repeat, flux_genes, skip_flux, processes, log)
+    finally:
+        _reset_singletons()
+
+
+def _run_model(name, n_genes, repeat, flux_genes, skip_flux, processes, log):
+    stages = {}
+    with tempfile.TemporaryDirectory(prefix="benchmark_prediction_") as tmp:
+        overrides = {
+            "METABOLIC_GRAPH_DIR": os.path.join(tmp, "graph"),
+            "KNOCKOUT_TABLE_DIR": os.path.join(tmp, "knockouts"),
+            "PREDICTION_CACHE_DIR": os.path.join(tmp, "cache"),
+            "PHENOTYPE_SNAPSHOT_PATH": os.path.join(tmp, "phenotypes.sqlite"),
+            "PHENOTYPE_SNAPSHOT_CHECK_SECONDS": 3600,
+            "GENE_TABLE_CACHE_DIR": os.path.join(tmp, "genes"),
+        }
+        if processes is not None:
+            overrides["FLUX_PROCESSES"] = processes
+        with override_settings(**overrides):
+            log(f"[{name}] carregando modelo")
+            start = time.perf_counter()
+            model, model_path = _load_model(name)
+            stages["cold_load_model"] = _stats([_elapsed_ms(start)])
+
+            start = time.perf_counter()
+            index = MetabolicIndex.from_model(model, source_sha256=file_sha256(model_path))
+            stages["cold_build_index"] = _stats([_elapsed_ms(start)])
+
+            # primeira leitura analisa o TSV; a segunda vem do cache binário
+            for stage in ("cold_gene_table", "gene_table_cached"):
+                stages[stage] = _stats([_time(
+                    lambda: load_gene_table(prediction.GENES_PATH, overrides["GENE_TABLE_CACHE_DIR"]))])
+
+            prediction.use_model(model, index, name)
+            genes = prediction.load_genes()
+            symbols = {g: (genes.get(g) or {}).get("geneSymbols") for g in index.gene_ids}
+            write_fixture_snapshot(overrides["PHENOTYPE_SNAPSHOT_PATH"], list(index.gene_ids), symbols)
+
+            sample = sample_genes(model, index, n_genes)
+            log(f"[{name}] {len(sample)} genes na amostra, {repeat} repetições")
+
+            def scoring_only(gene_id):
+                shared_map, _ = prediction.neighbors_by_metabolites(model.genes.get_by_id(gene_id))
+                prediction.score_neighbors_exclusive(model, shared_map)
+
+            stages["scoring_only"] = _measure(scoring_only, sample, repeat)
+            idxs = [index.gene_pos[g] for g in sample]
+            stages["score_many"] = _measure(lambda _: index.score_many(idxs), [None], repeat)
+            stages["single_gene"] = _measure(
+                lambda g: prediction.neighbors_batch([g], use_cache=False, model=name), sample, repeat)
+            stages["two_hop"] = _measure(
+                lambda g: prediction.neighbors_batch([g], hops=2, use_cache=False, model=name), sample, repeat)
+            stages["batch"] = _measure(
+                lambda _: prediction.neighbors_batch(sample, use_cache=False, model=name), [None], repeat)
+            stages["cached_single"] = _measure(lambda g: prediction.neighbors_batch([g], model=name), sample, repeat)
+
+            if not skip_flux and flux_genes > 0:
+                log(f"[{name}] knockouts de {flux_genes} genes")
+                flux_sample = sample[:flux_genes]
+                tops = {}
+                for g in flux_sample:
+                    result = prediction.neighbors_batch([g], use_cache=False, model=name)["results"][0]
+                    tops[g] = [n["gene_id"] for n in result["neighbors"]]
+                # a primeira chamada inclui a criação do pool de processos
+                stages["flux_cold"] = _stats([_time(
+                    lambda: prediction.compute_flux_effects(model, flux_sample[0], tops[flux_sample[0]]))])
+                stages["flux"] = _measure(
+                    lambda g: prediction.compute_flux_effects(model, g, tops[g]), flux_sample, repeat)
+                prediction.get_flux_engine_for(model).shutdown()
+
+    return {
+        "model": name,
+        "genes_in_model": len(index.gene_ids),
+        "reactions_in_model": len(index.rxn_ids),
+        "sample": sample,
+        "stages": stages,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=settings.BASE_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(models, **options):
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "cobra": cobra.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "options": {k: v for k, v in options.items() if k != "log"},
+        },
+        "models": {name: run_model(name, **options) for name in models},
+    }
+
+
+def compare(current, baseline, threshold, min_delta_ms=1.0):
+    """
+    Compara a mediana de cada etapa com a do baseline. Regressão: mais lenta que
+    (1 + threshold) x baseline e ao menos `min_delta_ms` mais lenta (evita ruído em etapas
+    de microssegundos). Retorna a lista de etapas comparadas.
+    """
+    rows = []
+    for name, model in current["models"].items():
+        base_model = baseline.get("models", {}).get(name)
+        if base_model is None:
+            continue
+        for stage, stats in model["stages"].items():
+            base = base_model["stages"].get(stage)
+            if base is None:
+                continue
+            cur_ms, base_ms = stats["median_ms"], base["median_ms"]
+            ratio = cur_ms / base_ms if base_ms > 0 else float("inf")
+            rows.append({
+                "model": name,
+                "stage": stage,
+                "baseline_ms": base_ms,
+                "current_ms": cur_ms,
+                "ratio": round(ratio, 3),
+                "regression": ratio > 1 + threshold and cur_ms - base_ms >= min_delta_ms,
+            })
+    return rows
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_report(report, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,88 @@
+"""
+Cache de resultados de neighbors() em dois níveis: LRU em memória (por processo)
+e disco (compartilhado entre os workers do gunicorn, com limite de tamanho).
+
+A chave inclui a versão dos dados (hash do modelo, da tabela de genes e versão das
+tabelas de doenças), então qualquer mudança invalida as entradas antigas. Como a versão
+é por modelo, entradas de vários modelos convivem na memória; as de versões antigas
+nunca mais são lidas e saem pela ordem LRU.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from api.services.utils.disk_cache import DiskCache
+
+_cache_lock = threading.Lock()
+_cache_instance = None
+
+
+class PredictionCache:
+
+    def __init__(self, directory, max_bytes, memory_entries):
+        self.disk = DiskCache(directory, max_bytes)
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+    @staticmethod
+    def make_key(version, parts):
+        return json.dumps([version, *parts])
+
+    def _remember(self, key, data):
+        # chamado com self._lock adquirido
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, version, parts):
+        """`parts` identifica o resultado dentro da versão, ex.: (gene_id, top_n, flux)."""
+        key = self.make_key(version, parts)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits["memory"] += 1
+                return json.loads(data)
+
+        data = self.disk.get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self._remember(key, data)
+            self.hits["disk"] += 1
+        return json.loads(data)
+
+    def set(self, version, parts, value):
+        key = self.make_key(version, parts)
+        data = json.dumps(value).encode("utf-8")
+        with self._lock:
+            self._remember(key, data)
+        self.disk.set(key, data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+            }
+
+
+def get_prediction_cache():
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = PredictionCache(
+                    settings.PREDICTION_CACHE_DIR,
+                    settings.PREDICTION_CACHE_MAX_MB * 1024 * 1024,
+                    settings.PREDICTION_CACHE_MEMORY_ENTRIES,
+                )
+    return _cache_instance
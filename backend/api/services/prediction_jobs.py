@@ -0,0 +1,188 @@
+"""
+Fila de jobs de predição guardada no próprio Postgres (tabela PredictionJob).
+
+O request só grava o job e devolve o ID; os processos de run_prediction_workers
+reservam o próximo job com SELECT ... FOR UPDATE SKIP LOCKED (vários workers nunca
+pegam o mesmo job) e gravam o resultado, que fica disponível até expires_at.
+Jobs idênticos em andamento do mesmo usuário são deduplicados pelo hash dos parâmetros.
+Cada usuário só vê os próprios jobs (staff vê todos).
+"""
+import hashlib
+import json
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from api.models.jobs import PredictionJob
+
+
+def normalize_params(gene_ids, top_n=3, flux=False, hops=1, model=None, evidence=False):
+    """Parâmetros de neighbors_batch em forma canônica (a ordem dos genes é preservada)."""
+    return {
+        "gene_ids": list(dict.fromkeys(gene_ids)),
+        "top_n": int(top_n),
+        "flux": bool(flux),
+        "hops": int(hops),
+        "model": model or settings.DEFAULT_METABOLIC_MODEL,
+        "evidence": bool(evidence),
+    }
+
+
+def _owner(user):
+    return user if user is not None and user.is_authenticated else None
+
+
+def params_hash(params, user=None):
+    """sha256 dos parâmetros e do usuário: só requests do mesmo usuário reaproveitam o job."""
+    owner = _owner(user)
+    payload = {"params": params, "user": owner.pk if owner is not None else None}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def submit(params, user=None):
+    """
+    Enfileira um job, ou devolve o job idêntico que já está na fila/executando.
+    Retorna (job, created).
+    """
+    digest = params_hash(params, user)
+    existing = PredictionJob.objects.filter(params_hash=digest, status__in=PredictionJob.IN_FLIGHT).first()
+    if existing is not None:
+        return existing, False
+    try:
+        with transaction.atomic():
+            job = PredictionJob.objects.create(
+                params=params,
+                params_hash=digest,
+                created_by=_owner(user),
+            )
+        return job, True
+    except IntegrityError:
+        # outro request enfileirou o mesmo job entre a consulta e o insert
+        existing = PredictionJob.objects.filter(params_hash=digest, status__in=PredictionJob.IN_FLIGHT).first()
+        if existing is None:
+            raise
+        return existing, False
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_next():
+    """Reserva o job mais antigo da fila para este processo; None se a fila estiver vazia."""
+    with transaction.atomic():
+        job = (PredictionJob.objects
+               .select_for_update(skip_locked=True)
+               .filter(status=PredictionJob.QUEUED)
+               .order_by("created_at")
+               .first())
+        if job is None:
+            return None
+        job.status = PredictionJob.RUNNING
+        job.started_at = timezone.now()
+        job.attempts += 1
+        job.worker = worker_name()
+        job.save(update_fields=["status", "started_at", "attempts", "worker"])
+    return job
+
+
+def _finish(job, status, result=None, error=None):
+    now = timezone.now()
+    job.status = status
+    job.result = result
+    job.error = error
+    job.finished_at = now
+    job.expires_at = now + timedelta(seconds=settings.PREDICTION_JOB_TTL_SECONDS)
+    job.save(update_fields=["status", "result", "error", "finished_at", "expires_at"])
+
+
+def run_job(job):
+    from api.services.prediction import neighbors_batch
+
+    params = job.params
+    try:
+        result = neighbors_batch(
+            params["gene_ids"], params["top_n"], params["flux"], params["hops"],
+            flux_budget_seconds=settings.PREDICTION_JOB_FLUX_BUDGET_SECONDS,
+            model=params.get("model"),
+            evidence=params.get("evidence", False),
+        )
+    except Exception as e:
+        print(f"Job {job.id} falhou: {e}")
+        traceback.print_exc()
+        _finish(job, PredictionJob.FAILED, error=str(e))
+        return job
+    _finish(job, PredictionJob.DONE, result=result)
+    return job
+
+
+def requeue_stale():
+    """
+    Jobs "executando" há mais de PREDICTION_JOB_STALE_SECONDS (worker morreu) voltam
+    para a fila, ou falham se já esgotaram as tentativas.
+    """
+    limit = timezone.now() - timedelta(seconds=settings.PREDICTION_JOB_STALE_SECONDS)
+    stale = PredictionJob.objects.filter(status=PredictionJob.RUNNING, started_at__lt=limit)
+    failed = 0
+    for job in stale.filter(attempts__gte=settings.PREDICTION_JOB_MAX_ATTEMPTS):
+        _finish(job, PredictionJob.FAILED, error="Tempo esgotado: o worker não concluiu o job.")
+        failed += 1
+    requeued = stale.update(status=PredictionJob.QUEUED, started_at=None, worker=None)
+    return requeued, failed
+
+
+def purge_expired():
+    """Apaga jobs concluídos cujo resultado já expirou."""
+    deleted, _ = PredictionJob.objects.filter(
+        status__in=[PredictionJob.DONE, PredictionJob.FAILED],
+        expires_at__lt=timezone.now(),
+    ).delete()
+    return deleted
+
+
+def visible_jobs(user):
+    """Jobs que `user` pode consultar: os próprios, ou todos para staff."""
+    jobs = PredictionJob.objects.all()
+    if user is not None and user.is_staff:
+        return jobs
+    owner = _owner(user)
+    return jobs.filter(created_by=owner) if owner is not None else jobs.none()
+
+
+def get_job(job_id, wait_seconds=0, user=None):
+    """
+    Busca o job entre os visíveis para `user`; com `wait_seconds`, espera (long-poll) até
+    ele terminar ou o prazo acabar. Retorna None se o job não existir, já tiver expirado
+    ou pertencer a outro usuário.
+    """
+    deadline = time.monotonic() + min(wait_seconds, settings.PREDICTION_JOB_MAX_WAIT_SECONDS)
+    jobs = visible_jobs(user)
+    while True:
+        job = jobs.filter(id=job_id).first()
+        if job is None or job.status not in PredictionJob.IN_FLIGHT:
+            return job
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return job
+        time.sleep(min(settings.PREDICTION_JOB_POLL_SECONDS, remaining))
+
+
+def serialize(job):
+    return {
+        "id": str(job.id),
+        "status": job.status,
+        "params": job.params,
+        "attempts": job.attempts,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "expires_at": job.expires_at,
+        "result": job.result,
+        "error": job.error,
+    }
@@ -0,0 +1,128 @@
+"""
+Índice subsystem -> genes/reações do modelo, derivado do MetabolicIndex.
+
+Permite agregar uma lista de genes de um paciente por subsystem com operações
+vetorizadas (produtos esparsos), sem percorrer reações gene a gene:
+    - hits: nº de genes da lista no subsystem;
+    - score: soma da exclusividade dos genes atingidos (1 / nº de subsystems do gene);
+    - p_value: enriquecimento hipergeométrico (cauda superior) e q_value (Benjamini-Hochberg
+      sobre todos os subsystems com genes, não só os exibidos).
+"""
+import threading
+import weakref
+
+import numpy as np
+from scipy import sparse
+from scipy.stats import hypergeom
+
+_subsystem_lock = threading.Lock()
+_subsystem_cache = weakref.WeakKeyDictionary()
+
+
+def _bh_adjust(p_values):
+    """q-values de Benjamini-Hochberg, na mesma ordem de `p_values`."""
+    n = len(p_values)
+    if n == 0:
+        return p_values
+    order = np.argsort(p_values)
+    ranked = p_values[order] * n / np.arange(1, n + 1)
+    ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+    q_values = np.empty(n, dtype=np.float64)
+    q_values[order] = np.minimum(ranked, 1.0)
+    return q_values
+
+
+class SubsystemIndex:
+    """
+    sub_rxn:  subsystems x reações (binária)
+    sub_gene: subsystems x genes (binária)
+    """
+
+    def __init__(self, index):
+        self.index = index
+        codes = {}
+        rxn_subsystem = np.full(len(index.rxn_ids), -1, dtype=np.int64)
+        for r, name in enumerate(index.rxn_subsystems):
+            if name:
+                rxn_subsystem[r] = codes.setdefault(name, len(codes))
+        # subsystems em ordem alfabética: a ordem das linhas não depende da ordem das reações
+        self.names = sorted(codes)
+        rank = np.empty(len(codes), dtype=np.int64)
+        for position, name in enumerate(self.names):
+            rank[codes[name]] = position
+
+        rxns = np.flatnonzero(rxn_subsystem >= 0)
+        n_subs, n_rxns = len(self.names), len(index.rxn_ids)
+        self.sub_rxn = sparse.csr_matrix(
+            (np.ones(len(rxns), dtype=np.int32), (rank[rxn_subsystem[rxns]], rxns)),
+            shape=(n_subs, n_rxns),
+        )
+        self.sub_gene = (self.sub_rxn @ index.gene_rxn.T.astype(np.int32)).tocsr()
+        self.sub_gene.data[:] = 1
+        self.sub_gene.sort_indices()
+
+        self.rxn_count = np.diff(self.sub_rxn.indptr)
+        self.gene_count = np.diff(self.sub_gene.indptr)
+        gene_n_subsystems = np.asarray(self.sub_gene.sum(axis=0)).ravel()
+        self.gene_weight = np.zeros(len(index.gene_ids), dtype=np.float64)
+        in_any = gene_n_subsystems > 0
+        self.gene_weight[in_any] = 1.0 / gene_n_subsystems[in_any]
+        # universo do teste de enriquecimento: genes com ao menos um subsystem
+        self.population = int(in_any.sum())
+
+    def impact(self, gene_idxs, min_hits=1):
+        """Agregação por subsystem de uma lista de genes (índices), ordenada por p-value."""
+        index = self.index
+        query = np.zeros(len(index.gene_ids), dtype=np.float64)
+        query[np.asarray(gene_idxs, dtype=np.int64)] = 1.0
+        query *= self.gene_weight > 0
+        n_query = int(query.sum())
+
+        hits = self.sub_gene @ query
+        scores = self.sub_gene @ (query * self.gene_weight)
+        rxn_hit = (index.gene_rxn.T @ query) > 0
+        rxn_hits = self.sub_rxn @ rxn_hit.astype(np.float64)
+
+        # a correção de Benjamini-Hochberg vale para todos os subsystems testados (com genes);
+        # min_hits só filtra o que é exibido, sem reduzir o nº de testes
+        tested = np.flatnonzero(self.gene_count > 0)
+        p_all = np.ones(len(self.names), dtype=np.float64)
+        q_all = np.ones(len(self.names), dtype=np.float64)
+        p_all[tested] = hypergeom.sf(hits[tested] - 1, self.population, self.gene_count[tested], n_query)
+        q_all[tested] = _bh_adjust(p_all[tested])
+
+        rows = np.flatnonzero(hits >= max(1, min_hits))
+        p_values, q_values = p_all[rows], q_all[rows]
+
+        # genes atingidos por subsystem: colunas da lista na matriz subsystem x gene
+        query_genes = np.flatnonzero(query)
+        hit_genes = self.sub_gene[rows][:, query_genes].tocsr()
+
+        results = []
+        for i, row in enumerate(rows):
+            genes = query_genes[hit_genes.indices[hit_genes.indptr[i]:hit_genes.indptr[i + 1]]]
+            results.append({
+                "subsystem": self.names[row],
+                "hits": int(hits[row]),
+                "genes_in_subsystem": int(self.gene_count[row]),
+                "reaction_hits": int(rxn_hits[row]),
+                "reactions_in_subsystem": int(self.rxn_count[row]),
+                "score": float(scores[row]),
+                "p_value": float(p_values[i]),
+                "q_value": float(q_values[i]),
+                "genes": [index.gene_ids[g] for g in genes],
+            })
+        results.sort(key=lambda r: (r["p_value"], -r["score"], r["subsystem"]))
+        return {"results": results, "genes_considered": n_query, "population": self.population}
+
+
+def get_subsystem_index(index):
+    """Índice de subsystems do MetabolicIndex, construído uma vez e reaproveitado."""
+    subsystems = _subsystem_cache.get(index)
+    if subsystems is None:
+        with _subsystem_lock:
+            subsystems = _subsystem_cache.get(index)
+            if subsystems is None:
+                subsystems = SubsystemIndex(index)
+                _subsystem_cache[index] = subsystems
+    return subsystems
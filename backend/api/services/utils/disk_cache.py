@@ -0,0 +1,96 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+
+class DiskCache:
+    """
+    Cache em disco compartilhado entre processos (ex.: workers do gunicorn).
+    Um arquivo por chave; escrita atômica com os.replace.
+    O mtime é atualizado a cada leitura e a remoção segue LRU quando o total passa de `max_bytes`.
+    """
+
+    def __init__(self, directory, max_bytes, check_every=64):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self.check_every = check_every
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name[:2], name)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def set(self, key, data):
+        path = self._path(key)
+        folder = os.path.dirname(path)
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        with self._lock:
+            self._writes += 1
+            check = self._writes % self.check_every == 0
+        if check:
+            self.evict()
+
+    def _entries(self):
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield st.st_mtime_ns, st.st_size, entry.path
+
+    def size(self):
+        if not os.path.isdir(self.directory):
+            return 0
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Remove os arquivos menos usados até o total ficar em 90% de `max_bytes`."""
+        if not os.path.isdir(self.directory):
+            return 0
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,41 @@
+import hashlib
+import os
+import threading
+
+_digest_lock = threading.Lock()
+_digests = {}
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """
+    SHA-256 do conteúdo do arquivo.
+    Memoizado por (caminho, tamanho, mtime): só relê o arquivo quando ele muda.
+    Também aceita um arquivo aberto ou UploadedFile do Django (sem memo; o arquivo
+    aberto volta ao início).
+    """
+    if not isinstance(path, (str, bytes)) and not hasattr(path, "__fspath__"):
+        return _stream_sha256(path, chunk_size)
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    digest = _digests.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with _digest_lock:
+            _digests[key] = digest
+    return digest
+
+
+def _stream_sha256(source, chunk_size):
+    h = hashlib.sha256()
+    if hasattr(source, "chunks"):
+        for chunk in source.chunks():
+            h.update(chunk)
+    else:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            h.update(chunk)
+        source.seek(0)
+    return h.hexdigest()
@@ -0,0 +1,106 @@
+"""
+Pré-carregamento do serviço de predição.
+
+Chamado no master do gunicorn antes do fork (ver gunicorn.conf.py): genes, índice
+metabólico e, opcionalmente, o modelo COBRApy completo são carregados uma única vez e
+herdados pelos workers. Depois do carregamento, gc.freeze() move esses objetos para a
+geração permanente, para que a coleta de lixo nos workers não escreva nos cabeçalhos e
+não duplique páginas por copy-on-write.
+"""
+import gc
+import os
+import threading
+import time
+
+from django.conf import settings
+
+_state_lock = threading.Lock()
+_state = {
+    "ready": False,
+    "warmed_in_pid": None,
+    "timings_ms": {},
+    "error": None,
+    "first_request_ms": None,
+}
+
+
+def memory_usage():
+    """RSS e PSS do processo em kB (Linux); PSS divide as páginas compartilhadas entre os processos."""
+    usage = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    usage["rss_kb"] = int(line.split()[1])
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                    usage[f"{key.lower()}_kb"] = int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+def _timed(timings, name, func):
+    start = time.perf_counter()
+    result = func()
+    timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def warmup(load_full_model=None):
+    """
+    Carrega os dados da predição e executa uma predição de prova (sem banco de dados).
+    Retorna o estado; em caso de erro o serviço continua com carregamento sob demanda.
+    """
+    from api.services.prediction import load_genes, load_index, load_model
+    from api.services.subsystem_index import get_subsystem_index
+
+    if load_full_model is None:
+        load_full_model = settings.PREDICTION_WARMUP_FULL_MODEL
+
+    timings = {}
+    try:
+        _timed(timings, "load_genes", load_genes)
+        index = _timed(timings, "load_index", load_index)
+        if load_full_model:
+            _timed(timings, "load_model", load_model)
+        _timed(timings, "load_subsystems", lambda: get_subsystem_index(index))
+        if len(index.gene_ids):
+            _timed(timings, "probe", lambda: index.score_many([0]))
+    except Exception as e:
+        with _state_lock:
+            _state.update(ready=False, error=str(e), timings_ms=timings)
+        print(f"Falha no warmup da predição: {e}")
+        return status()
+
+    with _state_lock:
+        _state.update(ready=True, error=None, warmed_in_pid=os.getpid(), timings_ms=timings)
+    return status()
+
+
+def prepare_fork():
+    """Congela os objetos já carregados antes do fork dos workers."""
+    gc.collect()
+    gc.freeze()
+
+
+def is_ready():
+    return _state["ready"]
+
+
+def note_request(duration_ms):
+    """Registra a latência da primeira requisição de predição deste worker."""
+    if _state["first_request_ms"] is None:
+        with _state_lock:
+            if _state["first_request_ms"] is None:
+                _state["first_request_ms"] = round(duration_ms, 1)
+
+
+def status():
+    with _state_lock:
+        state = dict(_state)
+    state["pid"] = os.getpid()
+    state["memory"] = memory_usage()
+    return state
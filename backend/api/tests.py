@@ -1,3 +1,1242 @@
-from django.test import TestCase
+import functools
+import io
+import json
+import multiprocessing
+import math
+import os
+import signal
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from scipy import sparse
+from scipy.stats import hypergeom
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.management.commands.run_prediction_workers import stop_workers
+from api.middleware import ServerTimingMiddleware
+from api.models.jobs import PredictionJob
+from api.services import (
+    disease_db, extraction_cache, flux_engine, gene_table, knockout_table, metabolic_store,
+    metabolite_filter, metrics, model_registry, neighborhood, pdf_engine, phenotype_dictionary,
+    phenotype_index, prediction, prediction_benchmark, prediction_cache, prediction_jobs, warmup,
+)
+from api.services.extract_pdf import extract_emails_from_pdf
+from api.services.gene_ranking import GeneRanking
+from api.services.metabolic_index import MetabolicIndex
+from api.services.metabolite_filter import MetaboliteFilter
+from api.services.phenotype_matcher import PhenotypeMatcher, normalize_text
+from api.services.prediction import neighbors_batch
+from api.services.subsystem_index import SubsystemIndex
+from api.services.utils.hashing import file_sha256
+from api.views.prediction import (
+    MetricsView, PhenotypeGenesView, PredictBatchView, PredictionJobDetailView, PredictViewSet,
+    ReadinessView, SubsystemImpactView, _ndjson,
+)
+
+
+class PhenotypeMatcherTests(SimpleTestCase):
+
+    def setUp(self):
+        self.matcher = PhenotypeMatcher.build([
+            ("glicemia elevada", "glicemia elevada"),
+            ("diabetes", "diabetes"),
+            ("diabetes mellitus", "diabetes mellitus"),
+        ])
+
+    def test_positions_with_ligature_and_combining_mark(self):
+        # "ﬁ" vira 2 caracteres e a marca combinante some: os comprimentos se compensam
+        text = "Paciente ﬁlho de café com glicemia elevada"
+        folded, positions = normalize_text(text)
+        self.assertEqual(len(folded), len(text))
+        self.assertIsNotNone(positions)
+        [match] = self.matcher.find(text)
+        self.assertEqual(match["text"], "glicemia elevada")
+        self.assertEqual(text[match["start"]:match["end"]], "glicemia elevada")
+
+    def test_longest_match_and_accents(self):
+        text = "DIABETES-MELLITUS e Glicêmia   elevada; diabetes"
+        matches = self.matcher.find(text)
+        self.assertEqual([m["phenotype"] for m in matches],
+                         ["diabetes mellitus", "glicemia elevada", "diabetes"])
+        self.assertEqual(matches[1]["text"], "Glicêmia   elevada")
+        self.assertEqual(len(self.matcher.find(text, longest=False)), 4)
+
+    def test_word_boundaries(self):
+        self.assertEqual(self.matcher.find("prediabetes"), [])
+
+
+class PhenotypeDictionaryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "dicionario.sqlite")
+        for name in ("_dictionary_instance", "_dictionary_path", "_dictionary_stat", "_dictionary_checked"):
+            patcher = mock.patch.object(phenotype_dictionary, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        print_patcher = mock.patch("builtins.print")
+        print_patcher.start()
+        self.addCleanup(print_patcher.stop)
+
+    def _build(self, source=settings.PHENOTYPE_DICTIONARY_SOURCE):
+        out = io.StringIO()
+        call_command("build_phenotype_dictionary", "--source", source, "--output", self.path, stdout=out)
+        return out.getvalue()
+
+    def test_offline_translation_both_ways(self):
+        self._build()
+        with override_settings(PHENOTYPE_DICTIONARY_PATH=self.path):
+            self.assertEqual(phenotype_dictionary.translate("CRISE  convulsiva"), "Seizure")
+            self.assertEqual(phenotype_dictionary.translate("convulsao"), "Seizure")
+            self.assertEqual(phenotype_dictionary.translate("seizure", target="pt"), "Convulsão")
+            self.assertEqual(phenotype_dictionary.translate("Seizure"), "Seizure")
+            self.assertIsNone(phenotype_dictionary.translate("termo inexistente"))
+            dictionary = phenotype_dictionary.get_phenotype_dictionary()
+        self.assertEqual(dictionary.term_id("Retardo mental"), "HP:0001249")
+        self.assertIn(("Retardo mental", "Intellectual disability"), dictionary.synonyms())
+
+    def test_source_parsing_and_versioning(self):
+        source = os.path.join(self.tmp.name, "fonte.tsv")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write("# comentário\nid\ten\tpt\n"
+                    "HP:1\tFever\tFebre| febre alta |Febre\n"
+                    "\tHeadache\tCefaleia\n"
+                    "HP:2\tPyrexia\tfebre\n"
+                    "HP:3\t\tsem nome\n")
+        entries = phenotype_dictionary.parse_source(source)
+        self.assertEqual(entries, [("HP:1", "Fever", "Febre"), ("HP:1", "Fever", "febre alta"),
+                                   ("", "Headache", "Cefaleia"), ("HP:2", "Pyrexia", "febre")])
+        output = self._build(source)
+        self.assertIn("'febre' traduz para 'Fever' e 'Pyrexia'", output)
+        self.assertEqual(phenotype_dictionary.get_phenotype_dictionary(self.path, 0).to_en("FEBRE"), "Fever")
+
+        version = phenotype_dictionary.load_dictionary(self.path).version
+        self.assertEqual(phenotype_dictionary.write_dictionary(self.path, entries), version)
+        self.assertNotEqual(phenotype_dictionary.write_dictionary(self.path, entries[:2]), version)
+        self.assertIsNone(phenotype_dictionary.get_phenotype_dictionary(self.path, 0).to_en("Cefaleia"))
+
+        with self.assertRaises(CommandError):
+            self._build(os.path.join(self.tmp.name, "ausente.tsv"))
+
+
+class _User:
+    is_authenticated = True
+    is_active = True
+    pk = id = 1
+
+
+def _post(view, data=None, path="/", **kwargs):
+    request = APIRequestFactory().post(path, data, format="json")
+    force_authenticate(request, user=_User())
+    return view(request, **kwargs)
+
+
+class PredictionParamsTests(SimpleTestCase):
+
+    def test_batch_top_n_bounds(self):
+        for top_n in (-1, 0, settings.PREDICTION_MAX_TOP_N + 1, "três"):
+            response = _post(PredictBatchView.as_view(), {"gene_ids": ["ENSG00000000419"], "top_n": top_n})
+            self.assertEqual(response.status_code, 400, top_n)
+            self.assertIn("top_n", response.data["error"])
+
+    def test_batch_gene_ids_cap(self):
+        gene_ids = [f"ENSG{i:011d}" for i in range(settings.PREDICTION_MAX_GENE_IDS + 1)]
+        response = _post(PredictBatchView.as_view(), {"gene_ids": gene_ids})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("gene_ids", response.data["error"])
+
+    def test_subsystem_impact_gene_ids_cap(self):
+        gene_ids = ["ENSG00000000419"] * (settings.PREDICTION_MAX_GENE_IDS + 1)
+        with mock.patch("api.views.prediction.subsystem_impact") as impact:
+            response = _post(SubsystemImpactView.as_view(), {"gene_ids": gene_ids})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("error", response.data)
+            self.assertEqual(_post(SubsystemImpactView.as_view(), {"gene_ids": "ENSG00000000419"}).status_code, 400)
+            impact.assert_not_called()
+
+    def test_single_gene_top_n(self):
+        view = PredictViewSet.as_view({"post": "post"})
+        response = _post(view, path="/?top_n=-1", ens_gene_id="ENSG00000000419")
+        self.assertEqual(response.status_code, 400)
+
+    def test_service_rejects_non_positive_top_n(self):
+        with self.assertRaises(ValueError):
+            neighbors_batch(["ENSG00000000419"], top_n=-1)
+
+
+class GeneRankingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.ranking = GeneRanking.from_pairs([
+            ("A", "seizures"), ("B", "seizures"), ("C", "seizures"), ("D", "seizures"),
+            ("B", "cataract"),
+            ("C", "ataxia"), ("D", "ataxia"),
+        ])
+
+    def test_idf_weights_rare_phenotypes(self):
+        result = self.ranking.rank(["Seizures", "cataract", "ataxia", "unknown term"], top_k=3)
+        n = 4
+        expected = {
+            "A": math.log1p(n / 4),
+            "B": math.log1p(n / 4) + math.log1p(n / 1),
+            "C": math.log1p(n / 4) + math.log1p(n / 2),
+            "D": math.log1p(n / 4) + math.log1p(n / 2),
+        }
+        self.assertEqual([g["gene"] for g in result["genes"]], ["B", "C", "D"])
+        for g in result["genes"]:
+            self.assertAlmostEqual(g["score"], expected[g["gene"]], places=3)
+        self.assertEqual(result["unknown"], ["unknown term"])
+        self.assertEqual([e["phenotype"] for e in result["genes"][0]["evidence"]], ["cataract", "seizures"])
+
+    def test_view_rejects_invalid_top_k(self):
+        for top_k in (-1, 0, settings.PHENOTYPE_GENES_MAX_TOP_K + 1):
+            response = _post(PhenotypeGenesView.as_view(), {"phenotypes": ["ataxia"], "top_k": top_k})
+            self.assertEqual(response.status_code, 400, top_k)
+            self.assertIn("top_k", response.data["error"])
+
+
+def _write_pdf(path, pages):
+    lib = pdf_engine._import_backend("pymupdf")
+    doc = lib.open()
+    for i in range(pages):
+        doc.new_page().insert_text((40, 60), f"Pagina {i + 1} glicemia elevada contato{i}@lab.com.br")
+    doc.save(path)
+    doc.close()
+
+
+class PdfEngineTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, "exame.pdf")
+        _write_pdf(cls.path, 7)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        super().tearDownClass()
+
+    def test_parallel_matches_serial(self):
+        serial = list(pdf_engine.iter_pages(self.path, processes=1))
+        self.assertEqual([n for n, _ in serial], list(range(1, 8)))
+        parallel = list(pdf_engine.iter_pages(self.path, processes=2, chunk_pages=2, parallel_min_pages=1))
+        self.assertEqual(parallel, serial)
+        self.assertIn("Pagina 5", serial[4][1])
+
+    def test_unreadable_file(self):
+        bad = os.path.join(self.tmp.name, "ruim.pdf")
+        with open(bad, "w") as f:
+            f.write("não é um PDF")
+        with self.assertRaises(pdf_engine.PdfExtractionError):
+            list(pdf_engine.iter_pages(bad))
+        with self.assertRaises(FileNotFoundError):
+            list(pdf_engine.iter_pages(os.path.join(self.tmp.name, "ausente.pdf")))
+
+
+class ExtractionCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "exame.pdf")
+        _write_pdf(self.path, 7)
+        overrides = override_settings(
+            EXTRACTION_CACHE_DIR=os.path.join(self.tmp.name, "cache"),
+            EXTRACTION_CACHE_CHUNK_PAGES=2,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        extraction_cache._cache_instance = None
+        self.addCleanup(setattr, extraction_cache, "_cache_instance", None)
+        self.addCleanup(self.tmp.cleanup)
+
+    def _no_pdf_access(self):
+        error = AssertionError("PDF aberto em um acerto de cache")
+        return mock.patch.multiple(pdf_engine, iter_pages=mock.Mock(side_effect=error),
+                                   page_count=mock.Mock(side_effect=error))
+
+    def test_hit_does_not_open_pdf(self):
+        expected = list(pdf_engine.iter_pages(self.path, processes=1))
+        self.assertEqual(list(extraction_cache.iter_pages(self.path)), expected)
+        with self._no_pdf_access():
+            self.assertEqual(list(extraction_cache.iter_pages(self.path)), expected)
+            self.assertEqual(extraction_cache.page_count(self.path), 7)
+
+    def test_pages_stored_in_bounded_chunks(self):
+        list(extraction_cache.iter_pages(self.path))
+        cache = extraction_cache.get_extraction_cache()
+        sha256 = file_sha256(self.path)
+        backend = pdf_engine.resolve_backend()
+        self.assertEqual(cache.get("pages", sha256, (backend,)), {"pages": 7, "chunks": 4})
+        self.assertEqual([len(cache.get("pages-chunk", sha256, (backend, i))) for i in range(4)], [2, 2, 2, 1])
+
+    def test_evicted_chunk_is_extracted_again(self):
+        expected = list(extraction_cache.iter_pages(self.path))
+        cache = extraction_cache.get_extraction_cache()
+        key = cache.make_key("pages-chunk", file_sha256(self.path),
+                             (pdf_engine.resolve_backend(), 1))
+        os.remove(cache.disk._path(key))
+        self.assertEqual(list(extraction_cache.iter_pages(self.path)), expected)
+
+    def test_partial_read_is_not_recorded(self):
+        pages = extraction_cache.iter_pages(self.path)
+        next(pages)
+        pages.close()
+        cache = extraction_cache.get_extraction_cache()
+        sha256 = file_sha256(self.path)
+        self.assertIsNone(cache.get("pages", sha256, (pdf_engine.resolve_backend(),)))
+
+    def test_upload_hashes_like_its_path(self):
+        with open(self.path, "rb") as f:
+            content = f.read()
+        expected = file_sha256(self.path)
+        self.assertEqual(file_sha256(SimpleUploadedFile("exame.pdf", content)), expected)
+        with open(self.path, "rb") as f:
+            self.assertEqual(file_sha256(f), expected)
+            self.assertEqual(f.read(), content)
+
+    def test_same_content_new_path_and_emails(self):
+        with mock.patch("builtins.print"):
+            emails = extract_emails_from_pdf(self.path)
+        self.assertEqual(len(emails), 7)
+        copy = os.path.join(self.tmp.name, "reenvio.pdf")
+        with open(self.path, "rb") as src, open(copy, "wb") as dst:
+            dst.write(src.read())
+        with self._no_pdf_access(), mock.patch("builtins.print"):
+            self.assertEqual(extract_emails_from_pdf(copy), emails)
+
+
+class SubsystemImpactTests(SimpleTestCase):
+
+    def test_bh_covers_every_tested_subsystem(self):
+        # 60 genes, 40 reações em 8 subsystems; os genes 0-5 concentram-se no subsystem 0
+        rng = np.random.default_rng(7)
+        gene_rxn = (rng.random((60, 40)) < 0.05).astype(np.int8)
+        gene_rxn[:6, :5] = 1
+        index = SimpleNamespace(
+            gene_ids=[f"G{i}" for i in range(60)],
+            rxn_ids=[f"R{i}" for i in range(40)],
+            rxn_subsystems=[f"S{i // 5}" for i in range(40)],
+            gene_rxn=sparse.csr_matrix(gene_rxn),
+        )
+        subsystems = SubsystemIndex(index)
+        genes = [0, 1, 2, 3, 4, 5, 20, 41]
+        query = np.zeros(len(index.gene_ids))
+        query[genes] = 1
+        query *= subsystems.gene_weight > 0
+        hits = subsystems.sub_gene @ query
+        tested = np.flatnonzero(subsystems.gene_count > 0)
+        p = hypergeom.sf(hits[tested] - 1, subsystems.population, subsystems.gene_count[tested], int(query.sum()))
+        # BH de referência: p * m / posto, monotônico a partir do maior p-value
+        m = len(p)
+        order = np.argsort(p)
+        q = np.empty(m)
+        running = 1.0
+        for rank in range(m, 0, -1):
+            running = min(running, p[order[rank - 1]] * m / rank)
+            q[order[rank - 1]] = running
+        expected = {subsystems.names[row]: q[i] for i, row in enumerate(tested)}
+
+        full = {r["subsystem"]: r for r in subsystems.impact(genes)["results"]}
+        filtered = subsystems.impact(genes, min_hits=2)["results"]
+        self.assertTrue(filtered)
+        self.assertLess(len(filtered), len(full))
+        for r in filtered:
+            self.assertGreaterEqual(r["hits"], 2)
+            self.assertAlmostEqual(r["q_value"], full[r["subsystem"]]["q_value"])
+        for name, r in full.items():
+            self.assertAlmostEqual(r["q_value"], expected[name])
+
+
+@functools.lru_cache(maxsize=None)
+def _ecoli_model():
+    import cobra
+    return cobra.io.load_json_model(settings.METABOLIC_MODELS["ecoli-core"]["path"])
+
+
+def _brute_force_neighbors(model, gene_id, excluded):
+    """Travessia original pelos objetos do COBRApy: gene -> reações -> metabólitos -> genes."""
+    shared = {}
+    for rxn in model.genes.get_by_id(gene_id).reactions:
+        for met in rxn.metabolites:
+            if met.id in excluded:
+                continue
+            for other in met.reactions:
+                for neighbor in other.genes:
+                    if neighbor.id != gene_id:
+                        shared.setdefault(neighbor.id, set()).add((met.id, rxn.subsystem, rxn.name))
+    return shared
+
+
+class MetabolicIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        self.model = _ecoli_model()
+        self.index = MetabolicIndex.from_model(self.model, MetaboliteFilter())
+        self.excluded = {m for m, e in zip(self.index.met_ids, self.index.met_excluded) if e}
+
+    def test_shared_map_matches_object_traversal(self):
+        self.assertTrue(self.excluded)
+        for gene in self.model.genes:
+            self.assertEqual(
+                self.index.shared_map(self.index.gene_pos[gene.id]),
+                _brute_force_neighbors(self.model, gene.id, self.excluded),
+                gene.id,
+            )
+
+    def test_score_many_matches_exclusivity_score(self):
+        genes = [g.id for g in self.model.genes]
+        scores = self.index.score_many([self.index.gene_pos[g] for g in genes])
+        self.assertEqual(scores.shape, (len(genes), len(genes)))
+        for row, gene_id in enumerate(genes):
+            expected = {}
+            for neighbor, mets in _brute_force_neighbors(self.model, gene_id, self.excluded).items():
+                expected[neighbor] = sum(
+                    1.0 / len({g for r in self.model.metabolites.get_by_id(m).reactions for g in r.genes})
+                    for m, _, _ in mets
+                )
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            got = {self.index.gene_ids[c]: v for c, v in zip(scores.indices[start:end], scores.data[start:end])}
+            self.assertEqual(got.keys(), expected.keys(), gene_id)
+            for neighbor, value in expected.items():
+                self.assertAlmostEqual(got[neighbor], value)
+            neighbors, values = self.index.score_neighbors(self.index.gene_pos[gene_id])
+            self.assertEqual(list(neighbors), list(scores.indices[start:end]))
+            np.testing.assert_allclose(values, scores.data[start:end])
+
+    def test_evidence_between_matches_shared_map(self):
+        pairs = set()
+        for gene in range(0, len(self.index.gene_ids), 7):
+            neighbors, _ = self.index.score_neighbors(gene)
+            pairs.update((gene, int(n)) for n in neighbors[:4])
+            pairs.add((gene, gene))  # sem evidência
+        evidence = self.index.evidence_between(pairs)
+        self.assertEqual(set(evidence), pairs)
+        for (gene, neighbor), (mets, rxns) in evidence.items():
+            described = {(e["metabolite"], e["subsystem"], e["reaction"])
+                         for e in self.index.describe_evidence(mets, rxns)}
+            self.assertEqual(len(described), len(mets))
+            self.assertEqual(described, self.index.shared_map(gene).get(self.index.gene_ids[neighbor], set()))
+        self.assertEqual(self.index.evidence_between([]), {})
+
+
+class MetaboliteFilterTests(SimpleTestCase):
+
+    def test_curated_names_match_any_compartment_and_convention(self):
+        for met_id in ("atp[c]", "ATP_c", "atp_m", "atp"):
+            self.assertEqual(metabolite_filter.base_id(met_id), "atp")
+        met_ids = ["atp[c]", "atp_m", "MAM01371c", "glc__D_e", "nadh_c"]
+        met_names = ["ATP", "ATP", "ATP", "D-Glucose", "Nicotinamide adenine dinucleotide - reduced"]
+        mask = MetaboliteFilter(percentile=100, keep=["nadh"]).mask(met_ids, met_names, [5, 5, 5, 5, 5])
+        self.assertEqual(mask.tolist(), [True, True, True, False, False])
+
+    def test_degree_percentile(self):
+        degrees = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 50]
+        ids = [f"m{i}" for i in range(len(degrees))]
+        mask = MetaboliteFilter(percentile=90, curated=()).mask(ids, ids, degrees)
+        self.assertEqual([i for i, excluded in enumerate(mask) if excluded], [10])
+        self.assertFalse(MetaboliteFilter(percentile=100, curated=()).mask(ids, ids, degrees).any())
+
+    def test_settings_and_bitset(self):
+        with override_settings(PROMISCUOUS_DEGREE_PERCENTILE=100, PROMISCUOUS_METS_EXTRA="glc__D, pyr",
+                               PROMISCUOUS_METS_KEEP="atp"):
+            met_filter = metabolite_filter.default_filter()
+        self.assertLessEqual({"glc__d", "pyr"}, met_filter.curated)
+        index = MetabolicIndex.from_model(_ecoli_model(), met_filter)
+        excluded = {m for m, e in zip(index.met_ids, index.met_excluded) if e}
+        self.assertLessEqual({"glc__D_e", "pyr_c", "h2o_c", "h_e", "nadh_c"}, excluded)
+        self.assertNotIn("atp_c", excluded)
+        self.assertEqual(index.met_weight[index.met_pos["h2o_c"]], 0)
+
+        bits = metabolite_filter.pack(index.met_excluded)
+        self.assertEqual(len(bits), (len(index.met_ids) + 7) // 8)
+        np.testing.assert_array_equal(metabolite_filter.unpack(bits, len(index.met_ids)), index.met_excluded)
+
+
+class MetabolicStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.model_path = os.path.join(self.tmp.name, "modelo.json")
+        with open(settings.METABOLIC_MODELS["ecoli-core"]["path"], "rb") as src, open(self.model_path, "wb") as dst:
+            dst.write(src.read())
+        self.met_filter = MetaboliteFilter()
+        self.index = MetabolicIndex.from_model(_ecoli_model(), self.met_filter)
+        self.path = os.path.join(self.tmp.name, "grafo")
+        metabolic_store.export_index(self.index, self.path, metabolic_store.source_info(self.model_path),
+                                     self.met_filter)
+
+    def test_memory_mapped_index_matches_model(self):
+        opened = metabolic_store.open_index(self.path, self.model_path, self.met_filter)
+        # arrays somente leitura sobre o arquivo, não cópias em memória do worker
+        self.assertFalse(opened.met_gene.indices.flags.owndata or opened.met_gene.indices.flags.writeable)
+        self.assertEqual(list(opened.gene_ids), self.index.gene_ids)
+        self.assertEqual(list(opened.rxn_names), self.index.rxn_names)
+        np.testing.assert_array_equal(opened.met_excluded, self.index.met_excluded)
+        everything = range(len(self.index.gene_ids))
+        self.assertEqual((opened.score_many(everything) != self.index.score_many(everything)).nnz, 0)
+        for i in everything:
+            self.assertEqual(opened.shared_map(i), self.index.shared_map(i))
+        self.assertEqual(opened.source_sha256, metabolic_store.source_info(self.model_path)["sha256"])
+
+    def test_stale_graph_is_ignored(self):
+        with mock.patch("builtins.print"):
+            other_filter = MetaboliteFilter(percentile=90)
+            self.assertIsNone(metabolic_store.open_index(self.path, self.model_path, other_filter))
+            with open(self.model_path, "a") as f:
+                f.write("\n")
+            self.assertIsNone(metabolic_store.open_index(self.path, self.model_path, self.met_filter))
+        self.assertIsNone(metabolic_store.open_index(os.path.join(self.tmp.name, "ausente"), self.model_path))
+
+
+class NeighborhoodTests(SimpleTestCase):
+
+    def setUp(self):
+        self.index = MetabolicIndex.from_model(_ecoli_model(), MetaboliteFilter())
+        self.gene = max(range(len(self.index.gene_ids)), key=lambda g: len(self.index.score_neighbors(g)[0]))
+
+    def _expand(self, hops, budget_seconds=60, memo=None, **kwargs):
+        options = {"frontier_cap": 10**6, "min_score": 0.0, **kwargs}
+        return neighborhood.expand(self.index, self.gene, hops, budget_seconds=budget_seconds,
+                                   memo=memo or neighborhood.OneHopMemo(self.index, 10**6), **options)
+
+    def test_paths_follow_breadth_first_search(self):
+        direct, edges = self.index.score_neighbors(self.gene)
+        ranked, truncated = self._expand(2)
+        self.assertFalse(truncated)
+        by_gene = {d["gene"]: d for d in ranked}
+        second = set()
+        for n in direct:
+            second.update(self.index.score_neighbors(n)[0])
+        self.assertEqual({g for g, d in by_gene.items() if d["hop"] == 1}, set(direct))
+        self.assertEqual({g for g, d in by_gene.items() if d["hop"] == 2},
+                         second - set(direct) - {self.gene})
+
+        for n, edge in zip(direct, edges):
+            self.assertAlmostEqual(by_gene[n]["score"], edge / edges.max())
+        for d in by_gene.values():
+            if d["hop"] != 2:
+                continue
+            # melhor caminho entre os pais diretos
+            best = 0.0
+            for parent in direct:
+                neighbors, parent_edges = self.index.score_neighbors(parent)
+                hit = np.flatnonzero(neighbors == d["gene"])
+                if len(hit):
+                    best = max(best, by_gene[parent]["score"] * parent_edges[hit[0]] / parent_edges.max())
+            self.assertAlmostEqual(d["score"], best)
+        scores = [round(d["score"], 12) for d in ranked]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_bounds(self):
+        one_hop, _ = self._expand(1)
+        ranked, truncated = self._expand(3, budget_seconds=0)
+        self.assertTrue(truncated)
+        self.assertEqual(ranked, one_hop)
+
+        ranked, _ = self._expand(2, min_score=0.5)
+        self.assertTrue(all(d["score"] >= 0.5 for d in ranked))
+        uncapped, _ = self._expand(2)
+        ranked, _ = self._expand(2, frontier_cap=1)
+        # só o melhor vizinho direto é expandido
+        self.assertLessEqual({d["via"] for d in ranked if d["hop"] == 2}, {one_hop[0]["gene"]})
+        self.assertLess(len(ranked), len(uncapped))
+
+    def test_memo_is_bounded_and_reused(self):
+        memo = neighborhood.OneHopMemo(self.index, 3)
+        self._expand(2, memo=memo)
+        self.assertEqual(len(memo._entries), 3)
+        cached = list(memo._entries)
+        with mock.patch.object(self.index, "score_many", side_effect=AssertionError("recalculado")):
+            memo.get_many(cached)
+
+
+class ModelRegistryTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        specs = {}
+        for name in ("a", "b", "c"):
+            path = os.path.join(self.tmp.name, f"{name}.json")
+            with open(settings.METABOLIC_MODELS["ecoli-core"]["path"], "rb") as src, open(path, "wb") as dst:
+                dst.write(src.read())
+            specs[name] = {"path": path}
+        self.specs = specs
+        for patcher in (mock.patch.object(model_registry, "_rss_bytes", return_value=None),
+                        mock.patch.object(model_registry, "release_flux_engine"),
+                        mock.patch("builtins.print")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # sem RSS, cada modelo vale o índice + 4x o tamanho do arquivo
+        entry_bytes = (model_registry.index_bytes(MetabolicIndex.from_model(_ecoli_model(), MetaboliteFilter()))
+                       + os.path.getsize(specs["a"]["path"]) * model_registry.MODEL_SIZE_FACTOR)
+        self.registry = model_registry.ModelRegistry(specs, "a", int(entry_bytes * 2.5), MetaboliteFilter())
+
+    def _loaded(self):
+        return sorted(e.name for e in self.registry.entries.values() if e.loaded)
+
+    def test_least_recently_used_model_is_unloaded(self):
+        model_a = self.registry.model("a")
+        self.registry.index("a")
+        self.registry.index("b")
+        self.assertEqual(self._loaded(), ["a", "b"])
+        self.registry.index("a")  # "b" passa a ser o menos usado
+        self.registry.index("c")
+        self.assertEqual(self._loaded(), ["a", "c"])
+        model_registry.release_flux_engine.assert_called_once()
+        self.assertIs(self.registry.model("a"), model_a)
+        self.assertEqual(self.registry.name_of(model_a), "a")
+        self.assertEqual(self.registry.version("c"), file_sha256(self.specs["c"]["path"]))
+        with self.assertRaises(model_registry.UnknownModel):
+            self.registry.index("nao-existe")
+
+    def test_changed_file_is_reloaded(self):
+        first = self.registry.index("a")
+        self.assertIs(self.registry.index("a"), first)
+        with open(self.specs["a"]["path"], "a") as f:
+            f.write("\n")
+        second = self.registry.index("a")
+        self.assertIsNot(second, first)
+        self.assertEqual(self.registry.version("a"), file_sha256(self.specs["a"]["path"]))
+
+
+class FluxEngineTests(SimpleTestCase):
+
+    def test_worker_checks_deadline_between_knockouts(self):
+        model = _ecoli_model()
+        genes = [g.id for g in model.genes[:3]]
+        with mock.patch.object(flux_engine, "_worker_model", model):
+            self.assertEqual(flux_engine._knockout_chunk(genes, time.time() - 1), {})
+            self.assertEqual(set(flux_engine._knockout_chunk(genes, time.time() + 60)), set(genes))
+
+    def test_pool_matches_serial(self):
+        model = _ecoli_model()
+        genes = [g.id for g in model.genes[:8]]
+        serial = flux_engine.FluxEngine(model, 1).knockouts(genes)
+        engine = flux_engine.FluxEngine(model, 2)
+        self.addCleanup(engine.shutdown)
+        parallel = engine.knockouts(genes)
+        self.assertTrue(parallel["complete"])
+        for gene in genes:
+            self.assertAlmostEqual(parallel["growth"][gene], serial["growth"][gene], places=6)
+
+    def test_pool_does_not_fork_threaded_worker(self):
+        model = _ecoli_model()
+        genes = [g.id for g in model.genes[:6]]
+        serial = flux_engine.FluxEngine(model, 1).knockouts(genes)
+        engine = flux_engine.FluxEngine(model, 2, settings.METABOLIC_MODELS["ecoli-core"]["path"])
+        self.addCleanup(engine.shutdown)
+        parallel = engine.knockouts(genes)
+        self.assertNotEqual(engine._pool._mp_context.get_start_method(), "fork")
+        for gene in genes:
+            self.assertAlmostEqual(parallel["growth"][gene], serial["growth"][gene], places=6)
+
+    def test_expired_budget_reports_pending(self):
+        model = _ecoli_model()
+        engine = flux_engine.FluxEngine(model, 2)
+        self.addCleanup(engine.shutdown)
+        genes = [g.id for g in model.genes]
+        result = engine.knockouts(genes, budget_seconds=0)
+        self.assertFalse(result["complete"])
+        self.assertEqual(set(result["growth"]) | set(result["pending"]), set(genes))
+
+    def test_released_engine_keeps_pool_until_last_borrower(self):
+        model = _ecoli_model()
+        engine = flux_engine.get_flux_engine(model, 2)
+        self.addCleanup(engine.shutdown)
+        genes = [g.id for g in model.genes[:4]]
+        engine._acquire()  # requisição em andamento
+        pool = engine._get_pool()
+        flux_engine.release_flux_engine(model)  # modelo descarregado pelo registro
+        self.assertIs(engine._pool, pool)
+        self.assertTrue(engine.knockouts(genes)["complete"])
+        self.assertIs(engine._pool, pool)
+        engine._release()
+        self.assertIsNone(engine._pool)
+        self.assertIsNot(flux_engine.get_flux_engine(model, 2), engine)
+        flux_engine.release_flux_engine(model)
+
+
+class _Genes:
+    def get(self, gene_id):
+        return {"geneSymbols": f"SYM_{gene_id}"}
+
+
+class PredictionBatchTests(SimpleTestCase):
+
+    def setUp(self):
+        self.index = MetabolicIndex.from_model(_ecoli_model(), MetaboliteFilter())
+        self.version = None
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        overrides = override_settings(PREDICTION_CACHE_DIR=self.tmp.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        prediction_cache._cache_instance = None
+        self.addCleanup(setattr, prediction_cache, "_cache_instance", None)
+        for name, value in (
+            ("load_index", lambda model=None: self.index),
+            ("load_genes", _Genes),
+            ("load_disease_map", lambda genes: {f"SYM_{g}": [f"doença {g}"] for g in genes}),
+            ("prediction_version", lambda model=None: self.version),
+        ):
+            patcher = mock.patch.object(prediction, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.genes = [g for g in self.index.gene_ids if len(self.index.score_neighbors(self.index.gene_pos[g])[0]) > 3][:6]
+
+    def test_batch_matches_single_gene_predictions(self):
+        panel = [self.genes[2], "ENSG_AUSENTE", *self.genes, self.genes[0]]
+        batch = neighbors_batch(panel, top_n=3)
+        self.assertEqual(batch["not_found"], ["ENSG_AUSENTE"])
+        self.assertEqual([r["gene_id"] for r in batch["results"]],
+                         [self.genes[2], *(g for g in self.genes if g != self.genes[2])])
+        for result in batch["results"]:
+            self.assertEqual(result, prediction.neighbors(result["gene_id"], top_n=3))
+            self.assertEqual(len(result["neighbors"]), 3)
+            self.assertEqual(result["diseases"], [f"doença {result['gene_id']}"])
+            scores = [n["exclusive_score"] for n in result["neighbors"]]
+            self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_results_are_cached_per_version(self):
+        self.version = ["modelo-1"]
+        first = neighbors_batch(self.genes, top_n=2)
+        with mock.patch.object(self.index, "score_many", side_effect=AssertionError("recalculado")):
+            self.assertEqual(neighbors_batch(self.genes, top_n=2), first)
+        self.assertEqual(prediction_cache.get_prediction_cache().stats()["hits"]["memory"], len(self.genes))
+
+        # nova versão dos dados (modelo, genes ou doenças): as entradas antigas não valem mais
+        self.version = ["modelo-2"]
+        with mock.patch.object(self.index, "score_many", wraps=self.index.score_many) as score_many:
+            self.assertEqual(neighbors_batch(self.genes, top_n=2), first)
+        score_many.assert_called_once()
+
+    def test_alternating_models_keep_memory_entries(self):
+        cache = prediction_cache.get_prediction_cache()
+        cache.set(["human-gem"], ("G1", 3, False), {"gene_id": "G1"})
+        cache.set(["ecoli-core"], ("G2", 3, False), {"gene_id": "G2"})
+        for _ in range(3):
+            self.assertEqual(cache.get(["human-gem"], ("G1", 3, False)), {"gene_id": "G1"})
+            self.assertEqual(cache.get(["ecoli-core"], ("G2", 3, False)), {"gene_id": "G2"})
+        self.assertEqual(cache.stats()["hits"], {"memory": 6, "disk": 0})
+
+    def test_cache_is_shared_through_disk(self):
+        self.version = ["modelo-1"]
+        first = neighbors_batch(self.genes[:2], top_n=2)
+        prediction_cache._cache_instance = None  # outro worker, com memória vazia
+        with mock.patch.object(self.index, "score_many", side_effect=AssertionError("recalculado")):
+            self.assertEqual(neighbors_batch(self.genes[:2], top_n=2), first)
+        self.assertEqual(prediction_cache.get_prediction_cache().stats()["hits"]["disk"], 2)
+
+    def test_evidence_only_for_returned_neighbors(self):
+        with mock.patch.object(self.index, "describe_evidence", side_effect=AssertionError("strings montadas")):
+            plain = neighbors_batch(self.genes[:2], top_n=2)
+        self.assertNotIn("evidence", plain["results"][0]["neighbors"][0])
+
+        response = _post(PredictBatchView.as_view(), {"gene_ids": self.genes[:2], "top_n": 2},
+                         path="/?include=evidence")
+        self.assertEqual(response.status_code, 200)
+        for result, expected in zip(response.data["results"], plain["results"]):
+            self.assertEqual([n["gene_id"] for n in result["neighbors"]],
+                             [n["gene_id"] for n in expected["neighbors"]])
+            shared = self.index.shared_map(self.index.gene_pos[result["gene_id"]])
+            for neighbor in result["neighbors"]:
+                self.assertEqual({(e["metabolite"], e["subsystem"], e["reaction"]) for e in neighbor["evidence"]},
+                                 shared[neighbor["gene_id"]])
+                self.assertTrue(all(e["metabolite_name"] for e in neighbor["evidence"]))
+
+
+class WarmupTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(warmup._state, ready=False, error=None, timings_ms={}, warmed_in_pid=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index = MetabolicIndex.from_model(_ecoli_model(), MetaboliteFilter())
+
+    def _ready(self):
+        request = APIRequestFactory().get("/api/health/ready/")
+        return ReadinessView.as_view()(request)
+
+    def test_warmup_loads_prediction_data_before_requests(self):
+        load_model = mock.Mock()
+        with mock.patch.multiple(prediction, load_genes=mock.Mock(), load_model=load_model,
+                                 load_index=mock.Mock(return_value=self.index)):
+            self.assertEqual(self._ready().status_code, 503)
+            state = warmup.warmup(load_full_model=False)
+            prediction.load_genes.assert_called_once()
+        self.assertTrue(state["ready"])
+        self.assertEqual(state["warmed_in_pid"], os.getpid())
+        self.assertEqual(set(state["timings_ms"]), {"load_genes", "load_index", "load_subsystems", "probe"})
+        load_model.assert_not_called()
+        response = self._ready()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["ready"])
+
+    def test_failed_warmup_keeps_lazy_loading(self):
+        with mock.patch.multiple(prediction, load_genes=mock.Mock(),
+                                 load_index=mock.Mock(side_effect=OSError("grafo ausente"))), \
+                mock.patch("builtins.print"):
+            state = warmup.warmup(load_full_model=False)
+        self.assertFalse(state["ready"])
+        self.assertEqual(state["error"], "grafo ausente")
+        self.assertEqual(self._ready().status_code, 503)
+
+
+class KnockoutTableTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.model = _ecoli_model()
+        self.genes = [g.id for g in self.model.genes]
+
+    def test_interrupted_build_resumes_and_matches_engine(self):
+        original = flux_engine.FluxEngine.knockouts
+        calls = []
+
+        def knockouts(engine, gene_ids, *args, **kwargs):
+            calls.append(list(gene_ids))
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return original(engine, gene_ids, *args, **kwargs)
+
+        log = mock.Mock()
+        with mock.patch.object(flux_engine.FluxEngine, "knockouts", knockouts):
+            with self.assertRaises(KeyboardInterrupt):
+                knockout_table.build_table(self.model, self.tmp.name, "sha", 1, chunk_size=50, log=log)
+            self.assertIsNone(knockout_table.open_table(self.tmp.name, "sha"))
+            knockout_table.build_table(self.model, self.tmp.name, "sha", 1, chunk_size=50, log=log)
+        # o primeiro bloco veio do checkpoint
+        self.assertEqual(calls, [self.genes[:50], self.genes[50:100], self.genes[50:100], self.genes[100:]])
+
+        expected = flux_engine.FluxEngine(self.model, 1).knockouts(self.genes)["growth"]
+        table = knockout_table.open_table(self.tmp.name, "sha")
+        for gene in self.genes:
+            self.assertAlmostEqual(table.get(gene), expected[gene], places=6)
+        self.assertIsNone(table.get("ENSG_AUSENTE"))
+        self.assertAlmostEqual(table.base_biomass, self.model.slim_optimize(), places=6)
+
+    def test_prediction_reads_table_without_running_knockouts(self):
+        table = knockout_table.KnockoutTable(self.genes[:3], np.array([0.5, np.nan, 0.0]), 0.87, "sha")
+        with mock.patch.object(prediction, "load_knockout_table", return_value=table), \
+                mock.patch.object(prediction, "get_flux_engine_for",
+                                  side_effect=AssertionError("FluxEngine usado")):
+            base, knockouts = prediction._knockouts([self.genes[0], self.genes[2]], 1.0)
+        self.assertEqual(base, 0.87)
+        self.assertEqual(knockouts, {"growth": {self.genes[0]: 0.5, self.genes[2]: 0.0},
+                                     "complete": True, "pending": []})
+
+        # genes fora da tabela (NaN) vão para o FluxEngine
+        engine = mock.Mock()
+        engine.knockouts.return_value = {"growth": {self.genes[1]: 0.1}, "complete": True, "pending": []}
+        with mock.patch.object(prediction, "load_knockout_table", return_value=table), \
+                mock.patch.object(prediction, "get_flux_engine_for", return_value=engine), \
+                mock.patch.object(prediction, "load_model", return_value=self.model):
+            _, knockouts = prediction._knockouts(self.genes[:3], 1.0)
+        engine.knockouts.assert_called_once_with([self.genes[1]], 1.0)
+        self.assertEqual(knockouts["growth"], {self.genes[0]: 0.5, self.genes[1]: 0.1, self.genes[2]: 0.0})
+
+
+class DiseaseDbTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.object(disease_db, "_engine", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        stats = mock.patch.dict(disease_db._stats, connections_opened=0, checkouts=0, queries=0)
+        stats.start()
+        self.addCleanup(stats.stop)
+
+    def test_one_parameterized_query_per_gene_list(self):
+        conn = mock.MagicMock()
+        conn.__enter__.return_value.execute.return_value.fetchall.return_value = [
+            ("ALDOA", ["Anemia", "Miopatia"]),
+        ]
+        engine = mock.Mock(connect=mock.Mock(return_value=conn))
+        with mock.patch.object(disease_db, "get_engine", return_value=engine):
+            self.assertEqual(disease_db.diseases_for_genes({"G1": 1, "G2": 2}),
+                             {"ALDOA": ["Anemia", "Miopatia"]})
+            self.assertEqual(disease_db.diseases_for_genes([]), {})
+        conn.__enter__.return_value.execute.assert_called_once_with(
+            disease_db.DISEASES_QUERY, {"gene_ids": ["G1", "G2"]})
+        self.assertEqual(disease_db.pool_metrics()["queries"], 1)
+
+    def test_connections_are_reused_across_lookups(self):
+        url = f"sqlite:///{os.path.join(self.tmp.name, 'doencas.sqlite')}"
+        with override_settings(DISEASE_DB_URL=url, DISEASE_DB_POOL_SIZE=2, DISEASE_DB_MAX_OVERFLOW=0):
+            engine = disease_db.get_engine()
+            self.addCleanup(engine.dispose)
+            for _ in range(5):
+                with engine.connect() as conn:
+                    conn.exec_driver_sql("SELECT 1")
+            self.assertIs(disease_db.get_engine(), engine)
+        stats = disease_db.pool_metrics()
+        self.assertEqual((stats["connections_opened"], stats["checkouts"]), (1, 5))
+
+    def test_missing_url_fails_clearly(self):
+        with override_settings(DISEASE_DB_URL=None), self.assertRaisesMessage(ImproperlyConfigured, "DISEASE_DB_URL"):
+            disease_db.get_engine()
+
+    def test_disease_map_without_snapshot_uses_database(self):
+        with mock.patch.object(prediction, "load_phenotype_index", return_value=None), \
+                mock.patch.object(disease_db, "diseases_for_genes", return_value={"ALDOA": ["Anemia"]}) as lookup:
+            self.assertEqual(prediction.load_disease_map(["G1", "G2"]), {"ALDOA": ["Anemia"]})
+        lookup.assert_called_once_with(["G1", "G2"])
+
+
+class PhenotypeSnapshotTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "fenotipos.sqlite")
+        for name in ("_index_instance", "_index_path", "_index_stat", "_index_checked"):
+            patcher = mock.patch.object(phenotype_index, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        print_patcher = mock.patch("builtins.print")
+        print_patcher.start()
+        self.addCleanup(print_patcher.stop)
+
+    def test_snapshot_matches_database_format(self):
+        phenotype_index.write_snapshot(
+            self.path,
+            [("G1", "ALDOA"), ("G2", "PKM"), ("G3", "SEMFENO")],
+            [("ALDOA", "Miopatia"), ("ALDOA", "Anemia"), ("ALDOA", "Anemia"), ("PKM", "Anemia")],
+        )
+        index = phenotype_index.get_phenotype_index(self.path, 30)
+        self.assertEqual(index.diseases_for_genes(["G1", "G2", "G3", "G4"]),
+                         {"ALDOA": ["Anemia", "Miopatia"], "PKM": ["Anemia"]})
+
+    def test_replaced_snapshot_is_reloaded(self):
+        self.assertIsNone(phenotype_index.get_phenotype_index(self.path, 0))
+        v1 = phenotype_index.write_snapshot(self.path, [("G1", "ALDOA")], [("ALDOA", "Anemia")])
+        first = phenotype_index.get_phenotype_index(self.path, 0)
+        self.assertEqual(first.version, v1)
+        self.assertIs(phenotype_index.get_phenotype_index(self.path, 0), first)
+
+        v2 = phenotype_index.write_snapshot(self.path, [("G1", "ALDOA")], [("ALDOA", "Miopatia")])
+        self.assertNotEqual(v1, v2)
+        # dentro do intervalo de verificação o arquivo não é consultado
+        self.assertIs(phenotype_index.get_phenotype_index(self.path, 3600), first)
+        second = phenotype_index.get_phenotype_index(self.path, 0)
+        self.assertEqual(second.version, v2)
+        self.assertEqual(second.diseases_for_genes(["G1"]), {"ALDOA": ["Miopatia"]})
+
+    def test_prediction_uses_snapshot_without_database(self):
+        version = phenotype_index.write_snapshot(self.path, [("G1", "ALDOA")], [("ALDOA", "Anemia")])
+        failing = mock.Mock(side_effect=AssertionError("Postgres consultado"))
+        with override_settings(PHENOTYPE_SNAPSHOT_PATH=self.path), \
+                mock.patch.multiple(disease_db, diseases_for_genes=failing, table_version=failing):
+            self.assertEqual(prediction.load_disease_map(["G1", "G2"]), {"ALDOA": ["Anemia"]})
+            self.assertEqual(prediction.disease_table_version(), f"snapshot:{version}")
+
+
+class GeneTableTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_same_records_as_pandas_dictionary(self):
+        table = gene_table.parse_tsv(prediction.GENES_PATH)
+        df = pandas.read_csv(prediction.GENES_PATH, sep="\t")
+        df = df.set_index(df.columns[0])
+        expected = df[["geneSymbols", "geneNames", "compartments"]].to_dict(orient="index")
+        self.assertEqual(len(table), len(expected))
+        for gene_id, info in expected.items():
+            info = {k: None if isinstance(v, float) and math.isnan(v) else v for k, v in info.items()}
+            self.assertEqual(table.get(gene_id), info)
+        self.assertIsNone(table.get("ENSG_AUSENTE"))
+
+    def test_resolve_by_any_identifier(self):
+        table = gene_table.parse_tsv(prediction.GENES_PATH)
+        for identifier in ("ENSG00000000419", "DPM1", "8813", "O60762", "MPDS"):
+            self.assertEqual(table.resolve(identifier), ["ENSG00000000419"], identifier)
+        self.assertEqual(table.resolve("NAO_EXISTE"), [])
+
+    def test_binary_cache_follows_tsv_content(self):
+        tsv = os.path.join(self.tmp.name, "genes.tsv")
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        with open(tsv, "w") as f:
+            f.write("genes\tgeneUniProtID\tgeneSymbols\tgeneEntrezID\tgeneNames\tgeneAliases\tcompartments\n"
+                    "G1\tP1\tAAA\t1\tgene a\tA1;A2\tCytosol\n"
+                    "G2\tP2\tBBB\t2\t\t\tNucleus\n")
+        first = gene_table.load_gene_table(tsv, cache_dir)
+        with mock.patch.object(gene_table, "parse_tsv", side_effect=AssertionError("TSV relido")):
+            cached = gene_table.load_gene_table(tsv, cache_dir)
+        self.assertEqual(cached.get("G2"), first.get("G2"))
+        self.assertEqual(cached.get("G2"), {"geneSymbols": "BBB", "geneNames": None, "compartments": "Nucleus"})
+
+        with open(tsv, "a") as f:
+            f.write("G3\tP3\tCCC\t3\tgene c\t\tCytosol\n")
+        self.assertEqual(gene_table.load_gene_table(tsv, cache_dir).resolve("CCC"), ["G3"])
+
+
+def _fake_batch(calls):
+    def neighbors_batch(gene_ids, *args, **kwargs):
+        calls.append(list(gene_ids))
+        found = [g for g in gene_ids if g != "ENSG_AUSENTE"]
+        return {"results": [{"gene_id": g, "neighbors": []} for g in found],
+                "not_found": [g for g in gene_ids if g not in found]}
+    return neighbors_batch
+
+
+class PredictionStreamTests(SimpleTestCase):
+
+    def test_each_gene_is_yielded_before_the_next_is_computed(self):
+        calls = []
+        with mock.patch.object(prediction, "neighbors_batch", _fake_batch(calls)):
+            stream = prediction.neighbors_stream(["G1", "G2", "G3"])
+            self.assertEqual(next(stream), {"gene_id": "G1", "neighbors": []})
+            self.assertEqual(calls, [["G1"]])
+            rest = list(stream)
+        self.assertEqual(calls, [["G1"], ["G2"], ["G3"]])
+        self.assertEqual(rest[-1], {"done": True, "count": 3, "not_found": 0, "errors": 0})
+
+    def test_ndjson_response(self):
+        calls = []
+        with mock.patch.object(prediction, "neighbors_batch", _fake_batch(calls)):
+            response = _post(PredictBatchView.as_view(), {"gene_ids": ["G1", "ENSG_AUSENTE", "G1"]},
+                             path="/?stream=1")
+            lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(lines, [
+            {"gene_id": "G1", "neighbors": []},
+            {"gene_id": "ENSG_AUSENTE", "not_found": True},
+            {"done": True, "count": 1, "not_found": 1, "errors": 0},
+        ])
+
+    def test_failed_gene_is_reported_in_the_stream(self):
+        calls = []
+        fake = _fake_batch(calls)
+
+        def neighbors_batch(gene_ids, *args, **kwargs):
+            if gene_ids == ["G2"]:
+                raise RuntimeError("solver falhou")
+            return fake(gene_ids, *args, **kwargs)
+
+        with mock.patch.object(prediction, "neighbors_batch", neighbors_batch), \
+                mock.patch("builtins.print"), mock.patch("traceback.print_exc"):
+            response = _post(PredictBatchView.as_view(), {"gene_ids": ["G1", "G2", "G3"]}, path="/?stream=1")
+            lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(lines, [
+            {"gene_id": "G1", "neighbors": []},
+            {"gene_id": "G2", "error": "solver falhou"},
+            {"gene_id": "G3", "neighbors": []},
+            {"done": True, "count": 2, "not_found": 0, "errors": 1},
+        ])
+
+    def test_failure_outside_chunks_ends_with_error_summary(self):
+        def records():
+            yield {"gene_id": "G1", "neighbors": []}
+            raise RuntimeError("conexão perdida")
+
+        with mock.patch("builtins.print"), mock.patch("traceback.print_exc"):
+            lines = [json.loads(line) for line in _ndjson(records())]
+        self.assertEqual(lines[-1], {"done": False, "error": "conexão perdida"})
+
+
+class PredictionBenchmarkTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for module, name in ((prediction, "_registry"), (prediction, "_genes_dictionary"),
+                             (phenotype_index, "_index_instance"), (phenotype_index, "_index_path"),
+                             (phenotype_index, "_index_stat"), (phenotype_index, "_index_checked")):
+            patcher = mock.patch.object(module, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_compare_flags_only_meaningful_regressions(self):
+        def report(**medians):
+            return {"models": {"ecoli-core": {"stages": {
+                stage: {"median_ms": ms} for stage, ms in medians.items()}}}}
+
+        rows = prediction_benchmark.compare(
+            report(batch=20.0, score_many=0.9, flux=11.0, novo=1.0),
+            report(batch=10.0, score_many=0.3, flux=10.0),
+            threshold=0.25,
+        )
+        self.assertEqual({r["stage"]: r["regression"] for r in rows},
+                         {"batch": True, "score_many": False, "flux": False})
+
+    def test_each_model_starts_cold(self):
+        seen = []
+        original = prediction_benchmark._run_model
+
+        def run(*args):
+            seen.append((prediction._registry, prediction_cache._cache_instance))
+            return original(*args)
+
+        with mock.patch.object(prediction_benchmark, "_run_model", run), mock.patch("builtins.print"):
+            prediction_benchmark.run_model("ecoli-core", n_genes=2, repeat=1, skip_flux=True, log=mock.Mock())
+            with override_settings(PREDICTION_CACHE_DIR=self.tmp.name):
+                prediction_cache.get_prediction_cache()  # estado deixado por outro uso no processo
+            prediction_benchmark.run_model("ecoli-core", n_genes=2, repeat=1, skip_flux=True, log=mock.Mock())
+        self.assertEqual(seen, [(None, None), (None, None)])
+
+    def test_command_runs_on_bundled_model_and_checks_baseline(self):
+        output = os.path.join(self.tmp.name, "atual.json")
+        args = ["benchmark_prediction", "--model", "ecoli-core", "--genes", "3", "--repeat", "1",
+                "--skip-flux", "--output", output]
+        with mock.patch("builtins.print"):
+            call_command(*args, stdout=io.StringIO(), stderr=io.StringIO())
+        report = prediction_benchmark.load_report(output)
+        model = report["models"]["ecoli-core"]
+        self.assertEqual(len(model["sample"]), 3)
+        self.assertLessEqual({"cold_build_index", "scoring_only", "score_many", "single_gene", "two_hop",
+                              "batch", "cached_single"}, set(model["stages"]))
+        self.assertNotIn("flux", model["stages"])
+        # nada do diretório temporário da execução fica nos singletons
+        self.assertIsNone(prediction._registry)
+        self.assertIsNone(prediction._genes_dictionary)
+        self.assertIsNone(prediction_cache._cache_instance)
+        self.assertIsNone(phenotype_index._index_instance)
+
+        # baseline 1000x mais rápido em todas as etapas: o comando falha
+        for stats in model["stages"].values():
+            stats["median_ms"] /= 1000
+        baseline = os.path.join(self.tmp.name, "baseline.json")
+        prediction_benchmark.save_report(report, baseline)
+        with mock.patch("builtins.print"), self.assertRaises(CommandError):
+            call_command(*args, "--baseline", baseline, stdout=io.StringIO(), stderr=io.StringIO())
+
+
+class PredictionMetricsTests(SimpleTestCase):
+
+    def setUp(self):
+        for name in ("_histograms", "_counters"):
+            patcher = mock.patch.dict(getattr(metrics, name), clear=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _middleware(self, view):
+        return ServerTimingMiddleware(lambda request: view())
+
+    def test_server_timing_header_and_log_line(self):
+        def view():
+            with metrics.stage("score"):
+                time.sleep(0.01)
+            with metrics.stage("diseases"):
+                pass
+            return HttpResponse("ok")
+
+        request = APIRequestFactory().get("/api/predict/")
+        with mock.patch.object(metrics.logger, "info") as log:
+            response = self._middleware(view)(request)
+        timings = dict(part.split(";dur=") for part in response["Server-Timing"].split(", "))
+        self.assertEqual(list(timings), ["score", "diseases", "total"])
+        self.assertGreaterEqual(float(timings["score"]), 10)
+        self.assertGreaterEqual(float(timings["total"]), float(timings["score"]))
+        line = json.loads(log.call_args.args[0])
+        self.assertEqual((line["path"], line["status"]), ("/api/predict/", 200))
+        self.assertEqual(set(line["stages_ms"]), {"score", "diseases", "total"})
+
+        # requisições sem etapas medidas não ganham cabeçalho
+        response = self._middleware(lambda: HttpResponse("ok"))(APIRequestFactory().get("/"))
+        self.assertNotIn("Server-Timing", response)
+
+    def test_histograms_and_metrics_endpoint(self):
+        for ms in (0.2, 3, 3, 70000):
+            metrics.observe("score", ms)
+        metrics.incr("prediction_cache.hit", 2)
+        metrics.incr("prediction_cache.hit", 0)
+        snapshot = metrics.snapshot()
+        score = snapshot["stages"]["score"]
+        self.assertEqual((score["count"], score["max_ms"]), (4, 70000))
+        buckets = {b["le"]: b["count"] for b in score["buckets"]}
+        self.assertEqual((buckets[0.5], buckets[2.5], buckets[5], buckets[60000], buckets["+Inf"]), (1, 1, 3, 3, 4))
+        self.assertEqual(snapshot["counters"], {"prediction_cache.hit": 2})
+
+        request = APIRequestFactory().get("/api/health/metrics/")
+        force_authenticate(request, user=_User())
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        with override_settings(PREDICTION_CACHE_DIR=os.path.join(tmp.name, "predicoes"),
+                               EXTRACTION_CACHE_DIR=os.path.join(tmp.name, "extracoes")), \
+                mock.patch.object(prediction_cache, "_cache_instance", None), \
+                mock.patch.object(extraction_cache, "_cache_instance", None):
+            data = MetricsView.as_view()(request).data
+        self.assertEqual(data["stages"]["score"]["count"], 4)
+        self.assertLessEqual({"prediction_cache", "extraction_cache", "disease_db", "pid"}, set(data))
+
+
+class PredictionJobTests(TestCase):
+
+    def setUp(self):
+        self.alice = User.objects.create_user("alice")
+        self.bob = User.objects.create_user("bob")
+        self.params = prediction_jobs.normalize_params(["G1", "G2", "G1"], 3, False, 1, "ecoli-core")
+
+    def test_identical_jobs_are_deduplicated_per_user(self):
+        job, created = prediction_jobs.submit(self.params, self.alice)
+        again, created_again = prediction_jobs.submit(dict(self.params), self.alice)
+        other, created_other = prediction_jobs.submit(self.params, self.bob)
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.id, job.id)
+        self.assertTrue(created_other)
+        self.assertNotEqual(other.id, job.id)
+        self.assertEqual(job.params["gene_ids"], ["G1", "G2"])
+
+    def test_claim_next_reserves_each_job_once(self):
+        first, _ = prediction_jobs.submit(self.params, self.alice)
+        second, _ = prediction_jobs.submit(self.params, self.bob)
+        claimed = [prediction_jobs.claim_next(), prediction_jobs.claim_next(), prediction_jobs.claim_next()]
+        self.assertEqual([j.id for j in claimed[:2]], [first.id, second.id])
+        self.assertIsNone(claimed[2])
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.attempts), (PredictionJob.RUNNING, 1))
+        # terminado, o mesmo pedido gera um job novo
+        prediction_jobs._finish(first, PredictionJob.DONE, result={"results": []})
+        self.assertTrue(prediction_jobs.submit(self.params, self.alice)[1])
+
+    def test_only_owner_or_staff_can_read_job(self):
+        job, _ = prediction_jobs.submit(self.params, self.alice)
+        staff = User.objects.create_user("carol", is_staff=True)
+
+        def get(user):
+            request = APIRequestFactory().get(f"/api/metab/jobs/{job.id}/")
+            force_authenticate(request, user=user)
+            return PredictionJobDetailView.as_view()(request, job_id=job.id)
+
+        self.assertEqual(get(self.alice).status_code, 200)
+        self.assertEqual(get(self.bob).status_code, 404)
+        self.assertEqual(get(staff).status_code, 200)
+
+
+def _ignore_sigterm():
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    time.sleep(60)
+
+
+class PredictionWorkersTests(SimpleTestCase):
+
+    def test_stuck_worker_is_killed_after_timeout(self):
+        ctx = multiprocessing.get_context("fork")
+        process = ctx.Process(target=_ignore_sigterm)
+        process.start()
+        time.sleep(0.2)
+        killed = stop_workers([process], timeout=0.5, log=lambda message: None)
+        self.assertEqual(killed, [process.pid])
+        self.assertFalse(process.is_alive())
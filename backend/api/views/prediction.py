@@ -1,8 +1,24 @@
 # core/views.py
-from django.http import JsonResponse
-from rest_framework import viewsets
+import json
+import time
+import traceback
 
-from api.services.prediction import neighbors
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework import viewsets, status, permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.services import disease_db, metrics, ner_and_inference, prediction_jobs, warmup
+from api.services.extraction_cache import get_extraction_cache
+from api.services.pdf_engine import PdfExtractionError
+from api.services.prediction import (
+    load_registry, neighbors, neighbors_batch, neighbors_stream, subsystem_impact,
+)
+from api.services.prediction_cache import get_prediction_cache
 
 
 class PersonViewSet(viewsets.ModelViewSet):
@@ -10,8 +26,274 @@ class PersonViewSet(viewsets.ModelViewSet):
         return JsonResponse({'status': "Sucesso"})
 
 
+def _parse_hops(value):
+    """Nº de passos da vizinhança (1 a NEIGHBORHOOD_MAX_HOPS), ou None se inválido."""
+    try:
+        hops = int(value)
+    except (TypeError, ValueError):
+        return None
+    return hops if 1 <= hops <= settings.NEIGHBORHOOD_MAX_HOPS else None
+
+
+def _hops_error():
+    return ValidationError({"error": f"'hops' deve ser um inteiro entre 1 e {settings.NEIGHBORHOOD_MAX_HOPS}."})
+
+
+def _parse_model(value):
+    """Nome do modelo metabólico (padrão: DEFAULT_METABOLIC_MODEL), ou None se desconhecido."""
+    name = value or settings.DEFAULT_METABOLIC_MODEL
+    return name if isinstance(name, str) and name in load_registry().names() else None
+
+
+def _model_error():
+    models = ", ".join(load_registry().names())
+    return ValidationError({"error": f"'model' deve ser um dos modelos disponíveis: {models}."})
+
+
+def _parse_limit(value, name, maximum):
+    """Inteiro entre 1 e `maximum` (ex.: top_n); ValidationError (400) se inválido."""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = None
+    if number is None or not 1 <= number <= maximum:
+        raise ValidationError({"error": f"'{name}' deve ser um inteiro entre 1 e {maximum}."})
+    return number
+
+
+def _wants_evidence(*values):
+    """`include=evidence` (query string, lista ou texto separado por vírgulas no corpo)."""
+    for value in values:
+        if isinstance(value, str):
+            value = value.split(",")
+        if isinstance(value, list) and "evidence" in (str(v).strip() for v in value):
+            return True
+    return False
+
+
 class PredictViewSet(viewsets.ModelViewSet):
     def post(self, request, ens_gene_id):
         # result = neighbors('ENSG00000000419')
-        result = neighbors(ens_gene_id)
-        return JsonResponse(result)
+        flux = request.query_params.get("flux") in ("1", "true")
+        top_n = _parse_limit(request.query_params.get("top_n", 3), "top_n", settings.PREDICTION_MAX_TOP_N)
+        hops = _parse_hops(request.query_params.get("hops", 1))
+        if hops is None:
+            raise _hops_error()
+        model = _parse_model(request.query_params.get("model"))
+        if model is None:
+            raise _model_error()
+        start = time.perf_counter()
+        evidence = _wants_evidence(request.query_params.get("include"))
+        result = neighbors(ens_gene_id, top_n, flux=flux, hops=hops, model=model, evidence=evidence)
+        warmup.note_request((time.perf_counter() - start) * 1000)
+        if not result:
+            return Response({"error": "Gene não encontrado no modelo."},
+                            status=status.HTTP_404_NOT_FOUND)
+        with metrics.stage("serialize"):
+            return JsonResponse(result)
+
+
+def _parse_gene_ids(gene_ids):
+    """Lista de IDs Ensembl do corpo, com até PREDICTION_MAX_GENE_IDS genes; ValidationError (400) se inválida."""
+    if not isinstance(gene_ids, list) or not gene_ids or not all(isinstance(g, str) for g in gene_ids):
+        raise ValidationError({"error": "Informe 'gene_ids' como uma lista de IDs Ensembl."})
+    if len(gene_ids) > settings.PREDICTION_MAX_GENE_IDS:
+        raise ValidationError({"error": f"'gene_ids' aceita no máximo {settings.PREDICTION_MAX_GENE_IDS} genes."})
+    return gene_ids
+
+
+def _batch_params(data, query_params=None):
+    """Valida o corpo de PredictBatchView/PredictionJobView; ValidationError (400) se inválido."""
+    gene_ids = _parse_gene_ids(data.get("gene_ids"))
+    top_n = _parse_limit(data.get("top_n", 3), "top_n", settings.PREDICTION_MAX_TOP_N)
+    hops = _parse_hops(data.get("hops", 1))
+    if hops is None:
+        raise _hops_error()
+    model = _parse_model(data.get("model"))
+    if model is None:
+        raise _model_error()
+    evidence = _wants_evidence(data.get("include"), (query_params or {}).get("include"))
+    return prediction_jobs.normalize_params(
+        gene_ids, top_n, bool(data.get("flux", False)), hops, model, evidence,
+    )
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Aceita Accept: application/x-ndjson; respostas não-streaming (erros) viram uma linha."""
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return (json.dumps(data) + "\n").encode(self.charset)
+
+
+def _wants_stream(request):
+    return (request.query_params.get("stream") in ("1", "true")
+            or "application/x-ndjson" in request.headers.get("Accept", ""))
+
+
+def _ndjson(records):
+    # o status 200 já foi enviado: uma falha fora dos blocos encerra o corpo com um
+    # resumo {"done": false, "error"}, para o cliente não confundir com o fim normal
+    try:
+        for record in records:
+            yield json.dumps(record) + "\n"
+    except Exception as e:
+        print(f"Falha na resposta NDJSON: {e}")
+        traceback.print_exc()
+        yield json.dumps({"done": False, "error": str(e)}) + "\n"
+
+
+class PredictBatchView(APIView):
+    """
+    Vizinhos metabólicos de um painel de genes:
+    {"gene_ids": [...], "top_n": 3, "flux": false, "hops": 1, "model": "human-gem"}.
+    Com "include": ["evidence"] (ou ?include=evidence), cada vizinho traz os metabólitos e
+    reações compartilhados.
+    Com ?stream=1 (ou Accept: application/x-ndjson) responde em NDJSON, um gene por linha,
+    à medida que os genes são calculados (ver neighbors_stream).
+    """
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+
+    def post(self, request):
+        params = _batch_params(request.data, request.query_params)
+
+        if _wants_stream(request):
+            response = StreamingHttpResponse(_ndjson(neighbors_stream(**params)),
+                                             content_type="application/x-ndjson")
+            # proxies (nginx) não devem acumular a resposta antes de repassar
+            response["X-Accel-Buffering"] = "no"
+            response["Cache-Control"] = "no-cache"
+            return response
+
+        start = time.perf_counter()
+        result = neighbors_batch(**params)
+        warmup.note_request((time.perf_counter() - start) * 1000)
+        response = Response(result)
+        # renderiza aqui (e não no finalize do DRF) para medir a serialização
+        with metrics.stage("serialize"):
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+        return response
+
+
+class PredictionJobView(APIView):
+    """
+    Enfileira uma predição (mesmo corpo de PredictBatchView) para os workers de
+    run_prediction_workers. Um job idêntico ainda em andamento é reaproveitado.
+    """
+
+    def post(self, request):
+        params = _batch_params(request.data, request.query_params)
+        job, created = prediction_jobs.submit(params, request.user)
+        return Response(prediction_jobs.serialize(job),
+                        status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK)
+
+
+class PredictionJobDetailView(APIView):
+    """
+    Estado e resultado de um job; ?wait=<segundos> espera a conclusão (long-poll).
+    Só quem criou o job (ou staff) pode consultá-lo; para os demais, 404.
+    """
+
+    def get(self, request, job_id):
+        try:
+            wait = max(0.0, float(request.query_params.get("wait", 0)))
+        except ValueError:
+            return Response({"error": "'wait' deve ser um número de segundos."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        job = prediction_jobs.get_job(job_id, wait, request.user)
+        if job is None:
+            return Response({"error": "Job não encontrado ou expirado."},
+                            status=status.HTTP_404_NOT_FOUND)
+        return Response(prediction_jobs.serialize(job))
+
+
+class SubsystemImpactView(APIView):
+    """
+    Subsystems atingidos por uma lista de genes do paciente:
+    {"gene_ids": [...], "min_hits": 1, "model": "human-gem"}.
+    """
+
+    def post(self, request):
+        gene_ids = _parse_gene_ids(request.data.get("gene_ids"))
+        try:
+            min_hits = int(request.data.get("min_hits", 1))
+        except (TypeError, ValueError):
+            return Response({"error": "'min_hits' deve ser um inteiro."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        model = _parse_model(request.data.get("model"))
+        if model is None:
+            raise _model_error()
+        return Response(subsystem_impact(gene_ids, min_hits, model))
+
+
+class PhenotypeGenesView(APIView):
+    """
+    Genes candidatos a partir de fenótipos: {"phenotypes": [nomes HPO]}, {"text": "..."}
+    (laudo em texto livre; os fenótipos são extraídos com as posições como evidência) ou
+    o PDF do exame em "file" (multipart; reenvios do mesmo arquivo vêm do cache de
+    extração), com "top_k" (padrão 20).
+    """
+
+    def post(self, request):
+        top_k = _parse_limit(request.data.get("top_k", 20), "top_k", settings.PHENOTYPE_GENES_MAX_TOP_K)
+        upload = request.FILES.get("file")
+        text = request.data.get("text")
+        phenotypes = request.data.get("phenotypes")
+        if upload is not None:
+            try:
+                with metrics.stage("extract_phenotypes"):
+                    matches = ner_and_inference.extract_pdf_phenotype_matches(upload)
+            except PdfExtractionError:
+                return Response({"error": "Não foi possível ler o PDF enviado."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            phenotypes = [m["phenotype"] for m in matches]
+        elif isinstance(text, str) and text.strip():
+            with metrics.stage("extract_phenotypes"):
+                matches = ner_and_inference.extract_phenotype_matches(text)
+            phenotypes = [m["phenotype"] for m in matches]
+        elif isinstance(phenotypes, list) and phenotypes and all(isinstance(p, str) for p in phenotypes):
+            matches = None
+        else:
+            return Response({"error": "Informe 'phenotypes' (lista de nomes HPO), 'text' ou 'file'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        with metrics.stage("rank_genes"):
+            result = ner_and_inference.rank_genes(phenotypes, top_k)
+        if matches is not None:
+            result["matches"] = matches
+        return Response(result)
+
+
+class MetabolicModelsView(APIView):
+    """Modelos metabólicos disponíveis, versão carregada e memória estimada deste worker."""
+
+    def get(self, request):
+        return Response(load_registry().status())
+
+
+class MetricsView(APIView):
+    """Histogramas por etapa da predição e contadores de cache deste worker."""
+
+    def get(self, request):
+        data = metrics.snapshot()
+        data["prediction_cache"] = get_prediction_cache().stats()
+        data["extraction_cache"] = get_extraction_cache().stats()
+        data["disease_db"] = disease_db.pool_metrics()
+        return Response(data)
+
+
+class ReadinessView(APIView):
+    """Sinal de prontidão do worker: 200 quando os dados da predição já estão carregados."""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        state = warmup.status()
+        state["disease_db"] = disease_db.pool_metrics()
+        code = status.HTTP_200_OK if state["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+        return Response(state, status=code)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 from pathlib import Path
+import json
 import os
 from dotenv import load_dotenv
 from datetime import timedelta
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -194,4 +196,75 @@ AWS_SECRET_ACCESS_KEY=os.environ.get('AWS_SECRET_ACCESS_KEY')
 AWS_STORAGE_BUCKET_NAME=os.environ.get('AWS_STORAGE_BUCKET_NAME')
 AWS_S3_REGION_NAME=os.environ.get('AWS_S3_REGION_NAME')
 AWS_S3_SIGNATURE_VERSION=os.environ.get('AWS_S3_SIGNATURE_VERSION')
-DEFAULT_FILE_STORAGE=os.environ.get('DEFAULT_FILE_STORAGE')
\ No newline at end of file
+DEFAULT_FILE_STORAGE=os.environ.get('DEFAULT_FILE_STORAGE')
+
+# Predição metabólica
+PREDICTION_CACHE_DIR = os.environ.get('PREDICTION_CACHE_DIR', os.path.join(BASE_DIR, 'media/cache/predictions'))
+GENE_TABLE_CACHE_DIR = os.environ.get('GENE_TABLE_CACHE_DIR', os.path.join(BASE_DIR, 'media/cache/genes'))
+PREDICTION_CACHE_MAX_MB = int(os.environ.get('PREDICTION_CACHE_MAX_MB', 256))
+PREDICTION_CACHE_MEMORY_ENTRIES = int(os.environ.get('PREDICTION_CACHE_MEMORY_ENTRIES', 2048))
+DISEASE_VERSION_TTL = int(os.environ.get('DISEASE_VERSION_TTL', 60))
+METABOLIC_GRAPH_DIR = os.environ.get('METABOLIC_GRAPH_DIR', os.path.join(BASE_DIR, 'api/services/data/Human-GEM.graph'))
+PREDICTION_WARMUP_FULL_MODEL = os.environ.get('PREDICTION_WARMUP_FULL_MODEL', 'false').lower() == 'true'
+FLUX_PROCESSES = int(os.environ.get('FLUX_PROCESSES', 2))
+FLUX_BUDGET_SECONDS = float(os.environ.get('FLUX_BUDGET_SECONDS', 60))
+KNOCKOUT_TABLE_DIR = os.environ.get('KNOCKOUT_TABLE_DIR', os.path.join(BASE_DIR, 'api/services/data/knockouts'))
+# sem padrão: a URL leva a senha do banco e vem só do ambiente (ver disease_db.get_engine)
+DISEASE_DB_URL = os.environ.get('DISEASE_DB_URL')
+DISEASE_DB_POOL_SIZE = int(os.environ.get('DISEASE_DB_POOL_SIZE', 4))
+DISEASE_DB_MAX_OVERFLOW = int(os.environ.get('DISEASE_DB_MAX_OVERFLOW', 4))
+PHENOTYPE_SNAPSHOT_PATH = os.environ.get('PHENOTYPE_SNAPSHOT_PATH', os.path.join(BASE_DIR, 'api/services/data/phenotypes.sqlite'))
+PHENOTYPE_SNAPSHOT_CHECK_SECONDS = int(os.environ.get('PHENOTYPE_SNAPSHOT_CHECK_SECONDS', 30))
+PHENOTYPE_MATCHER_CACHE_DIR = os.environ.get('PHENOTYPE_MATCHER_CACHE_DIR', os.path.join(BASE_DIR, 'media/cache/phenotypes'))
+PHENOTYPE_DICTIONARY_SOURCE = os.environ.get('PHENOTYPE_DICTIONARY_SOURCE', os.path.join(BASE_DIR, 'api/services/dictionaries/phenotypes_pt_en.tsv'))
+PHENOTYPE_DICTIONARY_PATH = os.environ.get('PHENOTYPE_DICTIONARY_PATH', os.path.join(BASE_DIR, 'api/services/data/phenotype_dictionary.sqlite'))
+PHENOTYPE_GENES_MAX_TOP_K = int(os.environ.get('PHENOTYPE_GENES_MAX_TOP_K', 200))
+NEIGHBORHOOD_MAX_HOPS = int(os.environ.get('NEIGHBORHOOD_MAX_HOPS', 3))
+NEIGHBORHOOD_FRONTIER_CAP = int(os.environ.get('NEIGHBORHOOD_FRONTIER_CAP', 50))
+NEIGHBORHOOD_MIN_SCORE = float(os.environ.get('NEIGHBORHOOD_MIN_SCORE', 0.05))
+NEIGHBORHOOD_BUDGET_SECONDS = float(os.environ.get('NEIGHBORHOOD_BUDGET_SECONDS', 2))
+NEIGHBORHOOD_MEMO_ENTRIES = int(os.environ.get('NEIGHBORHOOD_MEMO_ENTRIES', 4096))
+PREDICTION_JOB_WORKERS = int(os.environ.get('PREDICTION_JOB_WORKERS', 2))
+PREDICTION_JOB_TTL_SECONDS = int(os.environ.get('PREDICTION_JOB_TTL_SECONDS', 24 * 3600))
+PREDICTION_JOB_POLL_SECONDS = float(os.environ.get('PREDICTION_JOB_POLL_SECONDS', 1))
+PREDICTION_JOB_MAX_WAIT_SECONDS = float(os.environ.get('PREDICTION_JOB_MAX_WAIT_SECONDS', 30))
+PREDICTION_JOB_STALE_SECONDS = int(os.environ.get('PREDICTION_JOB_STALE_SECONDS', 1800))
+PREDICTION_JOB_MAX_ATTEMPTS = int(os.environ.get('PREDICTION_JOB_MAX_ATTEMPTS', 3))
+PREDICTION_JOB_FLUX_BUDGET_SECONDS = float(os.environ.get('PREDICTION_JOB_FLUX_BUDGET_SECONDS', 600))
+# genes por bloco no streaming NDJSON: 1 entrega cada gene assim que é calculado; valores
+# maiores agrupam as consultas e atrasam o primeiro resultado
+PREDICTION_STREAM_CHUNK = int(os.environ.get('PREDICTION_STREAM_CHUNK', 1))
+# limites dos parâmetros das requisições de predição
+PREDICTION_MAX_TOP_N = int(os.environ.get('PREDICTION_MAX_TOP_N', 50))
+PREDICTION_MAX_GENE_IDS = int(os.environ.get('PREDICTION_MAX_GENE_IDS', 1000))
+# modelos disponíveis para a predição: nome -> {path, graph_dir, label}; METABOLIC_MODELS_EXTRA
+# (JSON no mesmo formato) acrescenta ou substitui modelos sem alterar o código
+METABOLIC_MODELS = {
+    'human-gem': {
+        'path': os.path.join(BASE_DIR, 'api/services/data/Human-GEM.pkl'),
+        'graph_dir': METABOLIC_GRAPH_DIR,
+        'label': 'Human-GEM',
+    },
+    'ecoli-core': {
+        'path': os.path.join(BASE_DIR, 'api/services/metabolic_analysis/ecoli_core_model.json'),
+        'graph_dir': None,
+        'label': 'E. coli core',
+    },
+}
+METABOLIC_MODELS.update(json.loads(os.environ.get('METABOLIC_MODELS_EXTRA', '{}')))
+DEFAULT_METABOLIC_MODEL = os.environ.get('DEFAULT_METABOLIC_MODEL', 'human-gem')
+METABOLIC_MODELS_MEMORY_MB = int(os.environ.get('METABOLIC_MODELS_MEMORY_MB', 6144))
+PROMISCUOUS_DEGREE_PERCENTILE = float(os.environ.get('PROMISCUOUS_DEGREE_PERCENTILE', 99))
+PROMISCUOUS_METS_EXTRA = os.environ.get('PROMISCUOUS_METS_EXTRA', '')
+PROMISCUOUS_METS_KEEP = os.environ.get('PROMISCUOUS_METS_KEEP', '')
+
+# Extração de texto de PDFs (ver api/services/pdf_engine.py)
+PDF_BACKEND = os.environ.get('PDF_BACKEND', 'pymupdf')
+PDF_PROCESSES = int(os.environ.get('PDF_PROCESSES', 2))
+PDF_CHUNK_PAGES = int(os.environ.get('PDF_CHUNK_PAGES', 16))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', 64))
+PDF_MAX_PARALLEL_DOCUMENTS = int(os.environ.get('PDF_MAX_PARALLEL_DOCUMENTS', 2))
+# resultados de extração (texto das páginas, fenótipos, e-mails) pelo sha256 do arquivo
+EXTRACTION_CACHE_DIR = os.environ.get('EXTRACTION_CACHE_DIR', os.path.join(BASE_DIR, 'media/cache/extraction'))
+EXTRACTION_CACHE_MAX_MB = int(os.environ.get('EXTRACTION_CACHE_MAX_MB', 512))
+EXTRACTION_CACHE_CHUNK_PAGES = int(os.environ.get('EXTRACTION_CACHE_CHUNK_PAGES', 32))
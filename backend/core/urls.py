@@ -15,6 +15,9 @@ from rest_framework_simplejwt.views import (
 from api.views.admin import UserRoleView, StaffUserCreateView
 from api.views.crm import PersonViewSet, PatientViewSet, DoctorViewSet, AppointmentViewSet, ClinicalNoteViewSet, \
     PatientRecordViewSet, PatientSandboxViewSet, PreConsultaView
+from api.views.prediction import PredictViewSet, PredictBatchView, ReadinessView, PredictionJobView, \
+    PredictionJobDetailView, SubsystemImpactView, MetricsView, \
+    MetabolicModelsView, PhenotypeGenesView
 
 url = os.environ.get("URL")
 
@@ -56,6 +59,14 @@ urlpatterns = [
     path('api/staff/create/', StaffUserCreateView.as_view(), name='create_staff_user'),
     path("api/preconsulta/<int:patient_id>/", PreConsultaView.as_view()),
     # path('person/', PersonViewSet.as_view({'get': 'get'}), name='person_view'),
-    # path('metab/predict_neighbor/<ens_gene_id>/', PredictViewSet.as_view({'post': 'post'}), name='metab_predict_view'),
+    path('api/health/ready/', ReadinessView.as_view(), name='health_ready'),
+    path('api/health/metrics/', MetricsView.as_view(), name='health_metrics'),
+    path('api/metab/predict_neighbor/', PredictBatchView.as_view(), name='metab_predict_batch_view'),
+    path('api/metab/subsystems/', SubsystemImpactView.as_view(), name='metab_subsystems_view'),
+    path('api/metab/models/', MetabolicModelsView.as_view(), name='metab_models_view'),
+    path('api/phenotypes/genes/', PhenotypeGenesView.as_view(), name='phenotype_genes_view'),
+    path('api/metab/jobs/', PredictionJobView.as_view(), name='metab_jobs_view'),
+    path('api/metab/jobs/<uuid:job_id>/', PredictionJobDetailView.as_view(), name='metab_job_detail_view'),
+    path('api/metab/predict_neighbor/<ens_gene_id>/', PredictViewSet.as_view({'post': 'post'}), name='metab_predict_view'),
 
 ]
@@ -0,0 +1,27 @@
+import os
+
+bind = "0.0.0.0:8000"
+loglevel = "debug"
+timeout = 120
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Carrega o Django (e os dados da predição) no master; os workers herdam por fork
+preload_app = True
+
+
+def when_ready(server):
+    from api.services.warmup import prepare_fork, warmup
+
+    state = warmup()
+    prepare_fork()
+    server.log.info("Warmup da predição: ready=%s timings=%s memory=%s",
+                    state["ready"], state["timings_ms"], state["memory"])
+
+
+def post_worker_init(worker):
+    # se o warmup falhou no master, cada worker tenta antes de aceitar requisições
+    from api.services.warmup import is_ready, warmup
+
+    if not is_ready():
+        warmup()
@@ -0,0 +1,77 @@
+const API_BASE_URL = import.meta.env.VITE_API_BASE_URL;
+const API_PREDICT_NEIGHBOR = `${API_BASE_URL}/metab/predict_neighbor/`;
+
+// Vizinhos metabólicos de um painel de genes em modo streaming (NDJSON):
+// onRecord é chamado para cada gene assim que o backend o calcula, permitindo
+// renderizar resultados parciais. Com evidence, cada vizinho traz os metabólitos e
+// reações compartilhados. Genes que falharam chegam a onRecord como { gene_id, error }.
+// Retorna o resumo final { done, count, not_found, errors }; se a resposta terminar sem
+// ele (ou com { done: false, error }), lança um erro.
+export async function streamNeighbors(
+  geneIds,
+  { onRecord, topN = 3, hops = 1, flux = false, evidence = false, signal } = {},
+) {
+  const token = localStorage.getItem("authToken");
+  const response = await fetch(`${API_PREDICT_NEIGHBOR}?stream=1`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      Accept: "application/x-ndjson",
+      Authorization: `Bearer ${token}`,
+    },
+    body: JSON.stringify({
+      gene_ids: geneIds,
+      top_n: topN,
+      hops,
+      flux,
+      include: evidence ? ["evidence"] : [],
+    }),
+    signal,
+  });
+
+  if (!response.ok) {
+    const text = await response.text();
+    let message = "Erro ao calcular a predição.";
+    try {
+      message = JSON.parse(text).error || message;
+    } catch {
+      // resposta sem JSON: mantém a mensagem padrão
+    }
+    throw new Error(message);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let summary = null;
+
+  const handleLine = (line) => {
+    if (!line.trim()) return;
+    const record = JSON.parse(line);
+    if (record.done === false) {
+      throw new Error(record.error || "Erro ao calcular a predição.");
+    }
+    if (record.done) {
+      summary = record;
+    } else if (onRecord) {
+      onRecord(record);
+    }
+  };
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    lines.forEach(handleLine);
+  }
+  buffer += decoder.decode();
+  handleLine(buffer);
+
+  if (!summary) {
+    // conexão encerrada antes do resumo final: a predição não terminou
+    throw new Error("A resposta da predição foi interrompida.");
+  }
+  return summary;
+}